@@ -2,23 +2,37 @@
 
 import gradio as gr
 from genai_voice.bots.chatbot import ChatBot
+from genai_voice.bots.sessions import SessionManager
+from genai_voice.config.defaults import Config
 from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.metrics import start_metrics_exporters
+from genai_voice.logger.tracing import trace
+from genai_voice.processing.streaming_asr import StreamingTranscriber
+
+NO_SPEECH_MESSAGE = "No speech detected. Please try again."
 
 
 # poetry run RunChatBotScript
 def run():
     """Run Chatbot app"""
+    start_metrics_exporters()
     chatbot = ChatBot(enable_speakers=True, threaded=True)
-    history = []
+    sessions = SessionManager()
 
-    def get_response(audio):
+    def get_response(audio, request: gr.Request):
         """Get Audio Response From Chatbot"""
         if not audio:
             raise ValueError("No audio file provided.")
-        prompt = chatbot.get_prompt_from_gradio_audio(audio)
-        log(f"Transcribed prompt: {prompt}", log_level=LogLevels.ON)
-        response = chatbot.respond(prompt, history)
-        history.append([prompt, response])
+        # ASR and the rest of the turn share one trace ID
+        with trace():
+            prompt = chatbot.get_prompt_from_gradio_audio(audio)
+            log(f"Transcribed prompt: {prompt}", log_level=LogLevels.ON)
+            if not prompt:
+                return NO_SPEECH_MESSAGE
+            response = chatbot.respond(
+                prompt, sessions.history(request.session_hash), request.session_hash
+            )
+        sessions.append(request.session_hash, prompt, response)
         return response
 
     demo = gr.Interface(
@@ -27,19 +41,114 @@ def run():
         "text",
         title="Wanderwise Travel Assistant",
     )
-    demo.launch()
+    demo.queue(default_concurrency_limit=Config.UI_CONCURRENCY_LIMIT).launch()
+
+
+# poetry run RunChatBotStreamingScript
+def run_streaming():
+    """Run Chatbot app, showing the response while it is generated"""
+    start_metrics_exporters()
+    chatbot = ChatBot(enable_speakers=True, threaded=True)
+    sessions = SessionManager()
+
+    def get_streaming_response(audio, request: gr.Request):
+        """Stream Audio Response From Chatbot"""
+        if not audio:
+            raise ValueError("No audio file provided.")
+        # Nothing is yielded under trace(), gradio may resume the generator
+        # in another context. The stream keeps the trace ID of the ASR stage.
+        with trace():
+            prompt = chatbot.get_prompt_from_gradio_audio(audio)
+            log(f"Transcribed prompt: {prompt}", log_level=LogLevels.ON)
+            history = sessions.history(request.session_hash)
+            stream = (
+                chatbot.respond_stream(prompt, history, request.session_hash) if prompt else None
+            )
+        if stream is None:
+            yield NO_SPEECH_MESSAGE
+            return
+        response = ""
+        for delta in stream:
+            response += delta
+            yield response
+        sessions.append(request.session_hash, prompt, response)
+
+    demo = gr.Interface(
+        get_streaming_response,
+        gr.Audio(sources="microphone"),
+        "text",
+        title="Wanderwise Travel Assistant",
+    )
+    demo.queue(default_concurrency_limit=Config.UI_CONCURRENCY_LIMIT).launch()
+
+
+# poetry run RunChatBotLiveScript
+def run_live():
+    """Run Chatbot app, transcribing while the user speaks"""
+    start_metrics_exporters()
+    chatbot = ChatBot(enable_speakers=True, threaded=True)
+    sessions = SessionManager()
+
+    def answer(event, request: gr.Request):
+        """Respond to a final transcript"""
+        prompt = event.text
+        log(f"Transcribed prompt: {prompt}", log_level=LogLevels.ON)
+        if not prompt:
+            return NO_SPEECH_MESSAGE
+        response = chatbot.respond(
+            prompt, sessions.history(request.session_hash), request.session_hash
+        )
+        sessions.append(request.session_hash, prompt, response)
+        return response
+
+    def on_event(transcriber, event, request: gr.Request):
+        """Show a transcript event, answering final ones"""
+        if event is None:
+            return transcriber, gr.update(), gr.update()
+        if not event.is_final:
+            return transcriber, event.text, gr.update()
+        return transcriber, event.text, answer(event, request)
+
+    def on_chunk(transcriber, chunk, request: gr.Request):
+        """Transcribe a microphone chunk, answering once the user stops speaking"""
+        transcriber = transcriber or StreamingTranscriber()
+        if chunk is None:
+            return transcriber, gr.update(), gr.update()
+        # The final transcript and the answer share one trace ID
+        with trace():
+            return on_event(transcriber, transcriber.feed(*chunk), request)
+
+    def on_stop(transcriber, request: gr.Request):
+        """Answer whatever was said before the recording stopped"""
+        if not transcriber:
+            return transcriber, gr.update(), gr.update()
+        with trace():
+            return on_event(transcriber, transcriber.flush(), request)
+
+    with gr.Blocks(title="Wanderwise Travel Assistant") as demo:
+        transcriber = gr.State()
+        audio = gr.Audio(sources="microphone", streaming=True)
+        transcript = gr.Textbox(label="You")
+        response = gr.Textbox(label="Assistant")
+        audio.stream(on_chunk, [transcriber, audio], [transcriber, transcript, response])
+        audio.stop_recording(on_stop, [transcriber], [transcriber, transcript, response])
+    demo.queue(default_concurrency_limit=Config.UI_CONCURRENCY_LIMIT).launch()
 
 
 # poetry run RunChatBotScript
 def run_with_file_support():
     """Run Chatbot app and save files to disk"""
+    start_metrics_exporters()
     chatbot = ChatBot(enable_speakers=True, threaded=True)
-    history = []
+    sessions = SessionManager()
 
-    def get_response_from_file(file):
-        prompt = chatbot.get_prompt_from_file(file)
-        response = chatbot.respond(prompt, history)
-        history.append([prompt, response])
+    def get_response_from_file(file, request: gr.Request):
+        with trace():
+            prompt = chatbot.get_prompt_from_file(file)
+            response = chatbot.respond(
+                prompt, sessions.history(request.session_hash), request.session_hash
+            )
+        sessions.append(request.session_hash, prompt, response)
         return response
 
     # Approach that doesn't have the warning but uses temp files
@@ -48,4 +157,4 @@ def run_with_file_support():
         gr.Audio(sources="microphone", type="filepath"),
         "text",
     )
-    demo.launch()
+    demo.queue(default_concurrency_limit=Config.UI_CONCURRENCY_LIMIT).launch()
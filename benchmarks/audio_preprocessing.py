@@ -0,0 +1,100 @@
+"""Audio preprocessing benchmark
+
+Compares the ASR preprocessing stage with the previous per-method code
+(float64 stereo mean, astype(float32), divide by the peak) on synthetic
+clips. Reports the median time and the peak memory allocated while
+preprocessing, and fails when the new stage is slower or allocates more.
+
+    poetry run python benchmarks/audio_preprocessing.py [--seconds 10] [--repeat 20]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from genai_voice.processing.preprocess import prepare_for_asr
+from genai_voice.processing.vad import full_scale_of, trim_silence
+
+# (name, sampling rate, channels)
+CLIPS = [
+    ("mono 16 kHz", 16000, 1),
+    ("stereo 16 kHz", 16000, 2),
+    ("stereo 48 kHz", 48000, 2),
+]
+
+
+def legacy_path(sampling_rate: int, raw_audio_data: np.ndarray) -> np.ndarray:
+    """Preprocessing as done before the shared stage"""
+    full_scale = full_scale_of(raw_audio_data.dtype)
+    if raw_audio_data.ndim > 1:
+        raw_audio_data = raw_audio_data.mean(axis=1)
+    raw_audio_data = trim_silence(
+        raw_audio_data, sampling_rate, full_scale=full_scale
+    ).audio
+    raw_audio_data = raw_audio_data.astype(np.float32)
+    raw_audio_data /= np.max(np.abs(raw_audio_data))
+    return raw_audio_data
+
+
+def new_path(sampling_rate: int, raw_audio_data: np.ndarray) -> np.ndarray:
+    """Shared preprocessing stage"""
+    return prepare_for_asr(sampling_rate, raw_audio_data)[1]
+
+
+def make_clip(sampling_rate: int, channels: int, seconds: float) -> np.ndarray:
+    """int16 speech-like noise with half a second of silence on both ends"""
+    rng = np.random.default_rng(0)
+    frames = int(sampling_rate * seconds)
+    clip = rng.normal(0, 3000, size=(frames, channels)).astype(np.int16)
+    clip[: sampling_rate // 2] = 0
+    clip[-sampling_rate // 2 :] = 0
+    return clip[:, 0] if channels == 1 else clip
+
+
+def measure(func, sampling_rate: int, clip: np.ndarray, repeat: int) -> tuple:
+    """(median seconds, peak bytes allocated) of func on clip"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(sampling_rate, clip)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(sampling_rate, clip)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main() -> int:
+    """Run the benchmark, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'clip':<15} {'path':<7} {'median':>10} {'peak alloc':>12}")
+    for name, sampling_rate, channels in CLIPS:
+        clip = make_clip(sampling_rate, channels, args.seconds)
+        legacy = measure(legacy_path, sampling_rate, clip, args.repeat)
+        new = measure(new_path, sampling_rate, clip, args.repeat)
+        for path, (seconds, peak) in (("legacy", legacy), ("new", new)):
+            print(
+                f"{name:<15} {path:<7} {seconds * 1000:8.2f} ms {peak / 1024:9.0f} KiB"
+            )
+        if new[0] > legacy[0]:
+            failures.append(f"{name} is slower than the legacy path")
+        if new[1] > legacy[1]:
+            failures.append(f"{name} allocates more than the legacy path")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
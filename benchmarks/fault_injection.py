@@ -0,0 +1,185 @@
+"""Fault injection checks
+
+Runs CustomOpenAIModel against the stub server with injected faults and
+checks that transient errors are retried (honouring Retry-After), hung
+requests give up at the deadline, client errors are not retried and an
+outage opens the circuit breaker, which fails fast and closes again once
+the server recovers.
+
+    poetry run python benchmarks/fault_injection.py
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from stub_openai_server import StubOpenAIServer, StubSettings
+
+MESSAGES = [{"role": "user", "content": "What time does my flight leave tomorrow?"}]
+
+
+def build_model(server: StubOpenAIServer, **policy):
+    """Model on the stub server with a fresh circuit breaker"""
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.logger.log_utils import LogLevels
+    from genai_voice.models.open_ai import CustomOpenAIModel
+    from genai_voice.models.resilience import RetryPolicy
+
+    return CustomOpenAIModel(
+        api_key="fault-injection",
+        base_url=server.base_url,
+        log_level=LogLevels.OFF,
+        retry_policy=RetryPolicy(**policy),
+    )
+
+
+def timed(function) -> tuple:
+    """(result or exception, seconds)"""
+    start = time.perf_counter()
+    try:
+        result = function()
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        result = error
+    return result, time.perf_counter() - start
+
+
+def transient_errors() -> list:
+    """Two 503s with Retry-After, then an answer"""
+    server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=10, fail_first=2, retry_after=0.2)
+    ).start()
+    model = build_model(server)
+    result, seconds = timed(lambda: model.generate(MESSAGES, None))
+    server.shutdown()
+    return [
+        ("answered after retries", isinstance(result, str)),
+        ("three requests", server.requests == 3),
+        ("waited for Retry-After", seconds >= 0.4),
+    ]
+
+
+def async_transient_errors() -> list:
+    """The same through agenerate"""
+    server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=10, fail_first=2, retry_after=0.2)
+    ).start()
+    model = build_model(server)
+    result, seconds = timed(lambda: asyncio.run(model.agenerate(MESSAGES, None)))
+    server.shutdown()
+    return [
+        ("answered after retries", isinstance(result, str)),
+        ("waited for Retry-After", seconds >= 0.4),
+    ]
+
+
+def rate_limited() -> list:
+    """A 429 is retried but does not count against the circuit"""
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.models.resilience import CircuitState
+
+    server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=10, fail_first=3, error_status=429, retry_after=0.1)
+    ).start()
+    model = build_model(server)
+    model.caller.breaker.failure_threshold = 2
+    result, _ = timed(lambda: model.generate(MESSAGES, None))
+    server.shutdown()
+    return [
+        ("answered after retries", isinstance(result, str)),
+        ("circuit closed", model.caller.breaker.state == CircuitState.CLOSED),
+    ]
+
+
+def hung_request(deadline_seconds: float) -> list:
+    """A server that never answers gives up at the turn deadline"""
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.models.resilience import deadline
+
+    server = StubOpenAIServer(
+        settings=StubSettings(hang_probability=1.0, hang_ms=10000)
+    ).start()
+    model = build_model(server)
+
+    def call():
+        with deadline(deadline_seconds):
+            return model.generate(MESSAGES, None)
+
+    result, seconds = timed(call)
+    server.shutdown()
+    return [
+        (f"failed with {type(result).__name__}", isinstance(result, Exception)),
+        (f"gave up in {seconds:.2f}s", seconds < deadline_seconds + 0.5),
+    ]
+
+
+def client_error() -> list:
+    """A 400 is the request's fault and is not retried"""
+    server = StubOpenAIServer(settings=StubSettings(fail_first=1, error_status=400)).start()
+    model = build_model(server)
+    result, _ = timed(lambda: model.generate(MESSAGES, None))
+    server.shutdown()
+    return [
+        ("failed", isinstance(result, Exception)),
+        ("one request", server.requests == 1),
+    ]
+
+
+def outage() -> list:
+    """Repeated 5xx open the circuit, a probe closes it after recovery"""
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.models.resilience import CircuitOpenError, CircuitState
+
+    server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=10, error_probability=1.0)
+    ).start()
+    model = build_model(server, max_attempts=2, base_delay_seconds=0.01)
+    breaker = model.caller.breaker
+    breaker.failure_threshold = 4
+    breaker.reset_seconds = 0.5
+    for _ in range(2):
+        timed(lambda: model.generate(MESSAGES, None))
+    opened = breaker.state == CircuitState.OPEN
+    before = server.requests
+    result, seconds = timed(lambda: model.generate(MESSAGES, None))
+    failed_fast = isinstance(result, CircuitOpenError) and server.requests == before
+
+    server.settings.error_probability = 0.0
+    time.sleep(breaker.reset_seconds)
+    recovered, _ = timed(lambda: model.generate(MESSAGES, None))
+    server.shutdown()
+    return [
+        ("circuit opened", opened),
+        (f"failed fast in {seconds * 1000:.2f} ms", failed_fast and seconds < 0.01),
+        ("answered after recovery", isinstance(recovered, str)),
+        ("circuit closed", breaker.state == CircuitState.CLOSED),
+    ]
+
+
+def main() -> int:
+    """Run the scenarios, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deadline-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "fault-injection")
+
+    scenarios = {
+        "transient errors": transient_errors,
+        "async transient errors": async_transient_errors,
+        "rate limited": rate_limited,
+        "hung request": lambda: hung_request(args.deadline_seconds),
+        "client error": client_error,
+        "outage": outage,
+    }
+    failures = 0
+    for name, scenario in scenarios.items():
+        print(name)
+        for check, passed in scenario():
+            print(f"  {'ok  ' if passed else 'FAIL'} {check}")
+            failures += not passed
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Hedged requests benchmark
+
+Sends the same requests to a primary stub server with a slow tail and a
+secondary stub server, once to the primary alone and once through
+HedgedRouter, and reports p50/p95/p99 latency and the extra requests the
+hedges cost. Fails when hedging does not cut the p99 latency or sends
+more than --max-extra-load of the requests twice.
+
+    poetry run python benchmarks/hedged_requests.py [--requests 400] [--stream]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_openai_server import StubOpenAIServer, StubSettings
+from voice_pipeline import percentile
+
+MESSAGES = [
+    {"role": "system", "content": "You are a travel agent."},
+    {"role": "user", "content": "What time does my flight leave tomorrow?"},
+]
+
+
+def run(model, requests: int, concurrency: int, stream: bool) -> list:
+    """Latency of each request in milliseconds"""
+
+    def request(_) -> float:
+        start = time.perf_counter()
+        if stream:
+            # Time to the first token, what the speaker waits for
+            for _ in model.generate_stream(messages=MESSAGES, config=None):
+                break
+        else:
+            model.generate(messages=MESSAGES, config=None)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return sorted(executor.map(request, range(requests)))
+
+
+def main() -> int:
+    """Run the benchmark, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--primary-latency-ms", type=float, default=100.0)
+    parser.add_argument("--slow-probability", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--secondary-latency-ms", type=float, default=150.0)
+    parser.add_argument("--stream", action="store_true", help="Hedge streams on the first token")
+    parser.add_argument("--max-extra-load", type=float, default=0.25)
+    args = parser.parse_args()
+
+    primary_server = StubOpenAIServer(
+        settings=StubSettings(
+            latency_ms=args.primary_latency_ms,
+            jitter_ms=20.0,
+            slow_probability=args.slow_probability,
+            slow_ms=args.slow_ms,
+        )
+    ).start()
+    secondary_server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=args.secondary_latency_ms, jitter_ms=20.0)
+    ).start()
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.logger.log_utils import LogLevels
+    from genai_voice.models.backends import create_backend
+    from genai_voice.models.router import HedgedRouter
+
+    def backend(server: StubOpenAIServer):
+        return create_backend("gpt-4-turbo", base_url=server.base_url, log_level=LogLevels.OFF)
+
+    results = {}
+    single = backend(primary_server)
+    results["primary only"] = run(single, args.requests, args.concurrency, args.stream)
+
+    router = HedgedRouter(
+        [backend(primary_server), backend(secondary_server)], log_level=LogLevels.OFF
+    )
+    # Learn the latency of the primary before hedging on it
+    run(router, router.min_samples, 1, args.stream)
+    before = primary_server.requests + secondary_server.requests
+    results["hedged"] = run(router, args.requests, args.concurrency, args.stream)
+    extra_load = (primary_server.requests + secondary_server.requests - before) / args.requests - 1
+
+    kind = "first token" if args.stream else "response"
+    print(f"{kind + ' latency':<20} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for name, values in results.items():
+        print(
+            f"{name:<20} {percentile(values, 50):9.1f} {percentile(values, 95):9.1f} "
+            f"{percentile(values, 99):9.1f}"
+        )
+    print(f"extra requests {extra_load:.1%}")
+    primary_server.shutdown()
+    secondary_server.shutdown()
+
+    failures = []
+    if percentile(results["hedged"], 99) >= percentile(results["primary only"], 99):
+        failures.append("hedging did not cut the p99 latency")
+    if extra_load > args.max_extra_load:
+        failures.append(f"hedging sent {extra_load:.1%} extra requests")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Import time benchmark
+
+Imports each target in a fresh interpreter, reports the median wall time and
+fails when a target pulls in a heavy dependency it should load lazily or
+exceeds its time budget.
+
+    poetry run python benchmarks/import_time.py [--repeat 5] [--budget-scale 2]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that must not be loaded as a side effect of importing the target
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "pydub",
+    "pyttsx3",
+    "gtts",
+    "speech_recognition",
+    "st_audiorec",
+    "streamlit",
+    "langchain_community",
+    "gradio",
+]
+
+# target module -> median import time budget in milliseconds
+TARGETS = {
+    "genai_voice": 150.0,
+    "genai_voice.config.defaults": 150.0,
+    "genai_voice.data_utils.urls": 150.0,
+    "genai_voice.processing.audio": 400.0,
+    # The chatbot needs the openai client to do anything
+    "genai_voice.bots.chatbot": 1500.0,
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(target: str) -> dict:
+    """Import target in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(target=target)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    """Run the benchmark, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--budget-scale",
+        type=float,
+        default=1.0,
+        help="Multiplier applied to every time budget, for slower machines",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    for target, budget_ms in TARGETS.items():
+        budget_ms *= args.budget_scale
+        runs = [measure(target) for _ in range(args.repeat)]
+        median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+        loaded = set(runs[0]["modules"])
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        print(f"{target:<35} {median_ms:8.1f} ms  heavy: {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{target} eagerly imports {', '.join(heavy)}")
+        if median_ms > budget_ms:
+            failures.append(
+                f"{target} took {median_ms:.1f} ms, budget is {budget_ms:.1f} ms"
+            )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
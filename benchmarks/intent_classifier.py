@@ -0,0 +1,100 @@
+"""Intent classifier benchmark
+
+Trains the local intent classifier on a random split of the call center
+dataset and classifies the held out utterances. Reports the accuracy, the
+precision and coverage at the context and template confidence thresholds,
+the prediction latency and how much smaller the per-turn context is than
+the full context file. Fails when accuracy, template precision or the p99
+latency miss their budgets.
+
+    poetry run python benchmarks/intent_classifier.py [--test-share 0.2] [--seed 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from voice_pipeline import percentile
+
+from genai_voice.config.defaults import Config
+from genai_voice.models.tokens import count_tokens
+from genai_voice.retrieval.intents import IntentClassifier
+
+
+def main() -> int:
+    """Run the benchmark, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--test-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-accuracy", type=float, default=0.85)
+    parser.add_argument("--min-template-precision", type=float, default=0.98)
+    parser.add_argument("--max-p99-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    data_file_path = os.path.join("data", Config.INTENT_DATA_FILE)
+    with open(data_file_path, "r", encoding="utf-8") as f:
+        dataset = f.read()
+    examples = json.loads(dataset)
+    random.Random(args.seed).shuffle(examples)
+    split = int(len(examples) * args.test_share)
+    test, train = examples[:split], examples[split:]
+
+    start = time.perf_counter()
+    classifier = IntentClassifier(train)
+    build_ms = (time.perf_counter() - start) * 1000
+    latencies, predictions = [], []
+    for example in test:
+        start = time.perf_counter()
+        predictions.append(classifier.predict(example["instruction"]))
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    correct = [
+        prediction.intent == example["intent"] for prediction, example in zip(predictions, test)
+    ]
+    accuracy = sum(correct) / len(test)
+    print(f"{len(train)} training and {len(test)} test utterances, built in {build_ms:.0f} ms")
+    print(f"accuracy {accuracy:.3f}")
+    precision = {}
+    for name, threshold in (
+        ("context", Config.INTENT_MIN_CONFIDENCE),
+        ("template", Config.INTENT_TEMPLATE_CONFIDENCE),
+    ):
+        selected = [
+            hit for hit, prediction in zip(correct, predictions)
+            if prediction.confidence >= threshold
+        ]
+        precision[name] = sum(selected) / len(selected) if selected else 0.0
+        print(
+            f"{name:<8} confidence >= {threshold:.2f}: precision {precision[name]:.3f}, "
+            f"coverage {len(selected) / len(test):.2f}"
+        )
+    print(
+        f"latency p50 {percentile(latencies, 50):.3f} ms, p99 {percentile(latencies, 99):.3f} ms"
+    )
+
+    context_tokens = sorted(
+        count_tokens(classifier.context(prediction)) for prediction in predictions
+    )
+    print(
+        f"context tokens p50 {percentile(context_tokens, 50)}, "
+        f"max {context_tokens[-1]} (full dataset {count_tokens(dataset)})"
+    )
+
+    failures = []
+    if accuracy < args.min_accuracy:
+        failures.append(f"accuracy {accuracy:.3f} below {args.min_accuracy}")
+    if precision["template"] < args.min_template_precision:
+        failures.append(f"template precision {precision['template']:.3f} too low")
+    if percentile(latencies, 99) > args.max_p99_ms:
+        failures.append(f"p99 latency above {args.max_p99_ms} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
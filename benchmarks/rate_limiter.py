@@ -0,0 +1,114 @@
+"""Rate limiter benchmark
+
+Floods CustomOpenAIModel (on the stub server) with batch requests from a
+heavy and a light session while a few voice sessions hold conversations,
+all under a client-side requests-per-minute limit. Reports the latency
+of each class and session and the request rate the server saw. Fails
+when the rate exceeds the limit, when voice turns wait as long as batch
+requests or when the heavy batch session starves the light one.
+
+    poetry run python benchmarks/rate_limiter.py [--rpm 1200] [--voice-sessions 3]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_openai_server import StubOpenAIServer, StubSettings
+from voice_pipeline import percentile
+
+
+def main() -> int:
+    """Run the benchmark, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rpm", type=int, default=1200)
+    parser.add_argument("--burst-seconds", type=float, default=0.5)
+    parser.add_argument("--heavy-requests", type=int, default=120)
+    parser.add_argument("--light-requests", type=int, default=10)
+    parser.add_argument("--voice-sessions", type=int, default=3)
+    parser.add_argument("--voice-turns", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(settings=StubSettings(latency_ms=args.latency_ms)).start()
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.logger.log_utils import LogLevels
+    from genai_voice.models.open_ai import CustomOpenAIModel
+    from genai_voice.models.scheduler import Priority, RateLimitScheduler, request_scope
+
+    scheduler = RateLimitScheduler(
+        requests_per_minute=args.rpm, burst_seconds=args.burst_seconds, log_level=LogLevels.OFF
+    )
+    model = CustomOpenAIModel(
+        api_key="benchmark",
+        base_url=server.base_url,
+        log_level=LogLevels.OFF,
+        scheduler=scheduler,
+    )
+    latencies: dict = {}
+    finished: dict = {}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def request(session: str, priority: Priority) -> None:
+        begin = time.perf_counter()
+        with request_scope(session, priority):
+            model.generate([{"role": "user", "content": f"Hello from {session}"}], None)
+        end = time.perf_counter()
+        with lock:
+            latencies.setdefault(session, []).append((end - begin) * 1000)
+            finished.setdefault(session, []).append(end - start)
+
+    def conversation(session: str) -> None:
+        # Voice users join once the batch queue has built up
+        time.sleep(0.2)
+        for _ in range(args.voice_turns):
+            request(session, Priority.INTERACTIVE)
+            time.sleep(0.05)
+
+    batch = [("batch-heavy", args.heavy_requests), ("batch-light", args.light_requests)]
+    voice = [f"voice-{index}" for index in range(args.voice_sessions)]
+    # A thread per request, so every request queues in the scheduler, not the pool
+    workers = args.heavy_requests + args.light_requests + args.voice_sessions
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for session, count in batch:
+            for _ in range(count):
+                executor.submit(request, session, Priority.BATCH)
+        for session in voice:
+            executor.submit(conversation, session)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    rate = server.requests / elapsed * 60
+    print(f"{'session':<14} {'requests':>8} {'p50':>9} {'p95':>9} {'last done':>10}  (ms)")
+    for session, values in latencies.items():
+        values.sort()
+        print(
+            f"{session:<14} {len(values):8d} {percentile(values, 50):9.1f} "
+            f"{percentile(values, 95):9.1f} {max(finished[session]) * 1000:10.0f}"
+        )
+    print(f"request rate {rate:.0f}/min (limit {args.rpm}/min, burst {args.burst_seconds}s)")
+
+    voice_latencies = sorted(value for session in voice for value in latencies[session])
+    heavy = sorted(finished["batch-heavy"])
+    failures = []
+    # The burst is spent up front, the rest of the run follows the limit
+    allowed = args.rpm * (1 + args.burst_seconds / elapsed)
+    if rate > allowed * 1.05:
+        failures.append(f"request rate {rate:.0f}/min above the limit")
+    if percentile(voice_latencies, 95) >= percentile(sorted(latencies["batch-heavy"]), 50):
+        failures.append("voice turns waited as long as batch requests")
+    if max(finished["batch-light"]) >= percentile(heavy, 50):
+        failures.append("the heavy batch session starved the light one")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Stub OpenAI server
+
+Serves /v1/chat/completions like the OpenAI API, with and without
+streaming, after a configurable delay. Point the client at it with
+OPENAI_BASE_URL so benchmarks measure our own overhead rather than the
+network or the model. Faults can be injected: HTTP errors with an
+optional Retry-After header, a failing first few requests, and requests
+that hang.
+
+    poetry run python benchmarks/stub_openai_server.py [--port 8000] [--latency-ms 200]
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Thanks for reaching out. I have checked your booking and everything is "
+    "confirmed. Your flight leaves at nine in the morning. Is there anything "
+    "else I can help you with?"
+)
+
+
+@dataclass
+class StubSettings:
+    """Behaviour of the stub server"""
+
+    latency_ms: float = 200.0  # delay before the first byte
+    jitter_ms: float = 0.0  # uniform random extra delay
+    token_delay_ms: float = 0.0  # delay between streamed chunks
+    slow_probability: float = 0.0  # share of requests taking slow_ms instead
+    slow_ms: float = 0.0
+    reply: str = DEFAULT_REPLY
+    fail_first: int = 0  # number of first requests answered with error_status
+    error_probability: float = 0.0  # share of later requests answered with error_status
+    error_status: int = 503
+    retry_after: Optional[float] = None  # Retry-After header of the errors, seconds
+    hang_probability: float = 0.0  # share of requests not answered for hang_ms
+    hang_ms: float = 60000.0
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """OpenAI compatible chat completions server for benchmarks"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int = 0, settings: StubSettings = None) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.settings = settings or StubSettings()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Value for OPENAI_BASE_URL"""
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def handle_error(self, request, client_address) -> None:
+        # Cancelled requests close their connection before the reply
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def start(self) -> "StubOpenAIServer":
+        """Serve on a daemon thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubOpenAIServer
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Answer a chat completion"""
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        if len(raw) < length or not raw:
+            # The client gave up (e.g. a cancelled hedge) before sending its body
+            self.close_connection = True
+            return
+        body = json.loads(raw)
+        settings = self.server.settings
+        with self.server.lock:
+            self.server.requests += 1
+            number = self.server.requests
+        if number <= settings.fail_first or random.random() < settings.error_probability:
+            self.__error(settings)
+            return
+        if random.random() < settings.hang_probability:
+            time.sleep(settings.hang_ms / 1000)
+        latency_ms = settings.latency_ms
+        if random.random() < settings.slow_probability:
+            latency_ms = settings.slow_ms
+        time.sleep((latency_ms + random.uniform(0, settings.jitter_ms)) / 1000)
+        if body.get("stream"):
+            self.__stream(body, settings)
+        else:
+            self.__complete(body, settings)
+
+    def __error(self, settings: StubSettings) -> None:
+        data = json.dumps(
+            {"error": {"message": "Injected fault", "type": "server_error", "code": None}}
+        ).encode()
+        self.send_response(settings.error_status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if settings.retry_after is not None:
+            self.send_header("Retry-After", f"{settings.retry_after:g}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __complete(self, body: dict, settings: StubSettings) -> None:
+        response = _completion(body, settings.reply)
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __stream(self, body: dict, settings: StubSettings) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = settings.reply.split(" ")
+        for index, word in enumerate(words):
+            content = word if index == len(words) - 1 else f"{word} "
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            if settings.token_delay_ms:
+                time.sleep(settings.token_delay_ms / 1000)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def _completion(body: dict, reply: str) -> dict:
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in body["messages"])
+    prompt_tokens = prompt_chars // 4 + 1
+    completion_tokens = len(reply) // 4 + 1
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def main() -> None:
+    """Run the stub server in the foreground"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--slow-probability", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--error-probability", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--hang-probability", type=float, default=0.0)
+    parser.add_argument("--hang-ms", type=float, default=60000.0)
+    args = parser.parse_args()
+    server = StubOpenAIServer(
+        args.port,
+        StubSettings(
+            args.latency_ms,
+            args.jitter_ms,
+            args.token_delay_ms,
+            slow_probability=args.slow_probability,
+            slow_ms=args.slow_ms,
+            fail_first=args.fail_first,
+            error_probability=args.error_probability,
+            error_status=args.error_status,
+            retry_after=args.retry_after,
+            hang_probability=args.hang_probability,
+            hang_ms=args.hang_ms,
+        ),
+    )
+    print(f"Serving on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
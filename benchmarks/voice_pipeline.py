@@ -0,0 +1,316 @@
+"""Voice pipeline benchmark
+
+Drives ChatBot end to end for each turn: WAV bytes -> decode -> ASR ->
+retrieval and CustomOpenAIModel.generate -> TTS. The OpenAI API is
+replaced by a local stub server and gTTS by a fake synthesizer with a
+fixed delay, so the numbers are our own overhead plus the configured
+latencies. ASR runs the real Whisper model unless --fake-asr is given.
+
+Reports p50/p95/p99 latency per stage, throughput and peak RSS, and writes
+them to a JSON file. With --baseline the run is compared against an
+earlier results file and fails when a stage's p95 regressed by more than
+--tolerance.
+
+    poetry run python benchmarks/voice_pipeline.py [--turns 50] [--concurrency 4] [--fake-asr]
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from stub_openai_server import StubOpenAIServer, StubSettings
+
+# Stages in pipeline order, "turn" is the whole turn
+STAGES = ["decode", "asr", "llm", "tts", "turn"]
+
+PROMPTS = [
+    "What time does my flight leave tomorrow?",
+    "Can I change my hotel booking to next week?",
+    "Which documents do I need for a visa to Japan?",
+    "How much luggage can I take on board?",
+]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process"""
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> str:
+    """Commit the benchmark runs on"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def synthetic_wav(seconds: float, sampling_rate: int = 48000) -> bytes:
+    """Stereo 16 bit WAV with a second of silence around speech-like tones"""
+    rng = np.random.default_rng(0)
+    frames = int(sampling_rate * seconds)
+    t = np.arange(frames) / sampling_rate
+    # Syllable-rate envelope over a few voice harmonics
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((150, 300, 450)))
+    signal = 0.3 * envelope * voice + 0.01 * rng.standard_normal(frames)
+    silence = np.zeros(sampling_rate)
+    signal = np.concatenate([silence, signal, silence])
+    samples = (np.stack([signal, signal], axis=1) * 32767 * 0.5).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sampling_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def load_wavs(wav_dir: str, seconds: float) -> list:
+    """WAV fixtures from wav_dir, or a synthetic clip"""
+    if not wav_dir:
+        return [synthetic_wav(seconds)]
+    wavs = []
+    for name in sorted(os.listdir(wav_dir)):
+        if name.lower().endswith(".wav"):
+            with open(os.path.join(wav_dir, name), "rb") as file:
+                wavs.append(file.read())
+    if not wavs:
+        raise ValueError(f"No .wav files in {wav_dir}.")
+    return wavs
+
+
+def fake_asr_loader(delay_ms: float):
+    """ASR registry loader returning a pipeline that answers the next prompt"""
+    counter = iter(range(sys.maxsize))
+
+    def load(model_name, device, dtype):  # pylint: disable=unused-argument
+        def transcribe(inputs):
+            time.sleep(delay_ms / 1000)
+            return {"text": PROMPTS[next(counter) % len(PROMPTS)]}
+
+        return transcribe
+
+    return load
+
+
+def fake_synthesizer(delay_ms: float):
+    """Stand-in for gTTS: waits delay_ms and returns ~1 kB of "mp3" per word"""
+
+    def synthesize_mp3(phrase) -> bytes:
+        time.sleep(delay_ms / 1000)
+        return b"\xff\xfb" * 512 * max(1, len(phrase.split()))
+
+    return synthesize_mp3
+
+
+def build_chatbot(args):
+    """ChatBot with the fake TTS and, optionally, fake ASR wired in"""
+    # Imported after OPENAI_BASE_URL points at the stub server
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.bots.chatbot import ChatBot
+    from genai_voice.config.defaults import Config
+    from genai_voice.processing.asr_registry import ASRModelRegistry, get_asr_registry
+    from genai_voice.processing.audio import Audio
+    from genai_voice.processing.tts_cache import TTSCache
+
+    chatbot = ChatBot(enable_speakers=False, retrieval=args.retrieval)
+    registry = (
+        ASRModelRegistry(loader=fake_asr_loader(args.asr_delay_ms), warmup=False)
+        if args.fake_asr
+        else get_asr_registry()
+    )
+    # Every synthesis is a miss unless the TTS cache is under test
+    tts_cache = TTSCache(
+        cache_dir=None, max_memory_bytes=Config.TTS_CACHE_MEMORY_BYTES if args.tts_cache else 0
+    )
+    chatbot.audio = Audio(tts_cache=tts_cache, asr_registry=registry)
+    chatbot.audio.synthesize_mp3 = fake_synthesizer(args.tts_delay_ms)
+    return chatbot
+
+
+def run_turn(chatbot, wav_bytes: bytes, history: list) -> dict:
+    """One conversation turn, returns the seconds spent in each stage"""
+    # pylint: disable=import-outside-toplevel
+    from genai_voice.logger.tracing import trace
+    from genai_voice.processing.sentences import split_sentences
+
+    timings = {}
+    turn_start = start = time.perf_counter()
+    audio = chatbot.audio.convert_streamlit_audio_to_gradio_format(wav_bytes)
+    timings["decode"] = time.perf_counter() - start
+
+    # Every stage of the turn logs the same trace ID, as in the apps
+    with trace():
+        start = time.perf_counter()
+        prompt = chatbot.get_prompt_from_gradio_audio(audio)
+        timings["asr"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = chatbot.respond(prompt, history)
+        timings["llm"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        audio = chatbot.audio
+        for sentence in split_sentences(response):
+            audio.tts_cache.get_or_synthesize(sentence, audio.synthesize_mp3, engine="fake")
+        timings["tts"] = time.perf_counter() - start
+
+    timings["turn"] = time.perf_counter() - turn_start
+    history.append([prompt, response])
+    return timings
+
+
+def summarize(samples: dict) -> dict:
+    """Latency percentiles in milliseconds per stage"""
+    summary = {}
+    for stage in STAGES:
+        values = sorted(seconds * 1000 for seconds in samples[stage])
+        summary[stage] = {
+            "count": len(values),
+            "mean_ms": sum(values) / len(values) if values else 0.0,
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+        }
+    return summary
+
+
+def compare(results: dict, baseline_file: str, tolerance: float) -> list:
+    """Print p95 changes against a baseline, returns the regressions"""
+    with open(baseline_file, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    print(f"\nAgainst {baseline_file} (commit {baseline.get('commit')}):")
+    failures = []
+    for stage in STAGES:
+        old = baseline["stages"].get(stage, {}).get("p95_ms")
+        new = results["stages"][stage]["p95_ms"]
+        if not old:
+            continue
+        change = (new - old) / old
+        print(f"{stage:<8} p95 {old:9.2f} -> {new:9.2f} ms ({change:+.1%})")
+        # Sub-millisecond stages are all noise
+        if change > tolerance and new - old > 1.0:
+            failures.append(f"{stage} p95 regressed by {change:.1%}")
+    return failures
+
+
+def main() -> int:
+    """Run the benchmark, returns the process exit code"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="Turns excluded from the results")
+    parser.add_argument("--wav-dir", help="Directory of .wav fixtures, default is a synthetic clip")
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--fake-asr", action="store_true", help="Skip the Whisper model")
+    parser.add_argument("--asr-delay-ms", type=float, default=100.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tts-delay-ms", type=float, default=50.0)
+    parser.add_argument("--tts-cache", action="store_true", help="Keep the TTS memory cache")
+    parser.add_argument("--retrieval", action="store_true", help="Send retrieved context only")
+    parser.add_argument("--output", default=None, help="Results file")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms)
+    ).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    chatbot = build_chatbot(args)
+    wavs = load_wavs(args.wav_dir, args.clip_seconds)
+    samples = {stage: [] for stage in STAGES}
+    samples_lock = threading.Lock()
+
+    def conversation(index: int, turns: int) -> None:
+        history = []
+        for turn in range(turns):
+            timings = run_turn(chatbot, wavs[(index + turn) % len(wavs)], history)
+            with samples_lock:
+                for stage, seconds in timings.items():
+                    samples[stage].append(seconds)
+
+    # Load models and connections before timing
+    conversation(0, args.warmup)
+    samples = {stage: [] for stage in STAGES}
+
+    per_worker = [args.turns // args.concurrency] * args.concurrency
+    for index in range(args.turns % args.concurrency):
+        per_worker[index] += 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(conversation, range(args.concurrency), per_worker))
+    elapsed = time.perf_counter() - start
+
+    commit = git_commit()
+    results = {
+        "benchmark": "voice_pipeline",
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": vars(args),
+        "stages": summarize(samples),
+        "turns": args.turns,
+        "wall_seconds": elapsed,
+        "throughput_turns_per_second": args.turns / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "llm_requests": server.requests,
+    }
+    server.shutdown()
+
+    print(f"{'stage':<8} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for stage, summary in results["stages"].items():
+        print(
+            f"{stage:<8} {summary['p50_ms']:9.2f} {summary['p95_ms']:9.2f} "
+            f"{summary['p99_ms']:9.2f}"
+        )
+    print(f"throughput {results['throughput_turns_per_second']:.2f} turns/s")
+    print(f"peak RSS   {results['peak_rss_mb']:.1f} MB")
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"voice_pipeline-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}")
+
+    failures = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,37 @@
 """Generative AI For Voice"""
 
+import importlib
+
 from genai_voice.config.defaults import Config
 from genai_voice.logger.log_utils import log, LogLevels
-from genai_voice.models.open_ai import CustomOpenAIModel
 from genai_voice.models.model_config import ModelGenerationConfig
 from genai_voice.defintions.model_response_formats import ModelResponseFormat
 from genai_voice.defintions.prompts import BAD_PROMPT, GOOD_PROMPT, FINANCIAL_PROMPT
-from genai_voice.bots.chatbot import ChatBot
-from genai_voice.data_utils import extract_web_data
-from genai_voice.processing.audio import Audio
+
+# Names whose modules pull in heavy dependencies (openai, torch, transformers,
+# pydub, langchain, ...) are only imported on first access
+_LAZY_ATTRIBUTES = {
+    "ChatBot": ("genai_voice.bots.chatbot", "ChatBot"),
+    "CustomOpenAIModel": ("genai_voice.models.open_ai", "CustomOpenAIModel"),
+    "extract_web_data": ("genai_voice.data_utils.extract_web_data", None),
+    "Audio": ("genai_voice.processing.audio", "Audio"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = importlib.import_module(module_name)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 __all__ = [
     "ChatBot",
@@ -1,16 +1,35 @@
 """Customizable Chatbot Main Functions"""
 
+import asyncio
 import os
+import queue
 import threading
-from typing import Optional, Any
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterator, Optional, Any
 
 from dotenv import load_dotenv
 from genai_voice.processing.audio import Audio
-from genai_voice.models.open_ai import CustomOpenAIModel
+from genai_voice.processing.playback import PlaybackWorker
+from genai_voice.processing.sentences import iter_sentences, split_sentences
+from genai_voice.bots.history import HistoryMode, HistoryPolicy, format_turns
+from genai_voice.models.backends import create_backend
+from genai_voice.moderation.moderator import ModerationVerdict, get_moderator
+from genai_voice.models.resilience import deadline, remaining_seconds
+from genai_voice.models.response_cache import get_response_cache
+from genai_voice.models.router import HedgedRouter
+from genai_voice.models.scheduler import Priority, request_scope
+from genai_voice.models.tokens import TokenBudget, count_tokens
 from genai_voice.config.defaults import Config
 from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.tracing import span, trace, traced
+from genai_voice.retrieval.bm25 import get_context_retriever
+from genai_voice.retrieval.intents import IntentPrediction, get_intent_router
 
 from genai_voice.defintions.prompts import (
+    CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES,
+    SUMMARY_PROMPT,
     TRAVEL_AGENT_PROMPT,
     PROMPTS_TO_CONTEXT_DATA_FILE,
 )
@@ -27,20 +46,51 @@ class ChatBot:
         prompt: Optional[str] = None,
         context_file_path: Optional[str] = None,
         model_name: str = Config.MODEL_GPT_TURBO_NAME,
+        fallback_model_name: Optional[str] = Config.LLM_FALLBACK_MODEL_NAME,
         mic_id: Any = None,
         enable_speakers: bool = False,
         threaded: bool = False,
+        pipelined_tts: bool = False,
+        cache_responses: bool = False,
+        retrieval: bool = False,
+        retrieval_top_k: int = Config.RETRIEVAL_TOP_K,
+        retrieval_token_budget: int = Config.RETRIEVAL_TOKEN_BUDGET,
+        history_policy: Optional[HistoryPolicy] = None,
+        token_budget: Optional[TokenBudget] = None,
+        moderate: bool = False,
+        intents: bool = False,
     ) -> None:
         """
         Initialize the chatbot
-        mic_id:          The index of the mic to enable
-        enable_speakers: Whether or not audio will be played
-        threaded:        Plays back audio in seperate thread, can interfere with speech detector
+        model_name:             Model answering the user, see genai_voice.models.backends
+        fallback_model_name:    Model hedging slow requests and taking over failed ones
+        mic_id:                 The index of the mic to enable
+        enable_speakers:        Whether or not audio will be played
+        threaded:               Plays back audio on a background worker, can interfere with speech detector
+        pipelined_tts:          Speak one sentence at a time, synthesizing the next while the current plays
+        cache_responses:        Reuse responses to identical requests (see Config.RESPONSE_CACHE_*)
+        retrieval:              Only send the context chunks relevant to each turn instead of the whole file
+        retrieval_top_k:        Maximum number of context chunks per turn
+        retrieval_token_budget: Maximum number of context tokens per turn
+        history_policy:         Which part of the history is sent each turn, defaults to all of it
+        token_budget:           Per-request and per-session token limits, defaults to trimming
+                                requests to Config.TOKEN_BUDGET_REQUEST
+        moderate:               Moderate the user's prompt alongside the model call and the reply
+                                before it is returned or spoken
+        intents:                Classify each turn locally against Config.INTENT_DATA_FILE, send
+                                only that intent's examples and answer FAQ intents from templates,
+                                only for CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES
         """
         if not prompt:
             prompt = TRAVEL_AGENT_PROMPT
             context_file_path = PROMPTS_TO_CONTEXT_DATA_FILE[TRAVEL_AGENT_PROMPT]
 
+        # The intent dataset only covers the call center persona
+        if intents and prompt != CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES:
+            raise ValueError(
+                "Intent routing requires the CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES prompt."
+            )
+
         log(f"Context file: {context_file_path}", log_level=LogLevels.ON)
 
         # Ensure our context file exists
@@ -50,11 +100,15 @@ class ChatBot:
                 f"Provided context file path does not exist: {self.context_file_path}"
             )
         self.model_name = model_name
-        match self.model_name:
-            case Config.MODEL_GPT_TURBO_NAME:
-                self.__client = CustomOpenAIModel(api_key=Config.OPENAI_API_KEY)
-            case _:
-                raise ValueError(f"Model {self.model_name} is not currently supported.")
+        response_cache = get_response_cache() if cache_responses else None
+        self.__client = create_backend(self.model_name, response_cache=response_cache)
+        if fallback_model_name:
+            self.__client = HedgedRouter(
+                [
+                    self.__client,
+                    create_backend(fallback_model_name, response_cache=response_cache),
+                ]
+            )
 
         # Whether or not to use speakers
         self.__enable_speakers = enable_speakers
@@ -62,6 +116,12 @@ class ChatBot:
         # Whether or not to thread playback
         self.__threaded = threaded
 
+        # Whether or not to synthesize and play speech a sentence at a time
+        self.__pipelined_tts = pipelined_tts
+
+        # Single playback thread with a bounded queue of utterances
+        self.playback = PlaybackWorker(self.__play)
+
         # Initialize audio library
         self.audio = Audio()
 
@@ -75,50 +135,418 @@ class ChatBot:
         # Get initial prompt
         self.prompt = prompt
 
+        # Index the context once so each turn only carries what it needs
+        self.retriever = None
+        if retrieval:
+            self.retriever = get_context_retriever(
+                self.context_file_path,
+                context=self.context,
+                top_k=retrieval_top_k,
+                token_budget=retrieval_token_budget,
+            )
+
+        # Local intent classifier choosing the examples sent with each turn
+        self.intents = get_intent_router() if intents else None
+
+        # Which part of the history to send with each turn
+        self.history_policy = history_policy or HistoryPolicy(HistoryMode.FULL)
+        if (
+            self.history_policy.mode == HistoryMode.ROLLING_SUMMARY
+            and self.history_policy.summarizer is None
+        ):
+            self.history_policy.summarizer = self.summarize_turns
+        if self.history_policy.model_name is None:
+            self.history_policy.model_name = self.model_name
+
+        # Keep requests within the context window and sessions within budget
+        self.token_budget = token_budget or TokenBudget(model_name=self.model_name)
+
+        # Shared moderator, batching and caching verdicts across sessions
+        self.moderator = get_moderator() if moderate else None
+
         # Prompt template to initialize LLM
         self.llm_prompt = self.__client.build_prompt(
-            prompt=self.prompt, context=self.context
+            prompt=self.prompt, context="" if retrieval else self.context
         )
 
     def get_completion_from_messages(self, messages):
         """
-        Send the message to the specified OpenAI model
+        Send the message to the specified model
         """
         # use default config for model
         return self.__client.generate(messages=messages, config=None)
 
+    def stream_completion_from_messages(self, messages) -> Iterator[str]:
+        """
+        Send the message to the specified model and yield the reply as it arrives
+        """
+        # use default config for model
+        return self.__client.generate_stream(messages=messages, config=None)
+
+    def summarize_turns(self, previous_summary: str, turns: list) -> str:
+        """
+        Fold conversation turns into a running summary
+        """
+        return self.get_completion_from_messages(
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"PREVIOUS SUMMARY:\n{previous_summary or 'None'}\n\n"
+                    f"NEW TURNS:\n{format_turns(turns)}",
+                },
+            ]
+        )
+
     def get_context_data(self) -> str:
         """Get the data for the LLM"""
         with open(self.context_file_path, "r", encoding="utf-8") as f:
             data = "".join(line for line in f)
         return data
 
-    def respond(self, prompt, llm_history: list = None):
+    def get_system_prompt(
+        self, prompt, llm_history: list, prediction: Optional[IntentPrediction] = None
+    ) -> dict:
         """
-        Get a response based on the current history
+        System message for this turn. With a confident intent prediction it
+        only holds the examples of that intent, with retrieval enabled the
+        context chunks matching the current and previous user turn.
+        """
+        if prediction is not None and self.intents is not None:
+            context = self.intents.context(prediction)
+            if context is not None:
+                return self.__client.build_prompt(prompt=self.prompt, context=context)
+        if self.retriever is None:
+            return self.llm_prompt
+        query = f"{llm_history[-1][0]} {prompt}" if llm_history else f"{prompt}"
+        return self.__client.build_prompt(
+            prompt=self.prompt, context=self.retriever.retrieve(query)
+        )
+
+    def build_messages(
+        self,
+        prompt,
+        llm_history: list = None,
+        prediction: Optional[IntentPrediction] = None,
+    ) -> list:
+        """
+        Build the message list for the model from the current history
         """
         if not llm_history:
             log("Empty history. Creating a state list to track histories.")
             llm_history = []
-        context = [self.llm_prompt]
-        for interaction in llm_history:
-            context.append({"role": "user", "content": f"{interaction[0]}"})
-            context.append({"role": "assistant", "content": f"{interaction[1]}"})
-
+        context = [self.get_system_prompt(prompt, llm_history, prediction)]
+        context.extend(self.history_policy.to_messages(llm_history))
         context.append({"role": "user", "content": f"{prompt}"})
-        llm_response = self.get_completion_from_messages(context)
+        return context
 
+    def budget_messages(
+        self,
+        prompt,
+        llm_history: list = None,
+        session_id: Optional[str] = None,
+        prediction: Optional[IntentPrediction] = None,
+    ) -> tuple:
+        """
+        Messages for a turn fitted to the token budget, and their prompt tokens.
+        Raises TokenBudgetExceeded when they cannot be made to fit.
+        """
+        return self.token_budget.fit(
+            self.build_messages(prompt, llm_history, prediction),
+            Config.MAX_OUTPUT_TOKENS,
+            session_id,
+        )
+
+    def classify(self, prompt) -> Optional[IntentPrediction]:
+        """
+        Intent of a turn, None without intent routing. Each turn is
+        classified once and the prediction passed to template_reply and
+        budget_messages.
+        """
+        if self.intents is None:
+            return None
+        return self.intents.predict(f"{prompt}")
+
+    def template_reply(self, prediction: Optional[IntentPrediction]) -> Optional[str]:
+        """
+        Canned answer to a turn confidently classified as an FAQ intent, None
+        when the model has to answer. Templates are dataset replies, so they
+        skip the model, the token budget and moderation.
+        """
+        if prediction is None or self.intents is None:
+            return None
+        return self.intents.template_reply(prediction)
+
+    def __charge(self, session_id: Optional[str], prompt_tokens: int, llm_response: str):
+        self.token_budget.charge(
+            session_id, prompt_tokens + count_tokens(llm_response, self.model_name)
+        )
+
+    def respond(
+        self,
+        prompt,
+        llm_history: list = None,
+        session_id: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        """
+        Get a response based on the current history
+        session_id: conversation charged for the tokens of the turn
+        priority:   rate limiter class, batch jobs wait behind voice turns
+        """
+        with trace(), deadline(Config.TURN_DEADLINE_SECONDS), request_scope(
+            session_id, priority
+        ), span("turn"):
+            prediction = self.classify(prompt)
+            llm_response = self.template_reply(prediction)
+            if llm_response is not None:
+                self.speak(llm_response)
+                return llm_response
+            messages, prompt_tokens = self.budget_messages(
+                prompt, llm_history, session_id, prediction
+            )
+            # Moderation of the prompt runs while the model answers
+            input_check = self.moderator.submit(prompt) if self.moderator else None
+            llm_response = self.get_completion_from_messages(messages)
+            self.__charge(session_id, prompt_tokens, llm_response)
+            llm_response = self.__moderated(input_check, llm_response)
+            self.speak(llm_response)
+        return llm_response
+
+    async def arespond(
+        self,
+        prompt,
+        llm_history: list = None,
+        session_id: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        """
+        Get a response based on the current history without blocking the event loop
+        """
+        with trace(), deadline(Config.TURN_DEADLINE_SECONDS), request_scope(
+            session_id, priority
+        ), span("turn"):
+            prediction = self.classify(prompt)
+            llm_response = self.template_reply(prediction)
+            if llm_response is not None:
+                if self.__enable_speakers:
+                    await asyncio.to_thread(self.speak, llm_response)
+                return llm_response
+            messages, prompt_tokens = self.budget_messages(
+                prompt, llm_history, session_id, prediction
+            )
+            if self.moderator is None:
+                llm_response = await self.__client.agenerate(messages=messages, config=None)
+            else:
+                # Moderate the prompt while the model answers, a flagged
+                # prompt cancels the model call
+                answer = asyncio.ensure_future(
+                    self.__client.agenerate(messages=messages, config=None)
+                )
+                verdict = await self.moderator.acheck(prompt, remaining_seconds())
+                if verdict.flagged:
+                    answer.cancel()
+                    await asyncio.gather(answer, return_exceptions=True)
+                    self.__refused("prompt", verdict)
+                    return Config.MODERATION_REFUSAL
+                llm_response = await answer
+            self.__charge(session_id, prompt_tokens, llm_response)
+            if self.moderator is not None:
+                verdict = await self.moderator.acheck(llm_response, remaining_seconds())
+                if verdict.flagged:
+                    self.__refused("reply", verdict)
+                    llm_response = Config.MODERATION_REFUSAL
+            if self.__enable_speakers:
+                await asyncio.to_thread(self.speak, llm_response)
+        return llm_response
+
+    def respond_stream(
+        self,
+        prompt,
+        llm_history: list = None,
+        session_id: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> Iterator[str]:
+        """
+        Get a response based on the current history, yielding text deltas as
+        the model produces them. With pipelined TTS speech starts after the
+        first sentence, otherwise the full reply is spoken once it is complete.
+        """
+        # A generator may be resumed in a different context, the trace ID is
+        # kept in a context of the stream's own
+        return traced(self.__respond_stream(prompt, llm_history, session_id, priority))
+
+    def __respond_stream(
+        self, prompt, llm_history: list, session_id: Optional[str], priority: Priority
+    ) -> Iterator[str]:
+        # No deadline() here, the turn lasts as long as the reader takes.
+        # The model calls still time out per attempt.
+        with span("turn"):
+            prediction = self.classify(prompt)
+            llm_response = self.template_reply(prediction)
+            if llm_response is not None:
+                yield llm_response
+                self.speak(llm_response)
+                return
+            deltas = []
+            messages, prompt_tokens = self.budget_messages(
+                prompt, llm_history, session_id, prediction
+            )
+            if not (self.__enable_speakers and self.__pipelined_tts):
+                for delta in self.__reply_stream(prompt, messages, session_id, priority):
+                    deltas.append(delta)
+                    yield delta
+                self.__charge(session_id, prompt_tokens, "".join(deltas))
+                self.speak("".join(deltas))
+                return
+
+            # Feed the deltas to the speaker as they arrive
+            pending = queue.Queue()
+            utterance = self.playback.submit(iter(pending.get, None))
+            try:
+                for delta in self.__reply_stream(prompt, messages, session_id, priority):
+                    deltas.append(delta)
+                    pending.put(delta)
+                    yield delta
+            finally:
+                pending.put(None)
+            self.__charge(session_id, prompt_tokens, "".join(deltas))
+            if not self.__threaded:
+                utterance.wait()
+
+    def __reply_stream(
+        self, prompt, messages: list, session_id: Optional[str], priority: Priority
+    ) -> Iterator[str]:
+        """
+        Stream the reply, a moderated sentence at a time when moderation is on
+        """
+        deltas = self.__stream_scheduled(messages, session_id, priority)
+        if self.moderator is None:
+            return deltas
+        return self.__moderate_stream(self.moderator.submit(prompt), deltas)
+
+    def __moderate_stream(self, input_check: Future, deltas: Iterator[str]) -> Iterator[str]:
+        """
+        Hold back each sentence of the reply until it and the prompt passed
+        moderation. The next sentence keeps streaming in meanwhile. Sentences
+        are released as the model wrote them, whitespace included. When
+        anything is flagged the model stream is closed and the refusal is
+        yielded instead of the rest of the reply.
+        """
+        # No deadline context in a generator, the turn deadline starts here
+        expires = time.monotonic() + Config.TURN_DEADLINE_SECONDS
+        # (text of the sentence in the reply, verdict future) in reply order,
+        # the prompt comes first
+        pending = deque([("", input_check)])
+        received = []
+
+        def read() -> Iterator[str]:
+            for delta in deltas:
+                received.append(delta)
+                yield delta
+
+        def released(wait: bool) -> Optional[list]:
+            """Sentences cleared so far, None once something was flagged"""
+            cleared = []
+            while pending and (wait or pending[0][1].done()):
+                span_text, check = pending.popleft()
+                verdict = self.moderator.wait(check, expires - time.monotonic())
+                if verdict.flagged:
+                    self.__refused("reply" if span_text else "prompt", verdict)
+                    return None
+                if span_text:
+                    cleared.append(span_text)
+            return cleared
+
+        try:
+            start = 0
+            for sentence in iter_sentences(read()):
+                # iter_sentences strips, take the sentence's span of the reply instead
+                text = "".join(received)
+                end = text.index(sentence, start) + len(sentence)
+                pending.append((text[start:end], self.moderator.submit(sentence)))
+                start = end
+                cleared = released(wait=False)
+                if cleared is None:
+                    yield Config.MODERATION_REFUSAL
+                    return
+                yield from cleared
+            cleared = released(wait=True)
+            if cleared is None:
+                yield Config.MODERATION_REFUSAL
+                return
+            yield from cleared
+            # Whitespace after the last sentence
+            tail = "".join(received)[start:]
+            if tail:
+                yield tail
+        finally:
+            deltas.close()
+
+    def __stream_scheduled(
+        self, messages: list, session_id: Optional[str], priority: Priority
+    ) -> Iterator[str]:
+        """
+        Stream the reply, queued for the rate limiter as a request of the session
+        """
+        # The request is made on the first next(), nothing is yielded inside the scope
+        with request_scope(session_id, priority):
+            stream = self.stream_completion_from_messages(messages)
+            first = next(stream, None)
+        if first is None:
+            return
+        yield first
+        yield from stream
+
+    def __moderated(self, input_check: Optional[Future], llm_response: str) -> str:
+        """
+        The reply, or the refusal when the prompt or the reply is flagged
+        """
+        if input_check is None:
+            return llm_response
+        source, verdict = "prompt", self.moderator.wait(input_check, remaining_seconds())
+        if not verdict.flagged:
+            source, verdict = "reply", self.moderator.check(llm_response, remaining_seconds())
+        if verdict.flagged:
+            self.__refused(source, verdict)
+            return Config.MODERATION_REFUSAL
+        return llm_response
+
+    def __refused(self, source: str, verdict: ModerationVerdict) -> None:
+        log(
+            "Moderation flagged the %s (%s), answering with the refusal.",
+            LogLevels.ON,
+            source,
+            ", ".join(verdict.categories) or "no category",
+        )
+
+    def speak(self, llm_response):
+        """
+        Play a response on the speakers if they are enabled
+        """
         if self.__enable_speakers:
             # With threads
             if self.__threaded:
-                speaker_thread = threading.Thread(
-                    target=self.audio.communicate, args=(llm_response,)
-                )
-                speaker_thread.start()
+                self.playback.submit(llm_response)
             # Without threads
             else:
-                self.audio.communicate(llm_response)
-        return llm_response
+                self.__play(llm_response)
+
+    def __play(self, text, cancel: Optional[threading.Event] = None):
+        """
+        Synthesize and play text, or an iterable of text chunks when pipelined.
+        A set cancel event stops playback before the next sentence.
+        """
+        if self.__pipelined_tts:
+            self.audio.communicate_pipelined(text, cancel=cancel)
+        elif cancel is None:
+            self.audio.communicate(text)
+        else:
+            # One sentence at a time so a barge-in cuts the reply short
+            for sentence in split_sentences(text):
+                if cancel.is_set():
+                    return
+                self.audio.communicate(sentence)
 
     def initialize_microphone(self, mic_id):
         """
@@ -134,6 +562,14 @@ class ChatBot:
         """
         return self.audio.recognize_speech_from_mic()
 
+    def listen_streaming(self, on_transcript):
+        """
+        Transcribes speech from the microphone while the user is speaking
+        on_transcript: called with every partial and final transcript
+        return: function stopping the listener
+        """
+        return self.audio.listen_streaming(on_transcript)
+
     def communicate(self, message):
         """
         Plays a message on the speakers
@@ -153,9 +589,14 @@ class ChatBot:
         See https://www.gradio.app/guides/real-time-speech-recognition for more info.
         audio: object containing sampling frequency and raw audio data
         """
-        log(f"Getting prompt from audio device: {audio}")
         if not audio:
             return None
+        log(
+            "Getting prompt from audio: %s samples at %s Hz",
+            LogLevels.ON,
+            audio[1].shape,
+            audio[0],
+        )
         return self.audio.get_prompt_from_gradio_audio(audio)
 
     def get_prompt_from_file(self, file):
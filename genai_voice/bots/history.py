@@ -0,0 +1,171 @@
+"""Conversation history policies"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from functools import lru_cache
+from typing import Callable, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.models.tokens import count_tokens
+
+# Number of conversation summaries kept in memory
+MAX_SUMMARIES = 1024
+
+
+class HistoryMode(IntEnum):
+    """Which part of the history is sent to the model"""
+
+    FULL = 1
+    LAST_N = 2
+    TOKEN_BUDGET = 3
+    ROLLING_SUMMARY = 4
+
+
+@lru_cache(maxsize=8192)
+def turn_tokens(
+    prompt: str, response: str, model_name: str = Config.MODEL_GPT_TURBO_NAME
+) -> int:
+    """Token count of a [prompt, response] turn, computed once per turn"""
+    return count_tokens(prompt, model_name) + count_tokens(response, model_name)
+
+
+def format_turns(turns: list) -> str:
+    """Plain text transcript of [prompt, response] turns"""
+    return "\n".join(f"User: {prompt}\nAssistant: {response}" for prompt, response in turns)
+
+
+class HistoryPolicy:
+    """Selects the history sent with each turn.
+
+    FULL:            every turn
+    LAST_N:          the last max_turns turns
+    TOKEN_BUDGET:    the most recent turns fitting in token_budget tokens
+    ROLLING_SUMMARY: like TOKEN_BUDGET, with older turns replaced by a
+                     summary. Summaries are produced on a background thread,
+                     so a turn never waits for one; until the summary of the
+                     latest older turns is ready the previous one is used.
+    """
+
+    def __init__(
+        self,
+        mode: HistoryMode = HistoryMode.FULL,
+        max_turns: int = Config.HISTORY_MAX_TURNS,
+        token_budget: int = Config.HISTORY_TOKEN_BUDGET,
+        summarizer: Optional[Callable[[str, list], str]] = None,
+        model_name: Optional[str] = None,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        mode:         How the history is windowed
+        max_turns:    Number of turns kept by LAST_N
+        token_budget: Tokens of verbatim history kept by TOKEN_BUDGET and ROLLING_SUMMARY
+        summarizer:   Callable (previous summary, new turns) -> updated summary
+        model_name:   Model whose tokenizer counts the turns, ChatBot sets its own
+        """
+        self.mode = mode
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.model_name = model_name
+        self.log_level = log_level
+        self.__summaries: OrderedDict[str, str] = OrderedDict()
+        self.__pending: set = set()
+        self.__lock = threading.Lock()
+        self.__executor: Optional[ThreadPoolExecutor] = None
+
+    def to_messages(self, llm_history: list) -> list:
+        """Chat messages for the selected part of the history"""
+        summary, turns = self.select(llm_history)
+        messages = []
+        if summary:
+            messages.append(
+                {"role": "system", "content": f"Summary of the conversation so far: {summary}"}
+            )
+        for interaction in turns:
+            messages.append({"role": "user", "content": f"{interaction[0]}"})
+            messages.append({"role": "assistant", "content": f"{interaction[1]}"})
+        return messages
+
+    def select(self, llm_history: list) -> tuple:
+        """Return (summary or None, turns to send verbatim)"""
+        if not llm_history:
+            return None, []
+        match self.mode:
+            case HistoryMode.FULL:
+                return None, llm_history
+            case HistoryMode.LAST_N:
+                return None, llm_history[-self.max_turns :] if self.max_turns else []
+            case HistoryMode.TOKEN_BUDGET:
+                return None, llm_history[self.__window_start(llm_history) :]
+            case HistoryMode.ROLLING_SUMMARY:
+                start = self.__window_start(llm_history)
+                return self.__summary(llm_history, start), llm_history[start:]
+            case _:
+                raise ValueError(f"History mode {self.mode} is not supported.")
+
+    def __window_start(self, llm_history: list) -> int:
+        """Index of the oldest turn that fits in the token budget"""
+        used = 0
+        start = len(llm_history)
+        while start > 0:
+            prompt, response = llm_history[start - 1]
+            used += turn_tokens(
+                f"{prompt}", f"{response}", self.model_name or Config.MODEL_GPT_TURBO_NAME
+            )
+            if used > self.token_budget:
+                break
+            start -= 1
+        return start
+
+    def __summary(self, llm_history: list, end: int) -> Optional[str]:
+        """Latest available summary of llm_history[:end], refreshing it in the background"""
+        if end == 0 or self.summarizer is None:
+            return None
+        prefix_keys = self.__prefix_keys(llm_history, end)
+        with self.__lock:
+            # Most recent summary covering a prefix of the older turns
+            covered, summary = 0, None
+            for index in range(end, 0, -1):
+                summary = self.__summaries.get(prefix_keys[index - 1])
+                if summary is not None:
+                    self.__summaries.move_to_end(prefix_keys[index - 1])
+                    covered = index
+                    break
+            target = prefix_keys[end - 1]
+            if covered < end and target not in self.__pending:
+                self.__pending.add(target)
+                if self.__executor is None:
+                    self.__executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="history-summarizer"
+                    )
+                self.__executor.submit(
+                    self.__summarize, target, summary or "", list(llm_history[covered:end])
+                )
+        return summary
+
+    def __summarize(self, key: str, previous: str, turns: list) -> None:
+        try:
+            summary = self.summarizer(previous, turns)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            log(f"Failed to summarize conversation history: {e}", self.log_level)
+            summary = None
+        with self.__lock:
+            self.__pending.discard(key)
+            if summary:
+                self.__summaries[key] = summary
+                while len(self.__summaries) > MAX_SUMMARIES:
+                    self.__summaries.popitem(last=False)
+
+    @staticmethod
+    def __prefix_keys(llm_history: list, end: int) -> list:
+        """Keys identifying llm_history[:1], llm_history[:2], ... llm_history[:end]"""
+        digest = hashlib.sha1()
+        keys = []
+        for prompt, response in llm_history[:end]:
+            digest.update(f"{prompt}\0{response}\0".encode())
+            keys.append(digest.copy().hexdigest())
+        return keys
@@ -0,0 +1,106 @@
+"""Per-session conversation state"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+
+
+@dataclass
+class Session:
+    """Conversation history of a single browser session"""
+
+    session_id: str
+    history: list = field(default_factory=list)
+    history_chars: int = 0
+    last_active: float = field(default_factory=time.monotonic)
+
+
+class SessionManager:
+    """Keeps a separate, bounded history per session.
+
+    Each session keeps at most max_turns turns and max_history_chars
+    characters, dropping its oldest turns first. Sessions idle for longer
+    than idle_ttl_seconds are evicted, and once max_sessions is reached the
+    least recently active session makes room for a new one.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = Config.SESSION_MAX_SESSIONS,
+        max_turns: int = Config.SESSION_MAX_TURNS,
+        max_history_chars: int = Config.SESSION_MAX_HISTORY_CHARS,
+        idle_ttl_seconds: float = Config.SESSION_IDLE_TTL_SECONDS,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_history_chars = max_history_chars
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.log_level = log_level
+        self.__sessions: OrderedDict[str, Session] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__sessions)
+
+    def history(self, session_id: str) -> list:
+        """Snapshot of the session's history as [prompt, response] pairs"""
+        with self.__lock:
+            session = self.__touch(session_id)
+            return [list(turn) for turn in session.history]
+
+    def append(self, session_id: str, prompt: str, response: str) -> None:
+        """Record a turn, trimming the oldest turns to stay within the bounds.
+        The latest turn is always kept, however long it is.
+        """
+        with self.__lock:
+            session = self.__touch(session_id)
+            session.history.append([prompt, response])
+            session.history_chars += len(f"{prompt}") + len(f"{response}")
+            while len(session.history) > 1 and (
+                len(session.history) > self.max_turns
+                or session.history_chars > self.max_history_chars
+            ):
+                old_prompt, old_response = session.history.pop(0)
+                session.history_chars -= len(f"{old_prompt}") + len(f"{old_response}")
+
+    def reset(self, session_id: str) -> None:
+        """Forget a session"""
+        with self.__lock:
+            self.__sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than the TTL, returns how many were dropped"""
+        with self.__lock:
+            return self.__evict_idle(time.monotonic())
+
+    def __touch(self, session_id: str) -> Session:
+        now = time.monotonic()
+        self.__evict_idle(now)
+        session = self.__sessions.get(session_id)
+        if session is None:
+            while len(self.__sessions) >= self.max_sessions:
+                evicted, _ = self.__sessions.popitem(last=False)
+                log(f"Evicting least recently active session {evicted}.", self.log_level)
+            session = Session(session_id)
+            self.__sessions[session_id] = session
+        session.last_active = now
+        self.__sessions.move_to_end(session_id)
+        return session
+
+    def __evict_idle(self, now: float) -> int:
+        # Sessions are ordered by activity, so idle ones are at the front
+        evicted = 0
+        while self.__sessions:
+            session = next(iter(self.__sessions.values()))
+            if now - session.last_active <= self.idle_ttl_seconds:
+                break
+            self.__sessions.popitem(last=False)
+            evicted += 1
+        if evicted:
+            log(f"Evicted {evicted} idle sessions.", self.log_level)
+        return evicted
@@ -15,11 +15,101 @@ class Config:
 
     MODEL_GPT_TURBO_NAME = "gpt-4-turbo"
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    MODEL_CLAUDE_SONNET_NAME = "claude-3-5-sonnet-20240620"
+    ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     TEMPERATURE = 0.0
     TOP_P = 0.97
     TOP_K = 40
     MAX_OUTPUT_TOKENS = 2048
     WEB_SCRAPER_OUTPUT_FILE = "data/context.txt"
+    ASR_MODEL_NAME = "openai/whisper-base.en"
+    ASR_MODEL_IDLE_TTL_SECONDS = 900
+    RETRIEVAL_CHUNK_TOKENS = 200
+    RETRIEVAL_TOP_K = 5
+    RETRIEVAL_TOKEN_BUDGET = 1500
+    TTS_LANGUAGE = "en"
+    TTS_CACHE_DIR = ".cache/tts"
+    TTS_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+    TTS_CACHE_DISK_BYTES = 256 * 1024 * 1024
+    RESPONSE_CACHE_MAX_ENTRIES = 1024
+    RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+    RESPONSE_CACHE_DB = ".cache/responses.sqlite3"
+    RESPONSE_CACHE_MAX_DB_ROWS = 50000
+    HTTP_MAX_CONNECTIONS = 512
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = 128
+    HTTP_TIMEOUT_SECONDS = 60.0
+    HTTP_CONNECT_TIMEOUT_SECONDS = 5.0
+    SESSION_MAX_SESSIONS = 1000
+    SESSION_MAX_TURNS = 20
+    SESSION_MAX_HISTORY_CHARS = 16000
+    SESSION_IDLE_TTL_SECONDS = 30 * 60
+    UI_CONCURRENCY_LIMIT = 16
+    HISTORY_MAX_TURNS = 10
+    HISTORY_TOKEN_BUDGET = 2000
+    PLAYBACK_MAX_QUEUE = 2
+    VAD_FRAME_MS = 30
+    VAD_THRESHOLD_DBFS = -45.0
+    VAD_PADDING_MS = 200
+    VAD_MIN_SPEECH_MS = 90
+    ASR_SAMPLING_RATE = 16000
+    STREAMING_ASR_PARTIAL_MS = 1000
+    STREAMING_ASR_PAUSE_MS = 300
+    STREAMING_ASR_END_SILENCE_MS = 800
+    STREAMING_ASR_MAX_SEGMENT_SECONDS = 15
+    STREAMING_ASR_CHUNK_SECONDS = 1.0
+    WEB_SCRAPER_CACHE_FILE = ".cache/scraper/pages.json"
+    WEB_SCRAPER_MAX_CONCURRENCY = 16
+    WEB_SCRAPER_PER_HOST_CONCURRENCY = 4
+    WEB_SCRAPER_RETRIES = 3
+    WEB_SCRAPER_BACKOFF_SECONDS = 0.5
+    WEB_SCRAPER_TIMEOUT_SECONDS = 30.0
+    WEB_SCRAPER_SHINGLE_WORDS = 5
+    WEB_SCRAPER_DUPLICATE_THRESHOLD = 0.8
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_JSONL_FILE = os.getenv("METRICS_JSONL_FILE")
+    METRICS_JSONL_INTERVAL_SECONDS = 60.0
+    # gpt-4-turbo context window, prompt and reply together
+    TOKEN_BUDGET_REQUEST = 128000
+    # Tokens per conversation, 0 for no limit
+    TOKEN_BUDGET_SESSION = 0
+    # Model hedging the main one, None sends every request to the main model
+    LLM_FALLBACK_MODEL_NAME = os.getenv("LLM_FALLBACK_MODEL_NAME")
+    LLM_HEDGE_QUANTILE = 95
+    LLM_HEDGE_MIN_SAMPLES = 20
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS = 2.0
+    LLM_HEDGE_MIN_DELAY_SECONDS = 0.05
+    LLM_LATENCY_WINDOW = 200
+    # Deadline of a voice turn, shared by every model call made for it
+    TURN_DEADLINE_SECONDS = 45.0
+    LLM_ATTEMPT_TIMEOUT_SECONDS = 20.0
+    LLM_MAX_ATTEMPTS = 4
+    LLM_RETRY_BASE_SECONDS = 0.25
+    LLM_RETRY_MAX_SECONDS = 8.0
+    LLM_CIRCUIT_FAILURES = 5
+    LLM_CIRCUIT_RESET_SECONDS = 30.0
+    # Client-side OpenAI rate limits of the account, 0 for no limit
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    LLM_RATE_LIMIT_BURST_SECONDS = 10.0
+    MODERATION_MODEL = "omni-moderation-latest"
+    MODERATION_BATCH_WINDOW_MS = 10
+    MODERATION_MAX_BATCH = 32
+    MODERATION_CACHE_ENTRIES = 4096
+    MODERATION_REFUSAL = "I'm sorry, but I can't help with that."
+    INTENT_DATA_FILE = "call_center_prompt_with_intents_categories_context.json"
+    INTENT_TOP_K = 10
+    # Share of the nearest examples' vote needed to trust a prediction
+    INTENT_MIN_CONFIDENCE = 0.6
+    INTENT_TEMPLATE_CONFIDENCE = 0.85
+    INTENT_TOKEN_BUDGET = 1500
+    INTENT_TEMPLATE_SENTENCES = 4
+    # FAQ intents answered from the dataset without calling the model
+    INTENT_TEMPLATE_INTENTS = (
+        "check_cancellation_fee",
+        "check_payment_methods",
+        "check_refund_policy",
+    )
 
     def __repr__(self):
         return f"""
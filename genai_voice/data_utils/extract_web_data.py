@@ -1,50 +1,72 @@
 """Extract Web Data"""
 
+# langchain and playwright are only needed when scraping with a browser
+# pylint: disable=import-outside-toplevel
+
 import os
 
 from typing import Optional
-from langchain_community.document_transformers import BeautifulSoupTransformer
-from langchain_community.document_loaders import AsyncChromiumLoader
 
 from genai_voice.config.defaults import Config
 from genai_voice.logger.log_utils import log
+from genai_voice.data_utils.scraper import WebScraper, default_transform
 from genai_voice.data_utils.urls import SAMPLE_URLS, HTML_TAGS_TO_TARGET
+from genai_voice.data_utils.writer import ContextWriter
 
 # Set the user agent for http requests identification
 os.environ["USER_AGENT"] = "myagent"
 
 
-def extract_webpage_data(out_file: Optional[str]):
-    """Extract Web Page Data"""
-    if not out_file:
-        log(f"No output file, falling back to default: {Config.WEB_SCRAPER_OUTPUT_FILE}")
-        out_file = Config.WEB_SCRAPER_OUTPUT_FILE
-    if not os.path.exists(out_file):
-        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+def scrape_with_browser(urls: list, writer: ContextWriter):
+    """Render every page in headless Chromium and extract the targeted tags"""
+    from langchain_community.document_loaders import AsyncChromiumLoader
 
     # Load HTML content using AsyncChromiumLoader
-    log(f"Creating the AsyncChromiumLoader with #{len(SAMPLE_URLS)} urls...")
+    log(f"Creating the AsyncChromiumLoader with #{len(urls)} urls...")
     try:
-        loader = AsyncChromiumLoader(SAMPLE_URLS)
+        loader = AsyncChromiumLoader(urls)
         docs = loader.load()
         log("Documents scraped.")
-
-        # Transform the loaded HTML using BeautifulSoupTransformer
-        log(f"Using BeautifulSoupTransformer to extract {HTML_TAGS_TO_TARGET}.")
-        bs_transformer = BeautifulSoupTransformer()
-        docs_transformed = bs_transformer.transform_documents(
-            docs, tags_to_extract=HTML_TAGS_TO_TARGET
-        )
     except Exception as e:
         log("Failed to scrap data.")
         raise ValueError("Failed to scrap data successfully.") from e
 
-    log(f"Transformed #{len(docs_transformed)} urls.")
-    data = [doc.page_content for doc in docs_transformed]
-    data = "".join(str(x + "\n\n") for x in data)
-    log("Writing to output file.")
-    with open(out_file, "w", encoding="utf-8") as file:
-        file.write(data)
+    log(f"Extracting {HTML_TAGS_TO_TARGET}.")
+    for doc in docs:
+        url = doc.metadata.get("source")
+        writer.write(url, default_transform(doc.page_content, url))
+    log(f"Transformed #{len(docs)} urls.")
+
+
+def scrape_incremental(urls: list, writer: ContextWriter):
+    """Fetch pages concurrently, reusing cached text of unchanged pages"""
+    scraper = WebScraper()
+    results = scraper.scrape(urls, on_result=lambda result: writer.write(result.url, result.text))
+    log(f"Scraped #{len(results)} urls: {scraper.stats}")
+    if all(result.text is None for result in results):
+        raise ValueError("Failed to scrap data successfully.")
+
+
+def extract_webpage_data(out_file: Optional[str], incremental: bool = True):
+    """Extract Web Page Data
+
+    Pages are written to out_file in the order of the urls, without paragraphs
+    already written for another page, and out_file.manifest.json maps
+    each page's byte range in out_file to its url.
+
+    incremental: fetch pages over plain HTTP with the caching WebScraper,
+                 otherwise render every page again in a browser
+    """
+    if not out_file:
+        log(f"No output file, falling back to default: {Config.WEB_SCRAPER_OUTPUT_FILE}")
+        out_file = Config.WEB_SCRAPER_OUTPUT_FILE
+
+    # Pages are written in the order of SAMPLE_URLS, not as they finish
+    with ContextWriter(out_file, urls=SAMPLE_URLS) as writer:
+        if incremental:
+            scrape_incremental(SAMPLE_URLS, writer)
+        else:
+            scrape_with_browser(SAMPLE_URLS, writer)
     log(f"Successfully written data to '{out_file}'")
 
 
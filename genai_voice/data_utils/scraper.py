@@ -0,0 +1,273 @@
+"""Concurrent, incremental web scraper"""
+
+# BeautifulSoup is only needed by the default transform
+# pylint: disable=import-outside-toplevel
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from genai_voice.config.defaults import Config
+from genai_voice.data_utils.urls import HTML_TAGS_TO_TARGET
+from genai_voice.logger.log_utils import log, LogLevels
+
+# Statuses worth another attempt, anything else in 4xx will not get better
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Content types the default transform understands
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class PageStatus(IntEnum):
+    """How a page was obtained"""
+
+    FETCHED = 1  # downloaded and transformed
+    NOT_MODIFIED = 2  # server answered 304, cached text reused
+    UNCHANGED = 3  # downloaded, same content hash, cached text reused
+    STALE = 4  # fetch failed, cached text from an earlier run reused
+    FAILED = 5  # fetch failed and nothing is cached
+
+
+@dataclass
+class PageResult:
+    """Outcome of scraping one url"""
+
+    url: str
+    status: PageStatus
+    text: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+@dataclass
+class ScrapeStats:
+    """Scraper counters"""
+
+    pages: dict = field(default_factory=lambda: {status.name: 0 for status in PageStatus})
+    retries: int = 0
+    bytes_downloaded: int = 0
+
+
+def default_transform(html: str, url: str) -> str:  # pylint: disable=unused-argument
+    """Text of the targeted tags, one line per tag so paragraphs stay apart"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    lines = []
+    for element in soup.find_all(HTML_TAGS_TO_TARGET):
+        # Nested targeted tags are part of the line of their ancestor
+        if element.find_parent(HTML_TAGS_TO_TARGET) is not None:
+            continue
+        line = " ".join(element.get_text(" ").split())
+        if line:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class ScrapeCache:
+    """Validators (ETag, Last-Modified, content hash) and transformed text per url.
+
+    Stored as a single JSON file, written atomically by save().
+    """
+
+    def __init__(self, cache_file: Optional[str] = Config.WEB_SCRAPER_CACHE_FILE) -> None:
+        """
+        cache_file: JSON file holding the cache, None keeps it in memory only
+        """
+        self.cache_file = cache_file
+        self.__lock = threading.Lock()
+        self.__entries: dict = {}
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as file:
+                    self.__entries = json.load(file)
+            except (OSError, ValueError) as e:
+                log(f"Ignoring unreadable scraper cache {cache_file}: {e}")
+
+    def get(self, url: str) -> Optional[dict]:
+        """Cached entry of url"""
+        with self.__lock:
+            return self.__entries.get(url)
+
+    def put(self, url: str, entry: dict) -> None:
+        """Store the entry of url"""
+        with self.__lock:
+            self.__entries[url] = entry
+
+    def save(self) -> None:
+        """Write the cache to disk"""
+        if not self.cache_file:
+            return
+        with self.__lock:
+            data = json.dumps(self.__entries)
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(tmp_file, self.cache_file)
+
+
+class WebScraper:
+    """Fetches pages concurrently and only re-transforms the ones that changed.
+
+    At most max_concurrency requests are in flight, and at most
+    per_host_concurrency to the same host. Each url is retried on its own,
+    so a failing page never aborts the others. Conditional requests use the
+    cached ETag and Last-Modified; a page downloaded again with an unchanged
+    content hash reuses its cached text without being transformed.
+    """
+
+    def __init__(
+        self,
+        transform: Callable[[str, str], str] = default_transform,
+        cache: Optional[ScrapeCache] = None,
+        max_concurrency: int = Config.WEB_SCRAPER_MAX_CONCURRENCY,
+        per_host_concurrency: int = Config.WEB_SCRAPER_PER_HOST_CONCURRENCY,
+        retries: int = Config.WEB_SCRAPER_RETRIES,
+        backoff_seconds: float = Config.WEB_SCRAPER_BACKOFF_SECONDS,
+        timeout_seconds: float = Config.WEB_SCRAPER_TIMEOUT_SECONDS,
+        accept_content_types: Optional[tuple] = HTML_CONTENT_TYPES,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        transform:            Callable (html, url) -> text kept for the url
+        cache:                Cache of earlier runs, defaults to Config.WEB_SCRAPER_CACHE_FILE
+        max_concurrency:      Requests in flight
+        per_host_concurrency: Requests in flight to a single host
+        retries:              Extra attempts per url after a failure
+        backoff_seconds:      Delay before the first retry, doubled for each next one
+        timeout_seconds:      Timeout of a single request
+        accept_content_types: Content types passed to transform, other pages fail without
+                              retries. None accepts every page
+        """
+        self.transform = transform
+        self.cache = cache if cache is not None else ScrapeCache()
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.accept_content_types = accept_content_types
+        self.log_level = log_level
+        self.stats = ScrapeStats()
+
+    def scrape(
+        self, urls: list, on_result: Optional[Callable[[PageResult], None]] = None
+    ) -> list:
+        """Scrape urls, returns a PageResult per url in the same order
+
+        on_result: called with each result as soon as its page is done
+        """
+        return asyncio.run(self.ascrape(urls, on_result))
+
+    async def ascrape(
+        self, urls: list, on_result: Optional[Callable[[PageResult], None]] = None
+    ) -> list:
+        """Async version of scrape"""
+        limit = asyncio.Semaphore(self.max_concurrency)
+        hosts: dict = {}
+        headers = {"User-Agent": os.environ.get("USER_AGENT", "genai-voice")}
+        async with httpx.AsyncClient(
+            headers=headers,
+            timeout=self.timeout_seconds,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency),
+        ) as client:
+
+            async def scrape_url(url: str) -> PageResult:
+                host = urlsplit(url).netloc
+                if host not in hosts:
+                    hosts[host] = asyncio.Semaphore(self.per_host_concurrency)
+                # Host first, so urls of a busy host do not hold global slots
+                async with hosts[host], limit:
+                    result = await self.__scrape_url(client, url)
+                self.stats.pages[result.status.name] += 1
+                log(f"{result.status.name}: {url}", self.log_level)
+                if on_result is not None:
+                    on_result(result)
+                return result
+
+            # Each url is fetched once however often it is listed
+            unique = list(dict.fromkeys(urls))
+            results = dict(zip(unique, await asyncio.gather(*map(scrape_url, unique))))
+        self.cache.save()
+        return [results[url] for url in urls]
+
+    async def __scrape_url(self, client: httpx.AsyncClient, url: str) -> PageResult:
+        cached = self.cache.get(url)
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = await client.get(url, headers=self.__validators(cached))
+                if response.status_code in RETRY_STATUS_CODES:
+                    raise httpx.HTTPStatusError(
+                        f"Server answered {response.status_code}",
+                        request=response.request,
+                        response=response,
+                    )
+                if response.status_code == 304 and cached:
+                    return PageResult(url, PageStatus.NOT_MODIFIED, cached["text"], None, attempts)
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+                if self.accept_content_types is not None and (
+                    content_type.lower() not in self.accept_content_types
+                ):
+                    error = f"Unsupported content type {content_type or 'none'}"
+                    log(f"Skipping {url}: {error}", self.log_level)
+                    return PageResult(url, PageStatus.FAILED, None, error, attempts)
+                return await self.__update(url, response, cached, attempts)
+            except httpx.HTTPError as e:
+                retry = attempts <= self.retries and (
+                    not isinstance(e, httpx.HTTPStatusError)
+                    or e.response.status_code in RETRY_STATUS_CODES
+                )
+                if retry:
+                    self.stats.retries += 1
+                    await asyncio.sleep(self.backoff_seconds * 2 ** (attempts - 1))
+                    continue
+                log(f"Failed to scrape {url} after {attempts} attempts: {e}", self.log_level)
+                if cached:
+                    return PageResult(url, PageStatus.STALE, cached["text"], str(e), attempts)
+                return PageResult(url, PageStatus.FAILED, None, str(e), attempts)
+
+    async def __update(
+        self, url: str, response: httpx.Response, cached: Optional[dict], attempts: int
+    ) -> PageResult:
+        """Transform a downloaded page unless its content is unchanged"""
+        self.stats.bytes_downloaded += len(response.content)
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if cached and cached.get("content_hash") == content_hash:
+            status, text = PageStatus.UNCHANGED, cached["text"]
+        else:
+            # BeautifulSoup is CPU bound, keep the event loop fetching meanwhile
+            status = PageStatus.FETCHED
+            text = await asyncio.to_thread(self.transform, response.text, url)
+        self.cache.put(
+            url,
+            {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_hash": content_hash,
+                "text": text,
+            },
+        )
+        return PageResult(url, status, text, None, attempts)
+
+    @staticmethod
+    def __validators(cached: Optional[dict]) -> dict:
+        """Conditional request headers for a cached page"""
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
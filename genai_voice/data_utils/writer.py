@@ -0,0 +1,175 @@
+"""Streaming context file writer"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class WriterStats:
+    """Writer counters"""
+
+    documents: int = 0
+    paragraphs: int = 0
+    duplicates: int = 0
+    bytes_written: int = 0
+    bytes_dropped: int = 0
+
+
+def manifest_path(out_file: str) -> str:
+    """Manifest file written next to out_file"""
+    return f"{os.path.splitext(out_file)[0]}.manifest.json"
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+class ContextWriter:
+    """Writes scraped documents to the context file as they arrive.
+
+    When the urls are given up front, documents are written in their order
+    whatever order they arrive in: each one waits until those listed before
+    it are done, so the same pages always give the same bytes.
+
+    Each document is split into paragraphs (one per line) and a paragraph
+    is dropped when it was already written for another page: either the
+    same words, or at least duplicate_threshold of its word shingles were
+    seen before. This removes navigation, footers and other boilerplate
+    repeated on every page. Output goes to a temporary file that replaces
+    out_file on close(), together with a manifest mapping the byte range
+    of every document in out_file to its url.
+    """
+
+    def __init__(
+        self,
+        out_file: str,
+        shingle_words: int = Config.WEB_SCRAPER_SHINGLE_WORDS,
+        duplicate_threshold: float = Config.WEB_SCRAPER_DUPLICATE_THRESHOLD,
+        urls: Optional[list] = None,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        out_file:            Context file to write
+        urls:                Order of the documents in out_file, defaults to arrival order
+        shingle_words:       Words per shingle used to find near duplicates
+        duplicate_threshold: Fraction of seen shingles making a paragraph a duplicate
+        """
+        self.out_file = out_file
+        self.manifest_file = manifest_path(out_file)
+        self.shingle_words = max(1, shingle_words)
+        self.duplicate_threshold = duplicate_threshold
+        self.log_level = log_level
+        self.stats = WriterStats()
+        self.__paragraphs: set = set()
+        self.__shingles: set = set()
+        self.__manifest: list = []
+        self.__offset = 0
+        # Documents waiting for the ones listed before them
+        self.__order = list(dict.fromkeys(urls)) if urls is not None else None
+        self.__next = 0
+        self.__waiting: dict = {}
+        os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+        self.__tmp_file = f"{out_file}.tmp"
+        self.__file = open(self.__tmp_file, "wb")  # pylint: disable=consider-using-with
+
+    def __enter__(self) -> "ContextWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, url: str, text: Optional[str]) -> None:
+        """Append the new paragraphs of a document, in the order of urls when given.
+        Report failed pages too (text None) so the ones after them are not held back.
+        """
+        if self.__order is None:
+            self.__append(url, text)
+            return
+        self.__waiting[url] = text
+        while self.__next < len(self.__order) and self.__order[self.__next] in self.__waiting:
+            ready = self.__order[self.__next]
+            self.__append(ready, self.__waiting.pop(ready))
+            self.__next += 1
+
+    def __append(self, url: str, text: Optional[str]) -> None:
+        if not text:
+            return
+        kept = []
+        for paragraph in text.splitlines():
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            self.stats.paragraphs += 1
+            if self.__is_duplicate(paragraph):
+                self.stats.duplicates += 1
+                self.stats.bytes_dropped += len(paragraph.encode()) + 1
+            else:
+                kept.append(paragraph)
+        self.stats.documents += 1
+        if not kept:
+            return
+        data = ("\n".join(kept) + "\n\n").encode()
+        self.__file.write(data)
+        self.__manifest.append(
+            {
+                "url": url,
+                "start": self.__offset,
+                "end": self.__offset + len(data),
+                "paragraphs": len(kept),
+            }
+        )
+        self.__offset += len(data)
+        self.stats.bytes_written += len(data)
+
+    def close(self) -> None:
+        """Replace out_file and its manifest with what was written"""
+        if self.__file.closed:
+            return
+        # Pages never reported are skipped, unlisted ones go last by url
+        for url in sorted(self.__waiting, key=str):
+            self.__append(url, self.__waiting[url])
+        self.__waiting.clear()
+        self.__file.close()
+        os.replace(self.__tmp_file, self.out_file)
+        tmp_manifest = f"{self.manifest_file}.tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as file:
+            json.dump(self.__manifest, file, indent=2)
+        os.replace(tmp_manifest, self.manifest_file)
+        log(f"Wrote {self.out_file}: {self.stats}", self.log_level)
+
+    def abort(self) -> None:
+        """Discard what was written, out_file is left untouched"""
+        if self.__file.closed:
+            return
+        self.__file.close()
+        os.remove(self.__tmp_file)
+
+    def __is_duplicate(self, paragraph: str) -> bool:
+        words = _WORD.findall(paragraph.lower())
+        key = _hash(" ".join(words))
+        if key in self.__paragraphs:
+            return True
+        shingles = {
+            _hash(" ".join(words[i : i + self.shingle_words]))
+            for i in range(max(1, len(words) - self.shingle_words + 1))
+        }
+        # Short paragraphs only match exactly, a shared phrase is not enough
+        if len(words) >= 2 * self.shingle_words:
+            seen = len(shingles & self.__shingles)
+            if seen >= self.duplicate_threshold * len(shingles):
+                return True
+        self.__paragraphs.add(key)
+        self.__shingles |= shingles
+        return False
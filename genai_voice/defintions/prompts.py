@@ -150,6 +150,13 @@ Use the following guidelines:
 
 """
 
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a user and an assistant.
+Update the PREVIOUS SUMMARY with the NEW TURNS below.
+Keep every fact, preference, name, number and open question the assistant will need later.
+Use at most five sentences of plain text.
+"""
+
 BAD_PROMPT = "kill somebody"
 
 GOOD_PROMPT = "love somebody"
@@ -18,7 +18,17 @@ class LogLevels(IntEnum):
     ON = 1
 
 
-def log(message, log_level: LogLevels = LogLevels.ON):
-    """Generalized custom logger"""
-    if log_level > LogLevels.OFF:
-        _internal_logger.log(logging.INFO, message)
+def log(message, log_level: LogLevels = LogLevels.ON, *args):
+    """Generalized custom logger
+
+    Nothing is formatted when logging is off. For messages that are costly
+    to build, pass %-style args or a callable returning the message instead
+    of an f-string:
+
+        log("Transcribed %d samples", log_level, len(audio))
+        log(lambda: f"Config: {config}", log_level)
+    """
+    if log_level > LogLevels.OFF and _internal_logger.isEnabledFor(logging.INFO):
+        if callable(message):
+            message = message()
+        _internal_logger.log(logging.INFO, message, *args)
@@ -0,0 +1,226 @@
+"""Counters and histograms with Prometheus and JSON-lines export"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log
+
+# Latency buckets in seconds, from a cached TTS phrase to a slow LLM answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter, one value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self.__values: dict = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add amount to the counter of the label set"""
+        key = _label_key(labels)
+        with self.__lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value of the label set"""
+        with self.__lock:
+            return self.__values.get(_label_key(labels), 0)
+
+    def samples(self) -> list:
+        """(suffix, labels, value) of every series"""
+        with self.__lock:
+            return [("", key, value) for key, value in self.__values.items()]
+
+    def snapshot(self) -> list:
+        """JSON friendly values"""
+        with self.__lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.__values.items()]
+
+
+class Histogram:
+    """Distribution of observations in fixed buckets, one per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.__series: dict = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation"""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            series = self.__series.get(key)
+            if series is None:
+                # Per-bucket counts, the last one is +Inf; then sum and count
+                series = self.__series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        """Number of observations of the label set"""
+        with self.__lock:
+            series = self.__series.get(_label_key(labels))
+            return series[2] if series else 0
+
+    def samples(self) -> list:
+        """(suffix, labels, value) of every series, buckets are cumulative"""
+        samples = []
+        with self.__lock:
+            for key, (counts, total, count) in self.__series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    samples.append(("_bucket", key + (("le", le),), cumulative))
+                samples.append(("_sum", key, total))
+                samples.append(("_count", key, count))
+        return samples
+
+    def snapshot(self) -> list:
+        """JSON friendly values"""
+        with self.__lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "buckets": dict(zip([*map(repr, self.buckets), "+Inf"], counts)),
+                    "sum": total,
+                    "count": count,
+                }
+                for key, (counts, total, count) in self.__series.items()
+            ]
+
+
+class MetricsRegistry:
+    """Named metrics of the process"""
+
+    def __init__(self) -> None:
+        self.__metrics: dict = {}
+        self.__lock = threading.Lock()
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        """Counter called name, created on first use"""
+        return self.__get(name, lambda: Counter(name, description), Counter)
+
+    def histogram(
+        self, name: str, description: str = "", buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Histogram called name, created on first use"""
+        return self.__get(name, lambda: Histogram(name, description, buckets), Histogram)
+
+    def to_prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, key, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Every metric as JSON friendly values"""
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return {
+            metric.name: {"type": metric.kind, "series": metric.snapshot()} for metric in metrics
+        }
+
+    def write_jsonl(self, path: str) -> None:
+        """Append a timestamped snapshot as one JSON line"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        line = json.dumps({"timestamp": time.time(), "metrics": self.snapshot()})
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+    def __get(self, name: str, factory, kind: type):
+        with self.__lock:
+            metric = self.__metrics.get(name)
+            if metric is None:
+                metric = self.__metrics[name] = factory()
+        if not isinstance(metric, kind):
+            raise ValueError(f"Metric {name} is a {metric.kind}, not a {kind.kind}.")
+        return metric
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry"""
+    global _metrics  # pylint: disable=global-statement
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
+
+
+class _PrometheusHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the metrics of the process"""
+        data = get_metrics().to_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_metrics_exporters(
+    port: int = Config.METRICS_PORT,
+    jsonl_file: Optional[str] = Config.METRICS_JSONL_FILE,
+    interval_seconds: float = Config.METRICS_JSONL_INTERVAL_SECONDS,
+    host: str = Config.METRICS_HOST,
+) -> None:
+    """Serve Prometheus metrics on host:port and/or append them to jsonl_file
+    every interval_seconds, each only when configured. The metrics are only
+    served locally unless host says otherwise.
+    """
+    if port:
+        server = ThreadingHTTPServer((host, port), _PrometheusHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        log(f"Serving Prometheus metrics on {host}:{port}.")
+    if jsonl_file:
+
+        def export():
+            while True:
+                time.sleep(interval_seconds)
+                get_metrics().write_jsonl(jsonl_file)
+
+        threading.Thread(target=export, name="metrics-jsonl", daemon=True).start()
+        log(f"Writing metrics to {jsonl_file} every {interval_seconds}s.")
@@ -0,0 +1,90 @@
+"""Per-request trace IDs and timing spans"""
+
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.metrics import get_metrics
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    """Random 16 hex digit trace ID"""
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the request being handled, if any"""
+    return _trace_id.get()
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[str]:
+    """Run a request under a trace ID.
+
+    Spans inside, including those in asyncio tasks and asyncio.to_thread
+    calls started inside, are tagged with it. Nested calls keep the
+    outer trace ID.
+    """
+    outer = _trace_id.get()
+    trace_id = trace_id or outer or new_trace_id()
+    token = _trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _trace_id.reset(token)
+
+
+def traced(iterator: Iterator) -> Iterator:
+    """Iterate under the caller's trace ID, or a new one without it.
+
+    Generators can be resumed from other contexts (e.g. a new thread per
+    chunk), so trace() cannot wrap their yields. Every step of iterator runs
+    in one context of its own, copied from the caller's when traced is called.
+    """
+    context = contextvars.copy_context()
+    if context.get(_trace_id) is None:
+        context.run(_trace_id.set, new_trace_id())
+    return _steps(context, iterator)
+
+
+def _steps(context: contextvars.Context, iterator: Iterator) -> Iterator:
+    try:
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            context.run(close)
+
+
+@contextmanager
+def span(stage: str, log_level: LogLevels = LogLevels.ON) -> Iterator[None]:
+    """Time a pipeline stage (asr, retrieval, llm, tts, playback, ...).
+
+    The duration goes to the genai_voice_stage_seconds histogram, failures
+    to genai_voice_stage_errors_total, both labelled with the stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        get_metrics().counter(
+            "genai_voice_stage_errors_total", "Failed pipeline stages"
+        ).inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        get_metrics().histogram(
+            "genai_voice_stage_seconds", "Duration of pipeline stages"
+        ).observe(elapsed, stage=stage)
+        log("[%s] %s took %.1f ms", log_level, current_trace_id() or "-", stage, elapsed * 1000)
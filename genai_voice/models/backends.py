@@ -0,0 +1,65 @@
+"""Registry of model backends
+
+Every backend has the interface of CustomOpenAIModel: model_name, config,
+build_prompt(prompt, context), generate(messages, config),
+agenerate(messages, config) and generate_stream(messages, config).
+Backends subclassing ChatModel (genai_voice.models.chat_model) get its
+response cache, coalescing, rate limiting and retries and only translate
+requests and responses of their API.
+Backends are registered under a model name prefix and built from the
+full model name with create_backend.
+"""
+
+# Backend modules are imported when their first model is created
+# pylint: disable=import-outside-toplevel
+
+import threading
+from typing import Any, Callable, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.models.response_cache import ResponseCache
+
+_backends: dict = {}
+_backends_lock = threading.Lock()
+
+
+def register_backend(prefix: str, factory: Callable[..., Any]) -> None:
+    """Build models whose name starts with prefix with factory(model_name, **kwargs)"""
+    with _backends_lock:
+        _backends[prefix] = factory
+
+
+def supported_prefixes() -> list:
+    """Model name prefixes with a registered backend"""
+    with _backends_lock:
+        return sorted(_backends)
+
+
+def create_backend(
+    model_name: str, response_cache: Optional[ResponseCache] = None, **kwargs
+) -> Any:
+    """Backend for model_name, the longest matching prefix wins"""
+    with _backends_lock:
+        matches = [prefix for prefix in _backends if model_name.startswith(prefix)]
+        factory = _backends[max(matches, key=len)] if matches else None
+    if factory is None:
+        raise ValueError(f"Model {model_name} is not currently supported.")
+    return factory(model_name, response_cache=response_cache, **kwargs)
+
+
+def _openai_backend(model_name: str, **kwargs) -> Any:
+    from genai_voice.models.open_ai import CustomOpenAIModel
+
+    kwargs.setdefault("api_key", Config.OPENAI_API_KEY)
+    return CustomOpenAIModel(model_name_and_version=model_name, **kwargs)
+
+
+def _claude_backend(model_name: str, **kwargs) -> Any:
+    from genai_voice.models.claude_sonnet import CustomClaudeSonnetModel
+
+    kwargs.setdefault("api_key", Config.ANTHROPIC_API_KEY)
+    return CustomClaudeSonnetModel(model_name_and_version=model_name, **kwargs)
+
+
+register_backend("gpt", _openai_backend)
+register_backend("claude", _claude_backend)
@@ -0,0 +1,314 @@
+"""Request pipeline shared by the model backends"""
+
+import time
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.logger.tracing import span
+from genai_voice.models.model_config import ModelGenerationConfig
+from genai_voice.models.resilience import (
+    CircuitBreaker,
+    DeadlineExceeded,
+    RetryingCaller,
+    RetryPolicy,
+    attempt_timeout,
+    deadline_at,
+)
+from genai_voice.models.response_cache import ResponseCache
+from genai_voice.models.scheduler import RateLimitScheduler, get_scheduler
+from genai_voice.models.singleflight import SingleFlight
+from genai_voice.models.tokens import count_tokens, messages_tokens, record_usage
+
+# Prompt and completion tokens reported by an API
+Usage = Tuple[int, int]
+
+
+class ChatModel:
+    """Response cache, coalescing, rate limiting, retries and token usage of
+    a chat model. Backends subclass it and only translate requests and
+    responses of their API in the _request_kwargs, _create, _acreate,
+    _reply, _open_stream and _stream_chunks hooks.
+    """
+
+    # Name of the API in errors
+    vendor = "LLM"
+
+    def __init__(
+        self,
+        model_name_and_version: str,
+        is_retryable: Callable[[BaseException], bool],
+        model_seed: int = 0,
+        log_level: LogLevels = LogLevels.ON,
+        response_cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        coalesce: bool = False,
+    ) -> None:
+        """
+        is_retryable: Whether an error of the API is transient
+        retry_policy: Attempts, per-attempt timeout and backoff of each call
+        scheduler:    Rate limiter requests wait for, defaults to the one of the model
+                      when Config.LLM_REQUESTS_PER_MINUTE or LLM_TOKENS_PER_MINUTE is set
+        coalesce:     Share one call between identical deterministic requests in flight
+        """
+        self.log_level = log_level
+        self.response_cache = response_cache
+        self.model_name_and_version = model_name_and_version
+        self.model_config = ModelGenerationConfig()
+        self.model_config.generation["temperature"] = Config.TEMPERATURE
+        self.model_config.generation["top_p"] = Config.TOP_P
+        self.model_config.generation["top_k"] = Config.TOP_K
+        self.model_config.generation["max_output_tokens"] = Config.MAX_OUTPUT_TOKENS
+        self.model_config.generation["seed"] = model_seed
+        self.scheduler = scheduler or get_scheduler(model_name_and_version)
+        self.flights = SingleFlight(model_name_and_version) if coalesce else None
+        # Retries are ours: they honour the deadline and feed the circuit breaker
+        self.caller = RetryingCaller(
+            is_retryable,
+            policy=retry_policy,
+            breaker=CircuitBreaker(model_name_and_version, log_level=log_level),
+            log_level=log_level,
+        )
+
+    @property
+    def config(self) -> ModelGenerationConfig:
+        """Config property"""
+        return self.model_config
+
+    @property
+    def model_name(self) -> str:
+        """Model name property"""
+        return self.model_name_and_version
+
+    def _request_kwargs(self, messages: list, config: ModelGenerationConfig) -> dict:
+        """Arguments of a request of the API"""
+        raise NotImplementedError
+
+    def _create(self, request: dict, timeout: float) -> Any:
+        """Make a request, returns the response"""
+        raise NotImplementedError
+
+    async def _acreate(self, request: dict, timeout: float) -> Any:
+        """Make a request on the running event loop, returns the response"""
+        raise NotImplementedError
+
+    def _reply(self, response: Any) -> Tuple[Optional[str], Optional[Usage]]:
+        """Text and usage of a response, raises ValueError when it has no content"""
+        raise NotImplementedError
+
+    def _open_stream(self, request: dict, timeout: float) -> Any:
+        """Open a streamed request, returns a stream with a close() method"""
+        raise NotImplementedError
+
+    def _stream_chunks(self, stream: Any) -> Iterator[Tuple[Optional[str], Optional[Usage]]]:
+        """Text delta and usage of each chunk of a stream, either can be None"""
+        raise NotImplementedError
+
+    def __request(self, messages: list, config: Optional[ModelGenerationConfig]):
+        """Request arguments and the tokens the rate limits count for it: its prompt
+        and maximum reply"""
+        if not messages:
+            raise ValueError("Messages are empty.")
+        if not config:
+            config = self.model_config
+        log("%s", self.log_level, config)
+        estimated_tokens = (
+            messages_tokens(messages, self.model_name_and_version)
+            + config.generation["max_output_tokens"]
+        )
+        return self._request_kwargs(messages, config), estimated_tokens
+
+    def __request_key(self, messages: list, config: Optional[ModelGenerationConfig]):
+        """Hash of a deterministic request, None when responses may differ"""
+        if not config:
+            config = self.model_config
+        if not ResponseCache.is_cacheable(config):
+            return None
+        return ResponseCache.key(self.model_name_and_version, messages, config)
+
+    def __cache_key(self, messages: list, config: Optional[ModelGenerationConfig]):
+        """Response cache key, None when the request must not be cached"""
+        if self.response_cache is None:
+            return None
+        return self.__request_key(messages, config)
+
+    def __flight_key(self, messages: list, config: Optional[ModelGenerationConfig]):
+        """Key identical requests in flight share a call by, None to never share"""
+        if self.flights is None:
+            return None
+        return self.__request_key(messages, config)
+
+    def __cached(self, cache_key: Optional[str]) -> Optional[str]:
+        if not cache_key:
+            return None
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            log("Serving response from cache.", self.log_level)
+        return cached
+
+    def __acquire(self, estimated_tokens: int, timeout: float) -> float:
+        """Wait for the rate limiter before an attempt, returns the attempt timeout
+        left after waiting. Every attempt, retries included, goes through the
+        limiter, and a failed attempt keeps its tokens, so a burst of 429s
+        slows down with the limiter instead of retrying at full speed.
+        """
+        if self.scheduler is None:
+            return timeout
+        self.scheduler.acquire(estimated_tokens)
+        return attempt_timeout(timeout)
+
+    async def __aacquire(self, estimated_tokens: int, timeout: float) -> float:
+        """Wait for the rate limiter without blocking the event loop, see __acquire"""
+        if self.scheduler is None:
+            return timeout
+        await self.scheduler.aacquire(estimated_tokens)
+        return attempt_timeout(timeout)
+
+    def __record_usage(
+        self,
+        messages: list,
+        usage: Optional[Usage],
+        content: Optional[str],
+        estimated_tokens: int,
+    ) -> None:
+        """Token usage reported by the API, or counted when it is missing"""
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage
+            record_usage(self.model_name_and_version, prompt_tokens, completion_tokens)
+        else:
+            prompt_tokens = messages_tokens(messages, self.model_name_and_version)
+            completion_tokens = count_tokens(content or "", self.model_name_and_version)
+            record_usage(
+                self.model_name_and_version, prompt_tokens, completion_tokens, source="estimate"
+            )
+        if self.scheduler is not None:
+            self.scheduler.settle(estimated_tokens, prompt_tokens + completion_tokens)
+
+    def __finish(
+        self, messages: list, response: Any, cache_key: Optional[str], estimated_tokens: int
+    ) -> Optional[str]:
+        """Text of a response, recording its usage and caching it"""
+        content, usage = self._reply(response)
+        self.__record_usage(messages, usage, content, estimated_tokens)
+        if cache_key and content:
+            self.response_cache.put(cache_key, content)
+        return content
+
+    def generate(self, messages: list, config: Optional[ModelGenerationConfig]):
+        """Send the message to the model to get a response"""
+        request, estimated_tokens = self.__request(messages, config)
+        cache_key = self.__cache_key(messages, config)
+        cached = self.__cached(cache_key)
+        if cached is not None:
+            return cached
+        flight_key = self.__flight_key(messages, config)
+        if flight_key:
+            return self.flights.do(
+                flight_key,
+                lambda: self.__generate(request, messages, cache_key, estimated_tokens),
+            )
+        return self.__generate(request, messages, cache_key, estimated_tokens)
+
+    def __generate(
+        self, request: dict, messages: list, cache_key: Optional[str], estimated_tokens: int
+    ) -> Optional[str]:
+        """One model call"""
+
+        def attempt(timeout: float) -> Any:
+            timeout = self.__acquire(estimated_tokens, timeout)
+            return self._create(request, timeout)
+
+        with span("llm", self.log_level):
+            response = self.caller.call(attempt)
+        return self.__finish(messages, response, cache_key, estimated_tokens)
+
+    async def agenerate(
+        self, messages: list, config: Optional[ModelGenerationConfig]
+    ) -> Optional[str]:
+        """Send the message to the model to get a response without blocking the event loop"""
+        request, estimated_tokens = self.__request(messages, config)
+        cache_key = self.__cache_key(messages, config)
+        cached = self.__cached(cache_key)
+        if cached is not None:
+            return cached
+        flight_key = self.__flight_key(messages, config)
+        if flight_key:
+            return await self.flights.ado(
+                flight_key,
+                lambda: self.__agenerate(request, messages, cache_key, estimated_tokens),
+            )
+        return await self.__agenerate(request, messages, cache_key, estimated_tokens)
+
+    async def __agenerate(
+        self, request: dict, messages: list, cache_key: Optional[str], estimated_tokens: int
+    ) -> Optional[str]:
+        """One model call on the running event loop"""
+
+        async def attempt(timeout: float) -> Any:
+            timeout = await self.__aacquire(estimated_tokens, timeout)
+            return await self._acreate(request, timeout)
+
+        with span("llm", self.log_level):
+            response = await self.caller.acall(attempt)
+        return self.__finish(messages, response, cache_key, estimated_tokens)
+
+    def generate_stream(
+        self, messages: list, config: Optional[ModelGenerationConfig]
+    ) -> Iterator[str]:
+        """Send the message to the model and yield the response text as it arrives"""
+        request, estimated_tokens = self.__request(messages, config)
+        cache_key = self.__cache_key(messages, config)
+        cached = self.__cached(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        flight_key = self.__flight_key(messages, config)
+        if flight_key:
+            yield from self.flights.stream(
+                flight_key,
+                lambda: self.__generate_stream(request, messages, cache_key, estimated_tokens),
+            )
+            return
+        yield from self.__generate_stream(request, messages, cache_key, estimated_tokens)
+
+    def __generate_stream(
+        self, request: dict, messages: list, cache_key: Optional[str], estimated_tokens: int
+    ) -> Iterator[str]:
+        """One streamed model call"""
+
+        def attempt(timeout: float) -> Any:
+            timeout = self.__acquire(estimated_tokens, timeout)
+            return self._open_stream(request, timeout)
+
+        with span("llm", self.log_level):
+            start = time.perf_counter()
+            stream_deadline = deadline_at()
+            # Only opening the stream is retried, text may already be out after that
+            stream = self.caller.call(attempt)
+            deltas = []
+            usage = None
+            try:
+                for delta, chunk_usage in self._stream_chunks(stream):
+                    if stream_deadline is not None and time.monotonic() > stream_deadline:
+                        raise DeadlineExceeded("Deadline exceeded while streaming.")
+                    if chunk_usage is not None:
+                        usage = chunk_usage
+                    if not delta:
+                        continue
+                    if not deltas:
+                        get_metrics().histogram(
+                            "genai_voice_llm_first_token_seconds",
+                            "Time to the first streamed token",
+                        ).observe(time.perf_counter() - start)
+                    deltas.append(delta)
+                    yield delta
+            finally:
+                stream.close()
+        if not deltas:
+            raise ValueError(f"{self.vendor} didn't return any content.")
+        self.__record_usage(messages, usage, "".join(deltas), estimated_tokens)
+        # Only complete responses are cached
+        if cache_key:
+            self.response_cache.put(cache_key, "".join(deltas))
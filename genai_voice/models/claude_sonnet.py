@@ -1,7 +1,132 @@
-class CustomClaudeSonnetModel:
-    
-    def build_prompt(self):
-        pass 
+"""LLM - Anthropic Claude models"""
 
-    def generate(self):
-        pass 
\ No newline at end of file
+# anthropic is optional and only imported when a Claude model is used
+# pylint: disable=import-outside-toplevel
+
+from typing import Any, Iterator, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.models.chat_model import ChatModel
+from genai_voice.models.model_config import ModelGenerationConfig
+from genai_voice.models.resilience import RETRY_STATUS_CODES, RetryPolicy
+from genai_voice.models.response_cache import ResponseCache
+from genai_voice.models.scheduler import RateLimitScheduler
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an Anthropic error is transient: timeouts, lost connections, 429, 5xx and 529"""
+    import anthropic
+
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in RETRY_STATUS_CODES
+
+
+class CustomClaudeSonnetModel(ChatModel):
+    """LLM backed by the Anthropic messages API, same interface as CustomOpenAIModel"""
+
+    vendor = "Anthropic"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = Config.ANTHROPIC_API_KEY,
+        model_name_and_version: str = Config.MODEL_CLAUDE_SONNET_NAME,
+        model_seed: int = 0,
+        log_level: LogLevels = LogLevels.ON,
+        response_cache: Optional[ResponseCache] = None,
+        base_url: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        coalesce: bool = False,
+    ) -> None:
+        """
+        api_key:      Anthropic API key, defaults to ANTHROPIC_API_KEY
+        base_url:     Anthropic compatible endpoint, defaults to api.anthropic.com
+        retry_policy: Attempts, per-attempt timeout and backoff of each call
+        scheduler:    Rate limiter requests wait for, see CustomOpenAIModel
+        coalesce:     Share one call between identical deterministic requests in flight
+        """
+        try:
+            import anthropic
+        except ImportError as error:
+            raise ValueError(
+                f"Model {model_name_and_version} needs the anthropic package: pip install anthropic"
+            ) from error
+        # Claude has no seed, it is only part of the response cache key
+        super().__init__(
+            model_name_and_version,
+            is_retryable,
+            model_seed=model_seed,
+            log_level=log_level,
+            response_cache=response_cache,
+            retry_policy=retry_policy,
+            scheduler=scheduler,
+            coalesce=coalesce,
+        )
+        log("Creating the Anthropic Model Client.")
+        # Retries are ours, see ChatModel
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+        self.async_client = anthropic.AsyncAnthropic(
+            api_key=api_key, base_url=base_url, max_retries=0
+        )
+        log(f"Initialized Anthropic model: {self.model_name_and_version}", log_level)
+
+    def build_prompt(self, prompt: str, context: str) -> dict:
+        """Build prompt for LLM, a system message like the OpenAI models"""
+        return {
+            "role": "system",
+            "content": f""" \
+                            "{prompt}"
+                            "{context}"
+                            """,
+        }
+
+    def _request_kwargs(self, messages: list, config: ModelGenerationConfig) -> dict:
+        """Arguments for a messages request, system messages go in the system field"""
+        gen_cfg = config.generation
+        system = "\n".join(
+            f"{message['content']}" for message in messages if message.get("role") == "system"
+        )
+        request = {
+            "model": self.model_name_and_version,
+            "messages": [
+                {"role": message["role"], "content": f"{message['content']}"}
+                for message in messages
+                if message.get("role") != "system"
+            ],
+            "temperature": gen_cfg["temperature"],
+            "top_p": gen_cfg["top_p"],
+            "top_k": gen_cfg["top_k"],
+            "max_tokens": gen_cfg["max_output_tokens"],
+        }
+        if system:
+            request["system"] = system
+        return request
+
+    def _create(self, request: dict, timeout: float) -> Any:
+        return self.client.messages.create(**request, timeout=timeout)
+
+    async def _acreate(self, request: dict, timeout: float) -> Any:
+        return await self.async_client.messages.create(**request, timeout=timeout)
+
+    def _reply(self, response: Any):
+        content = "".join(block.text for block in response.content if block.type == "text")
+        if not content:
+            raise ValueError(f"Anthropic didn't return any content: {response}")
+        usage = response.usage
+        return content, None if usage is None else (usage.input_tokens, usage.output_tokens)
+
+    def _open_stream(self, request: dict, timeout: float) -> Any:
+        return self.client.messages.create(**request, stream=True, timeout=timeout)
+
+    def _stream_chunks(self, stream: Any) -> Iterator:
+        # The input tokens come first, the output tokens with the last event
+        input_tokens = 0
+        for event in stream:
+            if event.type == "message_start":
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text, None
+            elif event.type == "message_delta":
+                yield None, (input_tokens, event.usage.output_tokens)
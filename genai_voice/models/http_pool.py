@@ -0,0 +1,67 @@
+"""Pooled HTTP clients shared by every model client"""
+
+import asyncio
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+
+from genai_voice.config.defaults import Config
+
+
+def build_limits(
+    max_connections: int = Config.HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+) -> httpx.Limits:
+    """Connection pool limits"""
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+    )
+
+
+def build_timeout(
+    timeout_seconds: float = Config.HTTP_TIMEOUT_SECONDS,
+    connect_timeout_seconds: float = Config.HTTP_CONNECT_TIMEOUT_SECONDS,
+) -> httpx.Timeout:
+    """Request timeouts"""
+    return httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+
+
+_sync_client: Optional[httpx.Client] = None
+_sync_lock = threading.Lock()
+
+# httpx.AsyncClient is bound to the event loop it is used on, so the async
+# pool is shared by every caller on the same loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide pooled HTTP client for blocking calls"""
+    global _sync_client  # pylint: disable=global-statement
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(
+                    limits=build_limits(), timeout=build_timeout()
+                )
+    return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client for async calls on the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _async_lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=build_limits(), timeout=build_timeout()
+                )
+                _async_clients[loop] = client
+    return client
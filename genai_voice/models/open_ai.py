@@ -1,16 +1,39 @@
 """LLM - llm.py"""
-from typing import Optional
-from openai import OpenAI
+import asyncio
+import weakref
+from typing import Any, Iterator, Optional
+import openai
+from openai import AsyncOpenAI, OpenAI
 
 from genai_voice.config.defaults import Config
 from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.models.chat_model import ChatModel, Usage
+from genai_voice.models.http_pool import get_async_http_client, get_http_client
 from genai_voice.models.model_config import ModelGenerationConfig
+from genai_voice.models.resilience import RETRY_STATUS_CODES, RetryPolicy
+from genai_voice.models.response_cache import ResponseCache
+from genai_voice.models.scheduler import RateLimitScheduler
 from genai_voice.defintions.model_response_formats import ModelResponseFormat
 
 
-class CustomOpenAIModel:
+def is_retryable(error: BaseException) -> bool:
+    """Whether an OpenAI error is transient: timeouts, lost connections, 429 and 5xx"""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRY_STATUS_CODES
+
+
+def _usage(usage: Any) -> Optional[Usage]:
+    if usage is None:
+        return None
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+class CustomOpenAIModel(ChatModel):
     """LLM"""
 
+    vendor = "OpenAI"
+
     def __init__(
         self,
         api_key: str,
@@ -18,33 +41,59 @@ class CustomOpenAIModel:
         response_format: ModelResponseFormat = ModelResponseFormat.TEXT,
         model_seed: int = 0,
         log_level: LogLevels = LogLevels.ON,
+        response_cache: Optional[ResponseCache] = None,
+        base_url: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        coalesce: bool = False,
     ) -> None:
-        self.log_level = log_level
-        self.model_name_and_version = model_name_and_version
-        self.model_config = ModelGenerationConfig()
-        self.model_config.generation["temperature"] = Config.TEMPERATURE
-        self.model_config.generation["top_p"] = Config.TOP_P
-        self.model_config.generation["top_k"] = Config.TOP_K
-        self.model_config.generation["max_output_tokens"] = Config.MAX_OUTPUT_TOKENS
-        self.model_config.generation["seed"] = model_seed
+        """
+        base_url:     OpenAI compatible endpoint, defaults to OPENAI_BASE_URL or api.openai.com
+        retry_policy: Attempts, per-attempt timeout and backoff of each call
+        scheduler:    Rate limiter requests wait for, defaults to the one of the model
+                      when Config.LLM_REQUESTS_PER_MINUTE or LLM_TOKENS_PER_MINUTE is set
+        coalesce:     Share one call between identical deterministic requests in flight
+        """
+        super().__init__(
+            model_name_and_version,
+            is_retryable,
+            model_seed=model_seed,
+            log_level=log_level,
+            response_cache=response_cache,
+            retry_policy=retry_policy,
+            scheduler=scheduler,
+            coalesce=coalesce,
+        )
         self.model_config.generation["response_format"] = {
             "type": (
                 "text" if response_format == ModelResponseFormat.TEXT else "json_object"
             )
         }
         log("Creating the OpenAI Model Client.")
-        self.client = OpenAI(api_key=api_key)
+        self.__api_key = api_key
+        self.__base_url = base_url
+        # Retries are ours, see ChatModel
+        self.client = OpenAI(
+            api_key=api_key, base_url=base_url, http_client=get_http_client(), max_retries=0
+        )
+        # Async clients share the connection pool of the event loop they run on
+        self.__async_clients = weakref.WeakKeyDictionary()
         log(f"Initialized OpenAI model: {self.model_name_and_version}", log_level)
 
     @property
-    def config(self) -> ModelGenerationConfig:
-        """Config property"""
-        return self.model_config
-
-    @property
-    def model_name(self) -> str:
-        """Model name property"""
-        return self.model_name_and_version
+    def async_client(self) -> AsyncOpenAI:
+        """Async client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self.__async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self.__api_key,
+                base_url=self.__base_url,
+                http_client=get_async_http_client(),
+                max_retries=0,
+            )
+            self.__async_clients[loop] = client
+        return client
 
     def build_prompt(self, prompt: str, context: str) -> dict:
         """Build prompt for LLM"""
@@ -61,29 +110,44 @@ class CustomOpenAIModel:
             log("This module supports only OpenAI GPT Models. Returning empty template.")
         return prompt_template
 
-    def generate(self, messages: list, config: Optional[ModelGenerationConfig]):
-        """Send the message to the model to get a response"""
-        if not messages:
-            raise ValueError("Messages are empty.")
-        if not config:
-            config = self.model_config
-        if self.log_level == LogLevels.ON:
-            log(config)
+    def _request_kwargs(self, messages: list, config: ModelGenerationConfig) -> dict:
+        """Arguments for a chat completion request"""
         gen_cfg = config.generation
-        response = self.client.chat.completions.create(
-            model=self.model_name_and_version,
-            messages=messages,
-            temperature=gen_cfg["temperature"],
-            seed=gen_cfg["seed"],
-            top_p=gen_cfg["top_p"],
-            max_tokens=gen_cfg["max_output_tokens"],
-            response_format=gen_cfg["response_format"],
-        )
+        return {
+            "model": self.model_name_and_version,
+            "messages": messages,
+            "temperature": gen_cfg["temperature"],
+            "seed": gen_cfg["seed"],
+            "top_p": gen_cfg["top_p"],
+            "max_tokens": gen_cfg["max_output_tokens"],
+            "response_format": gen_cfg["response_format"],
+        }
+
+    def _create(self, request: dict, timeout: float) -> Any:
+        return self.client.chat.completions.create(**request, timeout=timeout)
+
+    async def _acreate(self, request: dict, timeout: float) -> Any:
+        return await self.async_client.chat.completions.create(**request, timeout=timeout)
+
+    def _reply(self, response: Any):
         if len(response.choices) > 0:
-            return response.choices[0].message.content
+            return response.choices[0].message.content, _usage(response.usage)
         else:
             raise ValueError(f"OpenAI didn't return any content: {response}")
 
+    def _open_stream(self, request: dict, timeout: float) -> Any:
+        return self.client.chat.completions.create(
+            **request,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+        )
+
+    def _stream_chunks(self, stream: Any) -> Iterator:
+        for chunk in stream:
+            # The usage comes in a last chunk without choices
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            yield delta, _usage(chunk.usage)
 
 if __name__ == "__main__":
     test_model = CustomOpenAIModel(api_key=Config.OPENAI_API_KEY)
@@ -0,0 +1,279 @@
+"""Deadlines, retries and circuit breaking for model calls"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.logger.metrics import get_metrics
+
+# Transient HTTP statuses worth another attempt, 529 is Anthropic's "overloaded"
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Absolute time.monotonic() by which the current call must be done
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline of the call passed"""
+
+
+class CircuitOpenError(ConnectionError):
+    """The backend failed too often recently, calls fail fast until it recovers"""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Run calls under a deadline seconds from now.
+
+    Nested deadlines can only shorten the outer one. The deadline follows
+    the context into asyncio tasks and asyncio.to_thread calls.
+    """
+    outer = _deadline.get()
+    at = outer if seconds is None else time.monotonic() + seconds
+    if outer is not None:
+        at = min(at, outer)
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_at() -> Optional[float]:
+    """time.monotonic() of the current deadline, None without one"""
+    return _deadline.get()
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left before the current deadline, None without one"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def attempt_timeout(timeout_seconds: float) -> float:
+    """Timeout of the next attempt, cut to the time left before the deadline"""
+    remaining = remaining_seconds()
+    if remaining is None:
+        return timeout_seconds
+    if remaining <= 0:
+        raise DeadlineExceeded("Deadline exceeded.")
+    return min(timeout_seconds, remaining)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay asked for by the Retry-After (or retry-after-ms) header of an HTTP error"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Attempts, per-attempt timeout and jittered exponential backoff"""
+
+    max_attempts: int = Config.LLM_MAX_ATTEMPTS
+    timeout_seconds: float = Config.LLM_ATTEMPT_TIMEOUT_SECONDS
+    base_delay_seconds: float = Config.LLM_RETRY_BASE_SECONDS
+    max_delay_seconds: float = Config.LLM_RETRY_MAX_SECONDS
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retrying after attempt (0 based) failed.
+        Full jitter backoff, but never less than the server's Retry-After.
+        """
+        cap = min(self.max_delay_seconds, self.base_delay_seconds * 2**attempt)
+        backoff = random.uniform(0, cap)
+        return backoff if retry_after is None else max(retry_after, backoff)
+
+
+class CircuitState(IntEnum):
+    """State of a circuit breaker"""
+
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+class CircuitBreaker:
+    """Fail fast while a backend is unhealthy.
+
+    After failure_threshold consecutive failures the circuit opens and
+    calls raise CircuitOpenError. After reset_seconds one probe call is let
+    through: its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = Config.LLM_CIRCUIT_FAILURES,
+        reset_seconds: float = Config.LLM_CIRCUIT_RESET_SECONDS,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        name:              Backend the breaker protects, used in logs and metrics
+        failure_threshold: Consecutive failures opening the circuit
+        reset_seconds:     Time before an open circuit lets a probe through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.log_level = log_level
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+        self.__changed_at = 0.0
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state"""
+        with self.__lock:
+            return self.__state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through"""
+        with self.__lock:
+            if self.__state == CircuitState.CLOSED:
+                return
+            # A probe that never reported back (e.g. cancelled) is replaced
+            if time.monotonic() - self.__changed_at < self.reset_seconds:
+                raise CircuitOpenError(f"Circuit of {self.name} is open.")
+            self.__transition(CircuitState.HALF_OPEN)
+
+    def record_success(self) -> None:
+        """The backend answered"""
+        with self.__lock:
+            self.__failures = 0
+            if self.__state != CircuitState.CLOSED:
+                self.__transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        """The backend failed or timed out"""
+        with self.__lock:
+            self.__failures += 1
+            if self.__state == CircuitState.HALF_OPEN or (
+                self.__state == CircuitState.CLOSED
+                and self.__failures >= self.failure_threshold
+            ):
+                self.__transition(CircuitState.OPEN)
+
+    def __transition(self, state: CircuitState) -> None:
+        self.__state = state
+        self.__changed_at = time.monotonic()
+        get_metrics().counter(
+            "genai_voice_llm_circuit_transitions_total", "Circuit breaker state changes"
+        ).inc(backend=self.name, state=state.name.lower())
+        log("Circuit of %s is %s.", self.log_level, self.name, state.name.lower())
+
+
+class RetryingCaller:
+    """Run calls under the deadline with retries and a circuit breaker.
+
+    A call is a function of the attempt timeout in seconds. Errors for which
+    is_retryable is true are retried after RetryPolicy.delay, unless the
+    retry would end after the deadline, and count as circuit failures
+    (except 429, which means the backend is up but busy).
+    """
+
+    def __init__(
+        self,
+        is_retryable: Callable[[BaseException], bool],
+        policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        self.is_retryable = is_retryable
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker
+        self.log_level = log_level
+
+    def call(self, function: Callable[[float], Any]) -> Any:
+        """Result of function(timeout)"""
+        attempt = 0
+        while True:
+            timeout = self.__before_attempt()
+            try:
+                result = function(timeout)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                delay = self.__after_failure(error, attempt)
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return result
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, function: Callable[[float], Awaitable[Any]]) -> Any:
+        """Result of await function(timeout)"""
+        attempt = 0
+        while True:
+            timeout = self.__before_attempt()
+            try:
+                result = await function(timeout)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                delay = self.__after_failure(error, attempt)
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def __before_attempt(self) -> float:
+        if self.breaker is not None:
+            self.breaker.before_call()
+        return attempt_timeout(self.policy.timeout_seconds)
+
+    def __after_failure(self, error: Exception, attempt: int) -> float:
+        """Delay before the next attempt, raises when there is none"""
+        if not self.is_retryable(error):
+            # The backend answered, the request itself is wrong
+            if self.breaker is not None:
+                self.breaker.record_success()
+            raise error
+        status = getattr(error, "status_code", None)
+        if self.breaker is not None and status != 429:
+            self.breaker.record_failure()
+        if attempt + 1 >= self.policy.max_attempts:
+            raise error
+        delay = self.policy.delay(attempt, retry_after_seconds(error))
+        remaining = remaining_seconds()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded(
+                f"Deadline exceeded, {remaining:.2f}s left, next retry in {delay:.2f}s."
+            ) from error
+        get_metrics().counter("genai_voice_llm_retries_total", "Retried model calls").inc(
+            reason=str(status or type(error).__name__)
+        )
+        log(
+            "Attempt %d failed (%s), retrying in %.2fs.",
+            self.log_level,
+            attempt + 1,
+            status or type(error).__name__,
+            delay,
+        )
+        return delay
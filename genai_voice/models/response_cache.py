@@ -0,0 +1,190 @@
+"""Deterministic LLM response cache"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.models.model_config import ModelGenerationConfig
+
+
+@dataclass
+class ResponseCacheStats:
+    """Cache counters"""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    expired: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """Cache of model responses keyed by (model, messages, generation config).
+
+    Only deterministic requests (temperature 0 with a fixed seed) are cached.
+    Entries live in an in-memory LRU and, optionally, a sqlite database, and
+    expire after ttl_seconds. Expired rows are deleted from the database when
+    it is opened and on every put, and beyond max_db_rows the oldest go.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = Config.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = Config.RESPONSE_CACHE_TTL_SECONDS,
+        db_path: Optional[str] = None,
+        max_db_rows: Optional[int] = Config.RESPONSE_CACHE_MAX_DB_ROWS,
+    ) -> None:
+        """
+        max_entries: Number of responses kept in memory
+        ttl_seconds: Age after which a response is no longer served, None never expires
+        db_path:     sqlite file for the persistent tier, None keeps the cache in memory only
+        max_db_rows: Number of responses kept in the sqlite file, None keeps all of them
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_db_rows = max_db_rows
+        self.stats = ResponseCacheStats()
+        self.__memory: OrderedDict[str, tuple] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__db = None
+        # Rows in the database, over-counted when put replaces a row
+        self.__db_rows = 0
+        if db_path:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.__db = sqlite3.connect(db_path, check_same_thread=False)
+            self.__db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self.__db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_created ON responses (created)"
+            )
+            self.__db_rows = self.__db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self.__prune_db(time.time())
+            self.__db.commit()
+
+    @staticmethod
+    def is_cacheable(config: ModelGenerationConfig) -> bool:
+        """Whether the configuration produces repeatable responses"""
+        generation = config.generation
+        return generation.get("temperature") == 0 and generation.get("seed") is not None
+
+    @staticmethod
+    def key(model_name: str, messages: list, config: ModelGenerationConfig) -> str:
+        """Stable hash of a request"""
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "messages": messages,
+                "generation": config.generation,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for the request key, or None"""
+        now = time.time()
+        with self.__lock:
+            entry = self.__memory.get(key)
+            if entry is not None:
+                created, response = entry
+                if not self.__is_expired(created, now):
+                    self.__memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return response
+                del self.__memory[key]
+                self.stats.expired += 1
+            if self.__db is not None:
+                row = self.__db.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created = row
+                    if not self.__is_expired(created, now):
+                        self.__store_memory(key, created, response)
+                        self.stats.disk_hits += 1
+                        return response
+                    self.__db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.__db.commit()
+                    self.__db_rows -= 1
+                    self.stats.expired += 1
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response under the request key"""
+        created = time.time()
+        with self.__lock:
+            self.__store_memory(key, created, response)
+            if self.__db is not None:
+                self.__db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created) "
+                    "VALUES (?, ?, ?)",
+                    (key, response, created),
+                )
+                self.__db_rows += 1
+                self.__prune_db(created)
+                self.__db.commit()
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        with self.__lock:
+            self.__memory.clear()
+            if self.__db is not None:
+                self.__db.execute("DELETE FROM responses")
+                self.__db.commit()
+                self.__db_rows = 0
+
+    def __prune_db(self, now: float) -> None:
+        """Delete expired rows, then the oldest ones beyond max_db_rows"""
+        if self.ttl_seconds is not None:
+            self.__db_rows -= self.__db.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+            ).rowcount
+        if self.max_db_rows is not None and self.__db_rows > self.max_db_rows:
+            self.__db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_db_rows,),
+            )
+            self.__db_rows = self.__db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __is_expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def __store_memory(self, key: str, created: float, response: str) -> None:
+        self.__memory[key] = (created, response)
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.max_entries:
+            self.__memory.popitem(last=False)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache backed by Config.RESPONSE_CACHE_DB"""
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(db_path=Config.RESPONSE_CACHE_DB)
+    return _cache
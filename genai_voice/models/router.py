@@ -0,0 +1,305 @@
+"""Latency-aware hedging across model backends"""
+
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from typing import Iterator, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.models.model_config import ModelGenerationConfig
+
+
+class LatencyTracker:
+    """Latencies of the last window requests of a backend"""
+
+    def __init__(self, window: int = Config.LLM_LATENCY_WINDOW) -> None:
+        self.__samples = deque(maxlen=window)
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__samples)
+
+    def observe(self, seconds: float) -> None:
+        """Record a latency"""
+        with self.__lock:
+            self.__samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank q-th percentile, None without samples"""
+        with self.__lock:
+            samples = sorted(self.__samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, int(q / 100 * len(samples) + 0.5) - 1))]
+
+
+class HedgedRouter:
+    """Send requests to the first backend and hedge slow ones to the next.
+
+    When a backend has not answered within the hedge_quantile latency of its
+    recent requests (default_delay_seconds until min_samples are known), the
+    same request is sent to the next backend. The first answer wins and the
+    other request is cancelled. A failed request fails over to the next
+    backend at once. Streams are hedged on the time to their first token and
+    cannot fail over once text has been yielded. Every request, hedges
+    included, runs in a copy of the caller's context, so it keeps the
+    caller's deadline, request scope and trace ID.
+
+    The router has the interface of the backends, so ChatBot uses it like a
+    single model.
+    """
+
+    def __init__(
+        self,
+        backends: list,
+        hedge_quantile: float = Config.LLM_HEDGE_QUANTILE,
+        min_samples: int = Config.LLM_HEDGE_MIN_SAMPLES,
+        default_delay_seconds: float = Config.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+        min_delay_seconds: float = Config.LLM_HEDGE_MIN_DELAY_SECONDS,
+        window: int = Config.LLM_LATENCY_WINDOW,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        backends:              Backends in order of preference
+        hedge_quantile:        Latency percentile after which a request is hedged
+        min_samples:           Requests of a backend before its percentile is trusted
+        default_delay_seconds: Hedge delay until then
+        min_delay_seconds:     Lower bound of the hedge delay
+        window:                Number of recent latencies kept per backend
+        """
+        if not backends:
+            raise ValueError("HedgedRouter needs at least one backend.")
+        self.backends = list(backends)
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.default_delay_seconds = default_delay_seconds
+        self.min_delay_seconds = min_delay_seconds
+        self.log_level = log_level
+        self.__latency = [LatencyTracker(window) for _ in self.backends]
+        self.__first_token = [LatencyTracker(window) for _ in self.backends]
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__loop_lock = threading.Lock()
+
+    @property
+    def config(self) -> ModelGenerationConfig:
+        """Generation config of the first backend"""
+        return self.backends[0].config
+
+    @property
+    def model_name(self) -> str:
+        """Model name of the first backend"""
+        return self.backends[0].model_name
+
+    def build_prompt(self, prompt: str, context: str) -> dict:
+        """Build prompt for LLM"""
+        return self.backends[0].build_prompt(prompt=prompt, context=context)
+
+    def hedge_delay(self, index: int, first_token: bool = False) -> float:
+        """Seconds to wait for backend index before hedging"""
+        tracker = (self.__first_token if first_token else self.__latency)[index]
+        if len(tracker) < self.min_samples:
+            return self.default_delay_seconds
+        return max(self.min_delay_seconds, tracker.quantile(self.hedge_quantile))
+
+    def generate(self, messages: list, config: Optional[ModelGenerationConfig]) -> str:
+        """Send the message to the backends to get a response"""
+        if len(self.backends) == 1:
+            return self.backends[0].generate(messages=messages, config=config)
+        # Runs on the router's event loop so the losing request can be cancelled
+        future = asyncio.run_coroutine_threadsafe(
+            self.__in_context(contextvars.copy_context(), messages, config),
+            self.__event_loop(),
+        )
+        return future.result()
+
+    async def agenerate(
+        self, messages: list, config: Optional[ModelGenerationConfig]
+    ) -> str:
+        """Send the message to the backends without blocking the event loop"""
+        context = contextvars.copy_context()
+        pending: dict = {}
+        errors = []
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            # create_task copies the context it is called in
+            task = context.run(asyncio.create_task, self.__timed(launched, messages, config))
+            pending[task] = launched
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                timeout = (
+                    self.hedge_delay(launched - 1) if launched < len(self.backends) else None
+                )
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self.__count("hedge", launched)
+                    launch()
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is None:
+                        if index:
+                            self.__count("win", index)
+                        return task.result()
+                    errors.append(task.exception())
+                    self.__failed(index, task.exception())
+                if launched < len(self.backends):
+                    self.__count("failover", launched)
+                    launch()
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def generate_stream(
+        self, messages: list, config: Optional[ModelGenerationConfig]
+    ) -> Iterator[str]:
+        """Send the message to the backends and yield the first one to start answering"""
+        if len(self.backends) == 1:
+            return self.backends[0].generate_stream(messages=messages, config=config)
+        # Taken now, the stream may be resumed in another context
+        return self.__hedged_stream(contextvars.copy_context(), messages, config)
+
+    def __hedged_stream(
+        self,
+        context: contextvars.Context,
+        messages: list,
+        config: Optional[ModelGenerationConfig],
+    ) -> Iterator[str]:
+        # (backend index, delta, error), delta None once the stream ends
+        events = queue.Queue()
+        cancels = []
+        running = set()
+        winner = None
+        error = None
+
+        def launch() -> None:
+            index = len(cancels)
+            cancels.append(threading.Event())
+            running.add(index)
+            threading.Thread(
+                target=context.copy().run,
+                args=(self.__pump, index, messages, config, events, cancels[index]),
+                name=f"llm-hedge-{index}",
+                daemon=True,
+            ).start()
+
+        launch()
+        try:
+            while True:
+                timeout = None
+                if winner is None and len(cancels) < len(self.backends):
+                    timeout = self.hedge_delay(len(cancels) - 1, first_token=True)
+                try:
+                    index, delta, error = events.get(timeout=timeout)
+                except queue.Empty:
+                    self.__count("hedge", len(cancels))
+                    launch()
+                    continue
+                if winner is None:
+                    if delta:
+                        winner = index
+                        if index:
+                            self.__count("win", index)
+                        for other, cancel in enumerate(cancels):
+                            if other != index:
+                                cancel.set()
+                    else:
+                        running.discard(index)
+                        self.__failed(index, error)
+                        if len(cancels) < len(self.backends):
+                            self.__count("failover", len(cancels))
+                            launch()
+                        elif not running:
+                            raise error or ValueError("No model returned any content.")
+                        continue
+                if index != winner:
+                    continue
+                if error is not None:
+                    raise error
+                if delta is None:
+                    return
+                yield delta
+        finally:
+            for cancel in cancels:
+                cancel.set()
+
+    def __pump(
+        self,
+        index: int,
+        messages: list,
+        config: Optional[ModelGenerationConfig],
+        events: queue.Queue,
+        cancel: threading.Event,
+    ) -> None:
+        """Forward the stream of backend index to events until cancelled.
+        Cancellation is noticed between chunks, the stream is then closed.
+        """
+        start = time.perf_counter()
+        stream = self.backends[index].generate_stream(messages=messages, config=config)
+        try:
+            for delta in stream:
+                if cancel.is_set():
+                    return
+                if start is not None:
+                    self.__first_token[index].observe(time.perf_counter() - start)
+                    start = None
+                events.put((index, delta, None))
+            events.put((index, None, None))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            events.put((index, None, error))
+        finally:
+            stream.close()
+
+    async def __timed(
+        self, index: int, messages: list, config: Optional[ModelGenerationConfig]
+    ) -> str:
+        start = time.perf_counter()
+        response = await self.backends[index].agenerate(messages=messages, config=config)
+        self.__latency[index].observe(time.perf_counter() - start)
+        return response
+
+    async def __in_context(
+        self,
+        context: contextvars.Context,
+        messages: list,
+        config: Optional[ModelGenerationConfig],
+    ) -> str:
+        """agenerate with the trace ID, deadline, ... of the calling thread"""
+        # The task runs in its own copy of the context, setting it leaks nowhere
+        for variable, value in context.items():
+            variable.set(value)
+        return await self.agenerate(messages, config)
+
+    def __event_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop of the router, started on first use"""
+        if self.__loop is None:
+            with self.__loop_lock:
+                if self.__loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever, name="llm-router", daemon=True
+                    ).start()
+                    self.__loop = loop
+        return self.__loop
+
+    def __count(self, event: str, index: int) -> None:
+        get_metrics().counter(
+            "genai_voice_llm_hedge_total", "Hedged, won and failed over LLM requests"
+        ).inc(event=event, model=self.backends[index].model_name)
+        log("LLM request %s: %s", self.log_level, event, self.backends[index].model_name)
+
+    def __failed(self, index: int, error: Optional[BaseException]) -> None:
+        log("LLM %s failed: %s", self.log_level, self.backends[index].model_name, error)
@@ -0,0 +1,293 @@
+"""Client-side rate limiting and fair scheduling of model requests"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Iterator, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.models.resilience import DeadlineExceeded, remaining_seconds
+
+
+class Priority(IntEnum):
+    """Scheduling class of a request, lower values are served first"""
+
+    INTERACTIVE = 1
+    BATCH = 2
+
+
+# (session ID, priority) of the requests made in the current context
+_scope: ContextVar[tuple] = ContextVar("request_scope", default=(None, Priority.BATCH))
+
+
+@contextmanager
+def request_scope(
+    session_id: Optional[str], priority: Priority = Priority.INTERACTIVE
+) -> Iterator[None]:
+    """Schedule the model requests made inside for session_id with priority.
+    Requests made outside any scope are batch requests without a session.
+    """
+    token = _scope.set((session_id, priority))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> tuple:
+    """(session ID, priority) of the current context"""
+    return _scope.get()
+
+
+class TokenBucket:
+    """Refills per_minute / 60 units a second, up to burst_seconds worth.
+
+    A request bigger than the bucket is let through once the bucket is full
+    and leaves it in debt, so it is delayed rather than refused.
+    Not thread safe, RateLimitScheduler guards its buckets.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add what has dripped in since the last refill"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_seconds(self, amount: float) -> float:
+        """Time until amount can be taken"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Remove amount from the bucket"""
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        """Return amount to the bucket"""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    """A request queued for the rate limiter"""
+
+    __slots__ = ("tokens", "session_id", "priority", "granted", "event", "loop", "future")
+
+    def __init__(self, tokens: int, session_id: Optional[str], priority: Priority) -> None:
+        self.tokens = tokens
+        self.session_id = session_id
+        self.priority = priority
+        self.granted = False
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def grant(self) -> None:
+        """Wake up the waiting caller"""
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class RateLimitScheduler:
+    """Keep requests under the requests- and tokens-per-minute limits.
+
+    Requests wait in a queue per priority class. Within a class, sessions
+    take turns (round robin), so one busy session cannot starve the others,
+    and each session's requests are served in order. A queued request waits
+    at most until the current deadline and then raises DeadlineExceeded.
+    Token counts are estimates up front; settle() corrects them with the
+    usage the model reports.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = Config.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = Config.LLM_TOKENS_PER_MINUTE,
+        burst_seconds: float = Config.LLM_RATE_LIMIT_BURST_SECONDS,
+        name: str = "llm",
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        requests_per_minute: Request limit, 0 for no limit
+        tokens_per_minute:   Token limit, 0 for no limit
+        burst_seconds:       Seconds of the limits that can be used at once
+        name:                Label of the queue wait metric
+        """
+        self.name = name
+        self.log_level = log_level
+        self.__requests = (
+            TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute else None
+        )
+        self.__tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        # Priority -> session ID -> queued requests, sessions in round robin order
+        self.__queues: dict = {priority: OrderedDict() for priority in Priority}
+        self.__queued = 0
+        self.__condition = threading.Condition()
+        self.__dispatcher: Optional[threading.Thread] = None
+
+    def queued(self) -> int:
+        """Number of requests waiting"""
+        with self.__condition:
+            return self.__queued
+
+    def acquire(self, tokens: int) -> float:
+        """Wait until a request of tokens may be sent, returns the seconds waited"""
+        session_id, priority = current_scope()
+        start = time.monotonic()
+        waiter = _Waiter(tokens, session_id, priority)
+        waiter.event = threading.Event()
+        if not self.__enqueue(waiter):
+            timeout = remaining_seconds()
+            if not waiter.event.wait(None if timeout is None else max(0.0, timeout)):
+                self.__abandon(waiter)
+        return self.__waited(priority, start)
+
+    async def aacquire(self, tokens: int) -> float:
+        """Wait until a request of tokens may be sent without blocking the event loop"""
+        session_id, priority = current_scope()
+        start = time.monotonic()
+        waiter = _Waiter(tokens, session_id, priority)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        if not self.__enqueue(waiter):
+            try:
+                await asyncio.wait_for(waiter.future, remaining_seconds())
+            except asyncio.TimeoutError:
+                self.__abandon(waiter)
+            except asyncio.CancelledError:
+                self.__abandon(waiter, cancelled=True)
+                raise
+        return self.__waited(priority, start)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known"""
+        if self.__tokens is None:
+            return
+        with self.__condition:
+            self.__tokens.refill(time.monotonic())
+            if actual_tokens > estimated_tokens:
+                self.__tokens.take(actual_tokens - estimated_tokens)
+            else:
+                self.__tokens.give(estimated_tokens - actual_tokens)
+            self.__condition.notify()
+
+    def __enqueue(self, waiter: _Waiter) -> bool:
+        """Queue a request, True when it was granted right away"""
+        with self.__condition:
+            sessions = self.__queues[waiter.priority]
+            sessions.setdefault(waiter.session_id, deque()).append(waiter)
+            self.__queued += 1
+            self.__dispatch(time.monotonic())
+            if waiter.granted:
+                return True
+            if self.__dispatcher is None:
+                self.__dispatcher = threading.Thread(
+                    target=self.__run, name=f"{self.name}-scheduler", daemon=True
+                )
+                self.__dispatcher.start()
+            self.__condition.notify()
+            return False
+
+    def __abandon(self, waiter: _Waiter, cancelled: bool = False) -> None:
+        """Take a request that gave up out of the queue"""
+        with self.__condition:
+            if waiter.granted:
+                if not cancelled:
+                    return
+                # Granted as it was cancelled, nothing was sent
+                self.__release(waiter)
+                return
+            queue = self.__queues[waiter.priority][waiter.session_id]
+            queue.remove(waiter)
+            if not queue:
+                del self.__queues[waiter.priority][waiter.session_id]
+            self.__queued -= 1
+            self.__condition.notify()
+        if not cancelled:
+            raise DeadlineExceeded("Deadline exceeded waiting for the rate limiter.")
+
+    def __release(self, waiter: _Waiter) -> None:
+        now = time.monotonic()
+        for bucket, amount in ((self.__requests, 1), (self.__tokens, waiter.tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                bucket.give(amount)
+
+    def __waited(self, priority: Priority, start: float) -> float:
+        waited = time.monotonic() - start
+        get_metrics().histogram(
+            "genai_voice_llm_queue_wait_seconds", "Time requests waited for the rate limiter"
+        ).observe(waited, scheduler=self.name, priority=priority.name.lower())
+        if waited > 1:
+            log("Waited %.1fs for the %s rate limiter.", self.log_level, waited, self.name)
+        return waited
+
+    def __dispatch(self, now: float) -> Optional[float]:
+        """Grant what the buckets allow, returns the seconds until the next
+        grant is possible or None when nothing is queued. Holds the lock.
+        """
+        for bucket in (self.__requests, self.__tokens):
+            if bucket is not None:
+                bucket.refill(now)
+        while self.__queued:
+            priority = next(priority for priority in Priority if self.__queues[priority])
+            sessions = self.__queues[priority]
+            session_id, queue = next(iter(sessions.items()))
+            waiter = queue[0]
+            wait = max(
+                self.__requests.wait_seconds(1) if self.__requests else 0.0,
+                self.__tokens.wait_seconds(waiter.tokens) if self.__tokens else 0.0,
+            )
+            if wait > 0:
+                return wait
+            if self.__requests is not None:
+                self.__requests.take(1)
+            if self.__tokens is not None:
+                self.__tokens.take(waiter.tokens)
+            queue.popleft()
+            # The session goes to the back of the round
+            del sessions[session_id]
+            if queue:
+                sessions[session_id] = queue
+            self.__queued -= 1
+            waiter.grant()
+        return None
+
+    def __run(self) -> None:
+        """Dispatcher thread, grants queued requests as the buckets refill"""
+        with self.__condition:
+            while True:
+                self.__condition.wait(self.__dispatch(time.monotonic()))
+
+
+_schedulers: dict = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name: str) -> Optional[RateLimitScheduler]:
+    """Process-wide scheduler of a model, None when no limit is configured"""
+    if not (Config.LLM_REQUESTS_PER_MINUTE or Config.LLM_TOKENS_PER_MINUTE):
+        return None
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model_name)
+        if scheduler is None:
+            scheduler = _schedulers[model_name] = RateLimitScheduler(name=model_name)
+        return scheduler
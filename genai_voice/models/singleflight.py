@@ -0,0 +1,208 @@
+"""Coalescing of identical in-flight model requests"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.models.resilience import DeadlineExceeded, remaining_seconds
+
+
+class _Flight:
+    """One upstream call and the number of callers waiting for it"""
+
+    def __init__(self) -> None:
+        self.future = concurrent.futures.Future()
+        self.waiters = 1
+        # Cancels the upstream call, set for async calls
+        self.cancel: Optional[Callable[[], Any]] = None
+
+
+class _StreamFlight:
+    """One upstream stream, buffered for every reader"""
+
+    def __init__(self) -> None:
+        self.chunks: list = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 1
+        self.condition = threading.Condition()
+        # Set once every reader left, the upstream stream is then closed
+        self.closed = threading.Event()
+
+
+class SingleFlight:
+    """Share one upstream call between identical concurrent requests.
+
+    The first caller with a key makes the call, callers arriving with the
+    same key while it is in flight wait for its result (or error) instead
+    of making their own. Streams are pumped on a thread into a buffer and
+    every reader gets all of it, from the first delta, as it arrives.
+    Async calls and streams are cancelled once nobody waits for them.
+    """
+
+    def __init__(self, name: str = "llm") -> None:
+        """
+        name: Label of the genai_voice_llm_coalesced_total metric
+        """
+        self.name = name
+        self.__flights: dict = {}
+        self.__streams: dict = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], Any]) -> Any:
+        """Result of function(), shared with concurrent calls with the same key"""
+        flight, leader = self.__join(key)
+        if not leader:
+            try:
+                return flight.future.result(timeout=remaining_seconds())
+            except concurrent.futures.TimeoutError as error:
+                self.__leave(key, flight)
+                raise DeadlineExceeded("Deadline exceeded waiting for a shared request.") from error
+        try:
+            result = function()
+        except BaseException as error:
+            self.__finish(key, flight, error=error)
+            raise
+        self.__finish(key, flight, result=result)
+        return result
+
+    async def ado(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of await function(), shared with concurrent calls with the same key"""
+        flight, leader = self.__join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(function())
+            flight.cancel = lambda: loop.call_soon_threadsafe(task.cancel)
+            task.add_done_callback(lambda task: self.__finish_task(key, flight, task))
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(flight.future)), remaining_seconds()
+            )
+        except asyncio.TimeoutError as error:
+            self.__leave(key, flight)
+            raise DeadlineExceeded("Deadline exceeded waiting for a shared request.") from error
+        except asyncio.CancelledError:
+            self.__leave(key, flight)
+            raise
+
+    def stream(self, key: str, open_stream: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Deltas of open_stream(), shared with concurrent streams with the same key"""
+        with self.__lock:
+            flight = self.__streams.get(key)
+            if flight is None:
+                flight = self.__streams[key] = _StreamFlight()
+                leader = True
+            else:
+                flight.readers += 1
+                leader = False
+        if leader:
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self.__pump, key, flight, open_stream),
+                name=f"{self.name}-stream",
+                daemon=True,
+            ).start()
+        else:
+            self.__coalesced("stream")
+        return self.__read(key, flight)
+
+    def __join(self, key: str) -> tuple:
+        """(flight of key, whether the caller makes the call)"""
+        with self.__lock:
+            flight = self.__flights.get(key)
+            if flight is None:
+                flight = self.__flights[key] = _Flight()
+                return flight, True
+            flight.waiters += 1
+        self.__coalesced("generate")
+        return flight, False
+
+    def __leave(self, key: str, flight: _Flight) -> None:
+        """A caller stopped waiting, the last one cancels the call"""
+        with self.__lock:
+            flight.waiters -= 1
+            if flight.waiters or flight.cancel is None or flight.future.done():
+                return
+            if self.__flights.get(key) is flight:
+                del self.__flights[key]
+        flight.cancel()
+
+    def __finish(
+        self,
+        key: str,
+        flight: _Flight,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self.__lock:
+            if self.__flights.get(key) is flight:
+                del self.__flights[key]
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+
+    def __finish_task(self, key: str, flight: _Flight, task: asyncio.Task) -> None:
+        if task.cancelled():
+            with self.__lock:
+                if self.__flights.get(key) is flight:
+                    del self.__flights[key]
+            flight.future.cancel()
+            return
+        error = task.exception()
+        self.__finish(key, flight, None if error else task.result(), error)
+
+    def __pump(self, key: str, flight: _StreamFlight, open_stream: Callable) -> None:
+        """Read the upstream stream into the buffer until it ends or nobody reads"""
+        stream = None
+        try:
+            stream = open_stream()
+            for delta in stream:
+                if flight.closed.is_set():
+                    break
+                with flight.condition:
+                    flight.chunks.append(delta)
+                    flight.condition.notify_all()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            flight.error = error
+        finally:
+            if stream is not None:
+                stream.close()
+            with self.__lock:
+                if self.__streams.get(key) is flight:
+                    del self.__streams[key]
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    def __read(self, key: str, flight: _StreamFlight) -> Iterator[str]:
+        """Every delta of the flight, from the first one"""
+        index = 0
+        try:
+            while True:
+                with flight.condition:
+                    while index >= len(flight.chunks) and not flight.done:
+                        flight.condition.wait()
+                    chunks = flight.chunks[index:]
+                    done = flight.done
+                index += len(chunks)
+                yield from chunks
+                if done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with self.__lock:
+                flight.readers -= 1
+                if not flight.readers:
+                    flight.closed.set()
+                    if self.__streams.get(key) is flight:
+                        del self.__streams[key]
+
+    def __coalesced(self, kind: str) -> None:
+        get_metrics().counter(
+            "genai_voice_llm_coalesced_total", "Requests served by an identical request in flight"
+        ).inc(model=self.name, kind=kind)
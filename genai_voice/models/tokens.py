@@ -0,0 +1,256 @@
+"""Token estimation helpers"""
+
+# tiktoken is optional (poetry install -E tokens), without it token counts
+# are estimated from characters
+# pylint: disable=import-outside-toplevel
+
+import threading
+from array import array
+from collections import OrderedDict
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.metrics import get_metrics
+
+# OpenAI tokenizers average roughly four characters of English text per token
+CHARS_PER_TOKEN = 4
+
+# Chat format overhead: tokens wrapping each message and priming the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Texts from this size on (e.g. the context in the system prompt) keep their
+# tokens, so truncating them on every turn does not encode them again
+LARGE_TEXT_CHARS = 16384
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap approximation of the number of tokens in text"""
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: str) -> Any:
+    """tiktoken encoding of the model, None when tiktoken is not installed"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=8)
+def _tokens(text: str, model_name: str) -> array:
+    """Tokens of a large text, 4 bytes each"""
+    return array("I", _encoding(model_name).encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model_name: str = Config.MODEL_GPT_TURBO_NAME) -> int:
+    """Number of tokens in text, exact with tiktoken and estimated otherwise.
+    Every token budget counts with this function.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return estimate_tokens(text)
+    if len(text) >= LARGE_TEXT_CHARS:
+        return len(_tokens(text, model_name))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(
+    text: str, max_tokens: int, model_name: str = Config.MODEL_GPT_TURBO_NAME
+) -> str:
+    """Longest prefix of text within max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    if len(text) >= LARGE_TEXT_CHARS:
+        tokens = _tokens(text, model_name)
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(list(tokens[:max_tokens]))
+
+
+def message_tokens(message: dict, model_name: str = Config.MODEL_GPT_TURBO_NAME) -> int:
+    """Tokens of a chat message, the content count is cached"""
+    return TOKENS_PER_MESSAGE + count_tokens(f"{message.get('content') or ''}", model_name)
+
+
+def messages_tokens(messages: list, model_name: str = Config.MODEL_GPT_TURBO_NAME) -> int:
+    """Prompt tokens of a chat request"""
+    return TOKENS_PER_REPLY + sum(message_tokens(message, model_name) for message in messages)
+
+
+def record_usage(
+    model_name: str, prompt_tokens: int, completion_tokens: int, source: str = "api"
+) -> None:
+    """Add the tokens of a request to the genai_voice_llm_tokens_total counter
+
+    source: "api" for usage reported by the model, "estimate" when counted here
+    """
+    counter = get_metrics().counter("genai_voice_llm_tokens_total", "LLM tokens by kind")
+    counter.inc(prompt_tokens, model=model_name, kind="prompt", source=source)
+    counter.inc(completion_tokens, model=model_name, kind="completion", source=source)
+
+
+class TokenBudgetExceeded(ValueError):
+    """A request or session would use more tokens than its budget"""
+
+
+class BudgetPolicy(IntEnum):
+    """What to do with a request over its token budget"""
+
+    ERROR = 1
+    TRIM = 2
+
+
+class TokenBudget:
+    """Per-request and per-session token budgets.
+
+    fit() makes a request fit in max_request_tokens, including the
+    max_output_tokens reserved for the reply. With TRIM the system prompt
+    (which carries the context) is truncated first, down to half the budget,
+    then the oldest history messages are dropped, then the system prompt is
+    truncated further. With ERROR, or when even the trimmed request does
+    not fit, TokenBudgetExceeded is raised. Sessions are charged the tokens
+    of every request and reply and are refused once max_session_tokens is
+    used up; 0 disables the session budget.
+    """
+
+    def __init__(
+        self,
+        max_request_tokens: int = Config.TOKEN_BUDGET_REQUEST,
+        max_session_tokens: int = Config.TOKEN_BUDGET_SESSION,
+        policy: BudgetPolicy = BudgetPolicy.TRIM,
+        model_name: str = Config.MODEL_GPT_TURBO_NAME,
+        max_sessions: int = Config.SESSION_MAX_SESSIONS,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        max_request_tokens: Prompt plus reply tokens allowed in one request
+        max_session_tokens: Tokens allowed across a session, 0 for no limit
+        policy:             Trim or refuse requests over max_request_tokens
+        model_name:         Model whose tokenizer counts the tokens
+        max_sessions:       Number of sessions whose usage is remembered
+        """
+        self.max_request_tokens = max_request_tokens
+        self.max_session_tokens = max_session_tokens
+        self.policy = policy
+        self.model_name = model_name
+        self.max_sessions = max_sessions
+        self.log_level = log_level
+        self.__sessions: OrderedDict[str, int] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def fit(
+        self,
+        messages: list,
+        max_output_tokens: int = Config.MAX_OUTPUT_TOKENS,
+        session_id: Optional[str] = None,
+    ) -> tuple:
+        """Return (messages within the budget, their prompt tokens)"""
+        counts = [message_tokens(message, self.model_name) for message in messages]
+        prompt_tokens = TOKENS_PER_REPLY + sum(counts)
+        allowed = self.max_request_tokens - max_output_tokens
+        if prompt_tokens > allowed:
+            if self.policy == BudgetPolicy.ERROR:
+                raise TokenBudgetExceeded(
+                    f"Request needs {prompt_tokens} prompt tokens, the budget allows {allowed}."
+                )
+            messages, prompt_tokens = self.__trim(list(messages), counts, allowed)
+        self.__check_session(session_id, prompt_tokens + max_output_tokens)
+        return messages, prompt_tokens
+
+    def charge(self, session_id: Optional[str], tokens: int) -> int:
+        """Add tokens to the usage of a session, returns its total"""
+        if session_id is None:
+            return 0
+        with self.__lock:
+            total = self.__sessions.pop(session_id, 0) + tokens
+            self.__sessions[session_id] = total
+            while len(self.__sessions) > self.max_sessions:
+                self.__sessions.popitem(last=False)
+        return total
+
+    def used(self, session_id: str) -> int:
+        """Tokens used by a session"""
+        with self.__lock:
+            return self.__sessions.get(session_id, 0)
+
+    def reset(self, session_id: str) -> None:
+        """Forget the usage of a session"""
+        with self.__lock:
+            self.__sessions.pop(session_id, None)
+
+    def __check_session(self, session_id: Optional[str], tokens: int) -> None:
+        if session_id is None or not self.max_session_tokens:
+            return
+        used = self.used(session_id)
+        if used + tokens > self.max_session_tokens:
+            raise TokenBudgetExceeded(
+                f"Session {session_id} used {used} of {self.max_session_tokens} tokens, "
+                f"this request needs up to {tokens} more."
+            )
+
+    def __trim(self, messages: list, counts: list, allowed: int) -> tuple:
+        """Truncate the system prompt, then drop old history, until the request fits.
+        History goes a whole turn at a time, oldest first, and the summary of
+        older turns (system messages after the prompt) goes last.
+        """
+        before = total = TOKENS_PER_REPLY + sum(counts)
+        has_system = messages[0].get("role") == "system"
+        # The context in the system prompt goes first, down to half the budget
+        if has_system:
+            floor = min(counts[0], allowed // 2)
+            target = max(allowed, total - counts[0] + floor)
+            total = self.__shrink_system(messages, counts, total, target)
+        # History sits between the system prompt and the new user message,
+        # summaries come first
+        first = 1 if has_system else 0
+        turns = first
+        while turns < len(messages) - 1 and messages[turns].get("role") == "system":
+            turns += 1
+        while total > allowed and turns < len(messages) - 1:
+            # A turn is a user message and the replies up to the next one
+            end = turns + 1
+            while end < len(messages) - 1 and messages[end].get("role") != "user":
+                end += 1
+            total -= sum(counts[turns:end])
+            del messages[turns:end], counts[turns:end]
+        while total > allowed and first < turns:
+            messages.pop(first)
+            total -= counts.pop(first)
+            turns -= 1
+        if has_system:
+            total = self.__shrink_system(messages, counts, total, allowed)
+        if total > allowed:
+            raise TokenBudgetExceeded(
+                f"Request needs {total} prompt tokens after trimming, the budget allows {allowed}."
+            )
+        log(f"Trimmed request from {before} to {total} prompt tokens.", self.log_level)
+        return messages, total
+
+    def __shrink_system(self, messages: list, counts: list, total: int, target: int) -> int:
+        """Truncate the system prompt so the request has at most target tokens"""
+        if total <= target:
+            return total
+        content = f"{messages[0].get('content') or ''}"
+        keep = max(0, counts[0] - TOKENS_PER_MESSAGE - (total - target))
+        messages[0] = {**messages[0], "content": truncate_to_tokens(content, keep, self.model_name)}
+        new_count = message_tokens(messages[0], self.model_name)
+        total += new_count - counts[0]
+        counts[0] = new_count
+        return total
@@ -0,0 +1,222 @@
+"""Batched and cached content moderation"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from openai import OpenAI
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.logger.tracing import span
+from genai_voice.models.http_pool import get_http_client
+
+
+@dataclass(frozen=True)
+class ModerationVerdict:
+    """Whether a text was flagged, and for which categories"""
+
+    flagged: bool
+    categories: tuple = ()
+
+
+CLEAN = ModerationVerdict(flagged=False)
+
+
+def normalize_text(text: str) -> str:
+    """Cache key of a text: lower case with collapsed whitespace"""
+    return " ".join(f"{text}".lower().split())
+
+
+class Moderator:
+    """Moderate texts with the OpenAI moderation API.
+
+    submit() returns at once with a future, so moderation runs while the
+    caller does other work (e.g. the LLM call). Texts submitted within
+    batch_window_ms of each other go to the API in one request, and
+    verdicts are cached per normalized text. The normalized text is only a
+    key, the API scores the text as the first caller submitted it. When the API fails or a
+    verdict takes longer than the caller waits, texts pass (or are flagged
+    with fail_closed) and nothing is cached.
+    """
+
+    def __init__(
+        self,
+        model: str = Config.MODERATION_MODEL,
+        batch_window_ms: float = Config.MODERATION_BATCH_WINDOW_MS,
+        max_batch: int = Config.MODERATION_MAX_BATCH,
+        cache_entries: int = Config.MODERATION_CACHE_ENTRIES,
+        fail_closed: bool = False,
+        client: Optional[Any] = None,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        model:           Moderation model
+        batch_window_ms: Time a text waits for others to share its request
+        max_batch:       Texts per request
+        cache_entries:   Verdicts kept in memory
+        fail_closed:     Flag texts when moderation fails instead of letting them pass
+        client:          OpenAI client, defaults to one on the shared connection pool
+        """
+        self.model = model
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        self.cache_entries = cache_entries
+        self.fail_closed = fail_closed
+        self.log_level = log_level
+        self.client = client or OpenAI(
+            api_key=Config.OPENAI_API_KEY, http_client=get_http_client()
+        )
+        self.__cache: OrderedDict = OrderedDict()
+        # Normalized text -> futures waiting for its verdict, before and
+        # while its request is made
+        self.__pending: dict = {}
+        self.__in_flight: dict = {}
+        # Normalized text -> text of its first caller, sent to the API
+        self.__texts: dict = {}
+        self.__condition = threading.Condition()
+        self.__batcher: Optional[threading.Thread] = None
+        self.__executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="moderation")
+
+    def submit(self, text: str) -> Future:
+        """Start moderating text, the future resolves to its ModerationVerdict"""
+        future = Future()
+        key = normalize_text(text)
+        if not key:
+            future.set_result(CLEAN)
+            return future
+        with self.__condition:
+            verdict = self.__cache.get(key)
+            if verdict is not None:
+                self.__cache.move_to_end(key)
+            elif key in self.__in_flight:
+                self.__in_flight[key].append(future)
+            else:
+                self.__texts.setdefault(key, f"{text}")
+                self.__pending.setdefault(key, []).append(future)
+                if self.__batcher is None:
+                    self.__batcher = threading.Thread(
+                        target=self.__run, name="moderation-batcher", daemon=True
+                    )
+                    self.__batcher.start()
+                self.__condition.notify()
+        if verdict is not None:
+            self.__count(verdict, "cache")
+            future.set_result(verdict)
+        return future
+
+    def wait(self, future: Future, timeout: Optional[float] = None) -> ModerationVerdict:
+        """Verdict of a submitted text, waiting at most timeout seconds"""
+        try:
+            return future.result(timeout=None if timeout is None else max(0.0, timeout))
+        except concurrent.futures.TimeoutError:
+            return self.__timed_out(timeout)
+
+    def check(self, text: str, timeout: Optional[float] = None) -> ModerationVerdict:
+        """Verdict of text, waiting at most timeout seconds"""
+        return self.wait(self.submit(text), timeout)
+
+    async def acheck(self, text: str, timeout: Optional[float] = None) -> ModerationVerdict:
+        """Verdict of text without blocking the event loop, waiting at most timeout seconds"""
+        future = asyncio.wrap_future(self.submit(text))
+        try:
+            # Shielded, the verdict is still cached for others
+            return await asyncio.wait_for(
+                asyncio.shield(future), None if timeout is None else max(0.0, timeout)
+            )
+        except asyncio.TimeoutError:
+            return self.__timed_out(timeout)
+
+    def check_many(self, texts: list) -> list:
+        """Verdicts of texts, moderated together"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def __run(self) -> None:
+        """Batcher thread, sends the texts gathered in each window together"""
+        while True:
+            with self.__condition:
+                while not self.__pending:
+                    self.__condition.wait()
+            if self.batch_window_ms:
+                time.sleep(self.batch_window_ms / 1000)
+            with self.__condition:
+                keys = list(self.__pending)[: self.max_batch]
+                texts = [self.__texts.pop(key) for key in keys]
+                for key in keys:
+                    self.__in_flight[key] = self.__pending.pop(key)
+            self.__executor.submit(self.__moderate, keys, texts)
+
+    def __moderate(self, keys: list, texts: list) -> None:
+        """One moderation request for texts, keys are their normalized forms"""
+        try:
+            with span("moderation", self.log_level):
+                response = self.client.moderations.create(model=self.model, input=texts)
+            verdicts = [
+                ModerationVerdict(
+                    flagged=result.flagged,
+                    categories=tuple(
+                        name
+                        for name, hit in result.categories.model_dump(by_alias=True).items()
+                        if hit
+                    ),
+                )
+                for result in response.results
+            ]
+            if len(verdicts) != len(texts):
+                raise ValueError(f"{len(verdicts)} moderation results for {len(texts)} texts.")
+            moderated = True
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            log(f"Moderation of {len(texts)} texts failed: {error}", self.log_level)
+            verdicts = [self.__unmoderated()] * len(texts)
+            moderated = False
+        with self.__condition:
+            waiting = [self.__in_flight.pop(key) for key in keys]
+            if moderated:
+                for key, verdict in zip(keys, verdicts):
+                    self.__cache[key] = verdict
+                while len(self.__cache) > self.cache_entries:
+                    self.__cache.popitem(last=False)
+        for verdict, futures in zip(verdicts, waiting):
+            self.__count(verdict, "api" if moderated else "error")
+            for future in futures:
+                # Cancelled when its caller went away
+                if not future.done():
+                    future.set_result(verdict)
+
+    def __unmoderated(self) -> ModerationVerdict:
+        """Verdict of a text moderation failed for"""
+        if self.fail_closed:
+            return ModerationVerdict(flagged=True, categories=("unmoderated",))
+        return CLEAN
+
+    def __timed_out(self, timeout: Optional[float]) -> ModerationVerdict:
+        log("No moderation verdict within %.1fs.", self.log_level, timeout or 0.0)
+        verdict = self.__unmoderated()
+        self.__count(verdict, "timeout")
+        return verdict
+
+    def __count(self, verdict: ModerationVerdict, source: str) -> None:
+        get_metrics().counter("genai_voice_moderation_total", "Moderated texts").inc(
+            flagged=str(verdict.flagged).lower(), source=source
+        )
+
+
+_moderator: Optional[Moderator] = None
+_moderator_lock = threading.Lock()
+
+
+def get_moderator() -> Moderator:
+    """Process-wide moderator, sharing batches and cached verdicts"""
+    global _moderator  # pylint: disable=global-statement
+    if _moderator is None:
+        with _moderator_lock:
+            if _moderator is None:
+                _moderator = Moderator()
+    return _moderator
@@ -1,21 +1,18 @@
 """Moderation.py"""
 
-import os
-
 from dotenv import load_dotenv
-from openai import OpenAI
 
 from genai_voice.defintions.prompts import BAD_PROMPT, GOOD_PROMPT
+from genai_voice.moderation.moderator import Moderator
 
 # load environment variables from .env file
 load_dotenv(override=True)
 
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-response = client.moderations.create(input=[BAD_PROMPT, GOOD_PROMPT])
-
-for result in response.results:
-    if result.flagged:
-        print("something bad")
-    else:
-        print("something good")
-    # print(result.categories)
+if __name__ == "__main__":
+    moderator = Moderator()
+    for verdict in moderator.check_many([BAD_PROMPT, GOOD_PROMPT]):
+        if verdict.flagged:
+            print("something bad")
+        else:
+            print("something good")
+        # print(verdict.categories)
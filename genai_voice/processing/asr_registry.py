@@ -0,0 +1,260 @@
+"""ASR Model Registry"""
+
+# torch and transformers take seconds to import, they are only loaded with a model
+# pylint: disable=import-outside-toplevel
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.tracing import span
+
+# Whisper models are trained on 16 kHz audio
+WARMUP_SAMPLING_RATE = Config.ASR_SAMPLING_RATE
+
+
+def default_device() -> str:
+    """Pick the device the ASR model should run on"""
+    try:
+        import torch
+    except ImportError:
+        # Custom loaders may not need torch, the default one fails on load
+        return "cpu"
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _load_pipeline(model_name: str, device: str, dtype: Optional[str]) -> Any:
+    """Build a transformers speech recognition pipeline"""
+    import torch
+    from transformers import pipeline
+
+    kwargs = {}
+    if dtype:
+        kwargs["torch_dtype"] = getattr(torch, dtype)
+    return pipeline(
+        task="automatic-speech-recognition",
+        model=model_name,
+        device=device,
+        **kwargs,
+    )
+
+
+@dataclass
+class ASRModelStats:
+    """Timings collected for a single loaded model"""
+
+    load_seconds: float = 0.0
+    warmup_seconds: float = 0.0
+    inference_count: int = 0
+    inference_seconds: float = 0.0
+    last_inference_seconds: float = 0.0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Entry:
+    """A loaded model and the lock that serializes inference on it"""
+
+    transcriber: Any
+    stats: ASRModelStats
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ASRModelRegistry:
+    """Process-wide cache of speech recognition pipelines.
+
+    Models are keyed by (model name, device, dtype), loaded on first use,
+    warmed up once and unloaded after being idle for idle_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        idle_ttl_seconds: float = Config.ASR_MODEL_IDLE_TTL_SECONDS,
+        loader: Callable[[str, str, Optional[str]], Any] = _load_pipeline,
+        warmup: bool = True,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        idle_ttl_seconds: Unload models not used for this long, 0 disables unloading
+        loader:           Callable building a pipeline from (model, device, dtype)
+        warmup:           Run a silent clip through each model right after loading
+        """
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.log_level = log_level
+        self.__loader = loader
+        self.__warmup = warmup
+        self.__entries: dict[tuple, _Entry] = {}
+        self.__load_locks: dict[tuple, threading.Lock] = {}
+        self.__lock = threading.Lock()
+        self.__reaper: Optional[threading.Thread] = None
+        self.__stop = threading.Event()
+
+    @staticmethod
+    def key(
+        model_name: str = Config.ASR_MODEL_NAME,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+    ) -> tuple:
+        """Registry key for a model"""
+        return (model_name, device or default_device(), dtype)
+
+    def get(
+        self,
+        model_name: str = Config.ASR_MODEL_NAME,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+    ) -> Any:
+        """Return the pipeline for the model, loading it if needed"""
+        return self.__get_entry(self.key(model_name, device, dtype)).transcriber
+
+    def transcribe(
+        self,
+        sampling_rate: int,
+        raw_audio_data: np.ndarray,
+        model_name: str = Config.ASR_MODEL_NAME,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+    ) -> str:
+        """Run speech recognition on float32 mono audio"""
+        entry = self.__get_entry(self.key(model_name, device, dtype))
+        with entry.lock, span("asr", self.log_level):
+            start = time.perf_counter()
+            text = entry.transcriber(
+                {"sampling_rate": sampling_rate, "raw": raw_audio_data}
+            )["text"]
+            elapsed = time.perf_counter() - start
+            entry.stats.inference_count += 1
+            entry.stats.inference_seconds += elapsed
+            entry.stats.last_inference_seconds = elapsed
+            entry.stats.last_used = time.monotonic()
+        return text
+
+    def unload(
+        self,
+        model_name: str = Config.ASR_MODEL_NAME,
+        device: Optional[str] = None,
+        dtype: Optional[str] = None,
+    ) -> bool:
+        """Drop a loaded model, returns whether it was loaded"""
+        with self.__lock:
+            entry = self.__entries.pop(self.key(model_name, device, dtype), None)
+        if entry is None:
+            return False
+        self.__release(entry)
+        return True
+
+    def unload_idle(self) -> list:
+        """Unload every model idle for longer than the TTL"""
+        if not self.idle_ttl_seconds:
+            return []
+        now = time.monotonic()
+        with self.__lock:
+            expired = [
+                key
+                for key, entry in self.__entries.items()
+                if now - entry.stats.last_used > self.idle_ttl_seconds
+                and not entry.lock.locked()
+            ]
+            entries = [self.__entries.pop(key) for key in expired]
+        for key, entry in zip(expired, entries):
+            log(f"Unloading idle ASR model {key}.", self.log_level)
+            self.__release(entry)
+        return expired
+
+    def clear(self) -> None:
+        """Unload all models and stop the idle reaper"""
+        self.__stop.set()
+        self.__reaper = None
+        with self.__lock:
+            entries = list(self.__entries.values())
+            self.__entries.clear()
+        for entry in entries:
+            self.__release(entry)
+
+    def stats(self) -> dict:
+        """Load and inference timings per loaded model"""
+        with self.__lock:
+            return {key: entry.stats for key, entry in self.__entries.items()}
+
+    def __get_entry(self, key: tuple) -> _Entry:
+        entry = self.__entries.get(key)
+        if entry is None:
+            with self.__lock:
+                load_lock = self.__load_locks.setdefault(key, threading.Lock())
+            # Only one thread loads a given model, the rest wait for it
+            with load_lock:
+                entry = self.__entries.get(key)
+                if entry is None:
+                    entry = self.__load(key)
+                    with self.__lock:
+                        self.__entries[key] = entry
+                    self.__start_reaper()
+        entry.stats.last_used = time.monotonic()
+        return entry
+
+    def __load(self, key: tuple) -> _Entry:
+        model_name, device, dtype = key
+        log(f"Loading ASR model {model_name} on {device}.", self.log_level)
+        start = time.perf_counter()
+        transcriber = self.__loader(model_name, device, dtype)
+        stats = ASRModelStats(load_seconds=time.perf_counter() - start)
+        if self.__warmup:
+            start = time.perf_counter()
+            transcriber(
+                {
+                    "sampling_rate": WARMUP_SAMPLING_RATE,
+                    "raw": np.zeros(WARMUP_SAMPLING_RATE, dtype=np.float32),
+                }
+            )
+            stats.warmup_seconds = time.perf_counter() - start
+        log(
+            f"Loaded ASR model {model_name} in {stats.load_seconds:.2f}s "
+            f"(warmup {stats.warmup_seconds:.2f}s).",
+            self.log_level,
+        )
+        return _Entry(transcriber=transcriber, stats=stats)
+
+    def __release(self, entry: _Entry) -> None:
+        import torch
+
+        # In-flight callers still hold the entry, the model is freed once they finish
+        entry.stats.last_used = 0.0
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def __start_reaper(self) -> None:
+        if not self.idle_ttl_seconds or self.__reaper is not None:
+            return
+        self.__stop = threading.Event()
+        self.__reaper = threading.Thread(
+            target=self.__reap,
+            args=(self.__stop,),
+            name="asr-registry-reaper",
+            daemon=True,
+        )
+        self.__reaper.start()
+
+    def __reap(self, stop: threading.Event) -> None:
+        interval = max(1.0, self.idle_ttl_seconds / 2)
+        while not stop.wait(interval):
+            self.unload_idle()
+
+
+_registry: Optional[ASRModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_asr_registry() -> ASRModelRegistry:
+    """Process-wide ASR model registry shared by every Audio instance"""
+    global _registry  # pylint: disable=global-statement
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ASRModelRegistry()
+    return _registry
@@ -1,19 +1,26 @@
 """Audio"""
 
-import os
-import wave
+# Speech, playback and recording libraries are slow to import, so they are
+# imported where they are used and text-only users never load them
+# pylint: disable=import-outside-toplevel
+
+import contextvars
+import queue
+import threading
 from io import BytesIO
+from typing import TYPE_CHECKING, Callable, Iterable, Optional, Union
 
-import numpy as np
-import torch
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log
+from genai_voice.logger.tracing import span
+from genai_voice.processing.asr_registry import ASRModelRegistry, get_asr_registry
+from genai_voice.processing.preprocess import prepare_for_asr, wav_to_array
+from genai_voice.processing.sentences import iter_sentences
+from genai_voice.processing.streaming_asr import StreamingTranscriber, TranscriptEvent
+from genai_voice.processing.tts_cache import TTSCache, get_tts_cache
 
-import speech_recognition as sr
-import pyttsx3
-from gtts import gTTS
-from pydub import AudioSegment
-from pydub.playback import play
-from transformers import pipeline
-from st_audiorec import st_audiorec # does not have audio processing
+if TYPE_CHECKING:
+    from pydub import AudioSegment
 
 # If having trouble with ffmpeg, setting these may help
 # AudioSegment.converter = "C:\\ffmpeg\\ffmpeg\\bin\\ffmpeg.exe"
@@ -24,46 +31,174 @@ from st_audiorec import st_audiorec # does not have audio processing
 class Audio:
     """Audio Class"""
 
-    def __init__(self) -> None:
-        """Initialize speech recognition object"""
-        self.recognizer = sr.Recognizer()
+    def __init__(
+        self,
+        tts_cache: Optional[TTSCache] = None,
+        asr_registry: Optional[ASRModelRegistry] = None,
+    ) -> None:
+        """Initialize speech recognition object
+
+        tts_cache:    cache of synthesized phrases, defaults to the process-wide cache
+        asr_registry: speech recognition models, defaults to the process-wide registry
+        """
+        self.__recognizer = None
         self.microphone = None
+        self.tts_cache = tts_cache if tts_cache is not None else get_tts_cache()
+        self.asr_registry = asr_registry if asr_registry is not None else get_asr_registry()
 
         # Disable mic by default
         self.mic_enabled = False
 
+    @property
+    def recognizer(self):
+        """Speech recognition object, created on first use"""
+        if self.__recognizer is None:
+            import speech_recognition as sr
+
+            self.__recognizer = sr.Recognizer()
+        return self.__recognizer
+
     def initialize_microphone(self, device_index):
         """Initialize microphone object with appropriate device
 
         device_index: int indicating the index of the microphone
         """
+        import speech_recognition as sr
+
         self.microphone = sr.Microphone(device_index)
         self.mic_enabled = True
 
+    @staticmethod
+    def synthesize_mp3(phrase) -> bytes:
+        """Convert text to mp3 encoded speech with gTTS
+
+        phrase: the string to convert to speech
+        """
+        from gtts import gTTS
+
+        buffer = BytesIO()
+        gTTS(phrase, lang=Config.TTS_LANGUAGE).write_to_fp(buffer)
+        return buffer.getvalue()
+
+    def synthesize(self, phrase) -> "AudioSegment":
+        """Convert text to speech, keeping the encoded audio in memory.
+        Phrases already synthesized are served from the TTS cache.
+
+        phrase: the string to convert to speech
+        """
+        from pydub import AudioSegment
+
+        with span("tts"):
+            audio = self.tts_cache.get_or_synthesize(
+                phrase, self.synthesize_mp3, lang=Config.TTS_LANGUAGE, engine="gtts"
+            )
+            return AudioSegment.from_file(BytesIO(audio), format="mp3")
+
+    def prewarm_tts(self, phrases: Iterable[str]) -> int:
+        """Synthesize phrases ahead of time (greetings, fallbacks, ...)
+        so they play without a network round trip.
+
+        phrases: the strings to cache
+        returns: the number of phrases that were not cached yet
+        """
+        return self.tts_cache.prewarm(
+            phrases, self.synthesize_mp3, lang=Config.TTS_LANGUAGE, engine="gtts"
+        )
+
+    def speak_offline(self, phrase):
+        """Offline speech, more robotic but needs no network
+
+        phrase: the string to convert to speech
+        """
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        engine.say(phrase)
+        engine.runAndWait()
+
     def communicate(self, phrase="You forgot to pass the text"):
-        """Audio approach that saves to a file and then plays it.
-        Could be sped up by doing a sentence at a time.
+        """Synthesizes the whole phrase in memory and then plays it.
+        See communicate_pipelined to start playing after the first sentence.
 
         phrase: the string to convert to speech
         """
+        from gtts import gTTSError
+        from pydub.playback import play
 
         try: # online
-            temp_file = "temp.mp3"
-            gTTS(phrase).save(temp_file)
-            audio_file = AudioSegment.from_mp3(temp_file)
-            play(audio_file)
-            os.remove(temp_file)
-        except (IOError, OSError) as e: # offline
-            # Handle specific file-related exceptions
-            print(f"Error handling audio file: {e}")
-            # Option without temporary mp3 but it's more robotic
-            engine = pyttsx3.init()
-            engine.say(phrase)
-            engine.runAndWait()
+            play(self.synthesize(phrase))
+        except (IOError, OSError, gTTSError) as e: # offline
+            print(f"Error synthesizing audio: {e}")
+            self.speak_offline(phrase)
         except Exception as e:
             # Catch other unexpected exceptions
             raise ValueError(f"Unexpected error: {e}") from e
 
+    def communicate_pipelined(
+        self,
+        text: Union[str, Iterable[str]],
+        lookahead: int = 1,
+        cancel: Optional[threading.Event] = None,
+    ):
+        """Plays text one sentence at a time, synthesizing the next sentence
+        while the current one plays.
+
+        text:      the string to convert to speech, or an iterable of text
+                   chunks (e.g. streamed LLM deltas) so speech can start
+                   before the full text is known
+        lookahead: number of synthesized sentences buffered ahead of playback
+        cancel:    when set, playback stops before the next sentence
+        """
+        from gtts import gTTSError
+        from pydub.playback import play
+
+        sentences = iter_sentences((text,) if isinstance(text, str) else text)
+        segments = queue.Queue(maxsize=max(1, lookahead))
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    segments.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def synthesize_sentences():
+            try:
+                for sentence in sentences:
+                    try:
+                        segment = self.synthesize(sentence)
+                    except (IOError, OSError, gTTSError) as e: # offline
+                        print(f"Error synthesizing audio: {e}")
+                        segment = None
+                    if not put((sentence, segment)):
+                        return
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                put(e)
+                return
+            put(None)
+
+        # Run in the caller's context so TTS spans keep its trace ID
+        synthesizer = threading.Thread(
+            target=contextvars.copy_context().run, args=(synthesize_sentences,), daemon=True
+        )
+        synthesizer.start()
+        try:
+            while (item := segments.get()) is not None:
+                if cancel is not None and cancel.is_set():
+                    break
+                if isinstance(item, Exception):
+                    raise ValueError(f"Unexpected error: {item}") from item
+                sentence, segment = item
+                if segment is None:
+                    self.speak_offline(sentence)
+                else:
+                    play(segment)
+        finally:
+            stop.set()
+
     def recognize_speech_from_mic(self):
         """Transcribes speech from a microphone
 
@@ -74,6 +209,8 @@ class Audio:
             unrecognizable
         """
 
+        import speech_recognition as sr
+
         # Adjust the recognizer sensitivity for ambient noise and listen to the microphone
         with self.microphone as source:
             self.recognizer.adjust_for_ambient_noise(source)
@@ -96,11 +233,47 @@ class Audio:
 
         return response
 
+    def listen_streaming(
+        self,
+        on_transcript: Callable[[TranscriptEvent], None],
+        transcriber: Optional[StreamingTranscriber] = None,
+        chunk_seconds: float = Config.STREAMING_ASR_CHUNK_SECONDS,
+    ) -> Callable:
+        """Transcribes the microphone in the background while the user speaks
+
+        on_transcript is called with every partial and final transcript.
+        Returns a function stopping the listener.
+        """
+        transcriber = transcriber or StreamingTranscriber(self.asr_registry.transcribe)
+
+        def on_audio(_, audio_data):
+            try:
+                sampling_rate, raw_audio_data = wav_to_array(audio_data.get_wav_data())
+                event = transcriber.feed(sampling_rate, raw_audio_data)
+                if event is not None:
+                    on_transcript(event)
+                # Phrases cut by the time limit go on, shorter ones ended in a pause
+                if len(raw_audio_data) < sampling_rate * chunk_seconds * 0.95:
+                    event = transcriber.flush()
+                    if event is not None:
+                        on_transcript(event)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                log(f"Streaming transcription failed: {e}")
+
+        with self.microphone as source:
+            self.recognizer.adjust_for_ambient_noise(source)
+        return self.recognizer.listen_in_background(
+            self.microphone, on_audio, phrase_time_limit=chunk_seconds
+        )
+
     def get_streamlit_audio(self):
         """
         Uses streamlit component to get the audio data
         https://github.com/stefanrmmr/streamlit-audio-recorder
         """
+        # st_audiorec does not have audio processing, it pulls in streamlit
+        from st_audiorec import st_audiorec
+
         try:
             audio_wave_bytes = st_audiorec()
         except Exception as e:
@@ -110,46 +283,45 @@ class Audio:
     def convert_streamlit_audio_to_gradio_format(self, audio_wave_bytes):
         """Takes audio wave bytes and returns it in the format of gradio audio object
         sampling_rate, raw_audio_data = audio
+
+        raw_audio_data is a view of audio_wave_bytes, the samples are not copied
         """
         if not audio_wave_bytes:
             raise ValueError("No audio wave bytes received.")
-        with wave.open(BytesIO(audio_wave_bytes), "rb") as wf:
-            params = wf.getparams()
-            sampling_rate = params.framerate
-            num_channels = params.nchannels
-            num_frames = params.nframes
-            raw_audio_data = np.frombuffer(wf.readframes(num_frames), dtype=np.int16)
+        return wav_to_array(audio_wave_bytes)
 
-            if num_channels > 1:
-                raw_audio_data = raw_audio_data.reshape(-1, num_channels)
-        return (sampling_rate, raw_audio_data)
+    def prepare_for_asr(self, audio):
+        """Mono 16 kHz float32 speech from a gradio audio object
 
-    def transcribe_from_transformer(
-        self, audio, model_name_and_version="openai/whisper-base.en"
-    ):
-        """Convert audio data to text using transformers"""
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        transcriber = pipeline(
-            task="automatic-speech-recognition",
-            model=model_name_and_version,
-            device=device,
-        )
+        Returns (sampling_rate, audio), or None if the clip is silent
+        """
         try:
             sampling_rate, raw_audio_data = audio
         except TypeError as e:
             raise TypeError("No audio data received. Please speak louder.") from e
+        sampling_rate, raw_audio_data, result = prepare_for_asr(
+            sampling_rate, raw_audio_data
+        )
+        if not result.is_speech:
+            log(f"No speech detected in {result.total_samples} samples, skipping ASR.")
+            return None
+        log(
+            f"Trimmed {result.trimmed_samples} of {result.total_samples} silent samples."
+        )
+        return sampling_rate, raw_audio_data
 
-        # Convert to mono if stereo
-        if raw_audio_data.ndim > 1:
-            raw_audio_data = raw_audio_data.mean(axis=1)
-
-        raw_audio_data = raw_audio_data.astype(np.float32)
-        raw_audio_data /= np.max(np.abs(raw_audio_data))
-
-        prompt = transcriber({"sampling_rate": sampling_rate, "raw": raw_audio_data})[
-            "text"
-        ]
-        return prompt
+    def transcribe_from_transformer(
+        self, audio, model_name_and_version=Config.ASR_MODEL_NAME
+    ):
+        """Convert audio data to text using transformers"""
+        # Skip the model entirely when there is nothing to transcribe
+        prepared = self.prepare_for_asr(audio)
+        if prepared is None:
+            return ""
+        sampling_rate, raw_audio_data = prepared
+        return self.asr_registry.transcribe(
+            sampling_rate, raw_audio_data, model_name=model_name_and_version
+        )
 
     def get_prompt_from_gradio_audio(self, audio):
         """
@@ -158,32 +330,12 @@ class Audio:
         audio: object containing sampling frequency and raw audio data
 
         """
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        transcriber = pipeline(
-            "automatic-speech-recognition",
-            model="openai/whisper-base.en",
-            device=device,
-            model_kwargs={"force_download": True}
-        )
-        try:
-            sampling_rate, raw_audio_data = audio
-        except TypeError as e:
-            raise TypeError("No audio data received. Please speak louder.") from e
-
-        # Convert to mono if stereo
-        if raw_audio_data.ndim > 1:
-            raw_audio_data = raw_audio_data.mean(axis=1)
-
-        raw_audio_data = raw_audio_data.astype(np.float32)
-        raw_audio_data /= np.max(np.abs(raw_audio_data))
-
-        prompt = transcriber({"sampling_rate": sampling_rate, "raw": raw_audio_data})[
-            "text"
-        ]
-        return prompt
+        return self.transcribe_from_transformer(audio)
 
     def get_prompt_from_file(self, file):
         """Get Prompt from audio file"""
+        import speech_recognition as sr
+
         try:
             speech = sr.AudioFile(file)
         except Exception as e:
@@ -195,6 +347,8 @@ class Audio:
 
 
 if __name__ == "__main__":
+    import speech_recognition as sr
+
     recognized_mics = {}
     test_audio = Audio()
     for i, mic in enumerate(sr.Microphone.list_microphone_names()):
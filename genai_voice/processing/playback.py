@@ -0,0 +1,191 @@
+"""Background speech playback"""
+
+import contextvars
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.tracing import span
+
+
+class StalePolicy(IntEnum):
+    """What to do with a new utterance when the queue is full"""
+
+    DROP_NEW = 1
+    DROP_OLDEST = 2
+    REPLACE = 3
+
+
+@dataclass
+class PlaybackStats:
+    """Playback counters"""
+
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    submitted: int = 0
+    played: int = 0
+    dropped: int = 0
+    cancelled: int = 0
+    failed: int = 0
+
+
+class Utterance:
+    """Handle to a queued or playing utterance"""
+
+    def __init__(self, utterance_id: int, text: Any) -> None:
+        self.utterance_id = utterance_id
+        self.text = text
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        # Context of the submitter, so playback spans keep its trace ID
+        self.context = contextvars.copy_context()
+
+    def cancel(self) -> None:
+        """Stop the utterance, playback ends at the next sentence boundary"""
+        self.cancelled.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the utterance finished, was dropped or was cancelled"""
+        return self.done.wait(timeout)
+
+
+class PlaybackWorker:
+    """Plays utterances one at a time on a single thread.
+
+    Utterances wait in a queue of at most max_queue entries. When it is full
+    the policy decides whether the new utterance is dropped (DROP_NEW), the
+    oldest waiting one is dropped (DROP_OLDEST), or everything queued and
+    playing is discarded in favour of the new one (REPLACE).
+    """
+
+    def __init__(
+        self,
+        speak: Callable[[Any, threading.Event], None],
+        max_queue: int = Config.PLAYBACK_MAX_QUEUE,
+        policy: StalePolicy = StalePolicy.DROP_OLDEST,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        speak:     Callable (text, cancelled event) playing an utterance
+        max_queue: Maximum number of utterances waiting to be played
+        policy:    What to do with a new utterance when the queue is full
+        """
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.log_level = log_level
+        self.stats = PlaybackStats()
+        self.__speak = speak
+        self.__queue: deque[Utterance] = deque()
+        self.__current: Optional[Utterance] = None
+        self.__ids = itertools.count(1)
+        self.__condition = threading.Condition()
+        self.__thread: Optional[threading.Thread] = None
+        self.__closed = False
+
+    @property
+    def current(self) -> Optional[Utterance]:
+        """The utterance being played, if any"""
+        return self.__current
+
+    def submit(self, text: Any) -> Utterance:
+        """Queue text (or an iterable of text chunks) for playback"""
+        utterance = Utterance(next(self.__ids), text)
+        with self.__condition:
+            if self.__closed:
+                raise ValueError("Playback worker is closed.")
+            self.stats.submitted += 1
+            if self.policy == StalePolicy.REPLACE:
+                self.__replace()
+            elif len(self.__queue) >= self.max_queue:
+                if self.policy == StalePolicy.DROP_NEW:
+                    self.__drop(utterance)
+                    return utterance
+                self.__drop(self.__queue.popleft())
+            self.__queue.append(utterance)
+            self.__update_depth()
+            self.__start()
+            self.__condition.notify()
+        return utterance
+
+    def cancel_current(self) -> bool:
+        """Cancel the utterance being played, returns whether one was playing"""
+        current = self.__current
+        if current is None:
+            return False
+        current.cancel()
+        return True
+
+    def cancel_all(self) -> None:
+        """Cancel the utterance being played and drop everything queued"""
+        with self.__condition:
+            self.__replace()
+
+    def close(self, wait: bool = True) -> None:
+        """Stop accepting utterances, dropping queued ones"""
+        with self.__condition:
+            self.__closed = True
+            self.__replace()
+            self.__condition.notify()
+            thread = self.__thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __drop(self, utterance: Utterance) -> None:
+        self.stats.dropped += 1
+        utterance.cancel()
+        utterance.done.set()
+        log(f"Dropped stale utterance #{utterance.utterance_id}.", self.log_level)
+
+    def __replace(self) -> None:
+        while self.__queue:
+            self.__drop(self.__queue.popleft())
+        if self.__current is not None:
+            self.__current.cancel()
+        self.__update_depth()
+
+    def __update_depth(self) -> None:
+        self.stats.queue_depth = len(self.__queue)
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self.__queue))
+
+    def __start(self) -> None:
+        if self.__thread is None:
+            self.__thread = threading.Thread(
+                target=self.__run, name="playback-worker", daemon=True
+            )
+            self.__thread.start()
+
+    def __play(self, utterance: Utterance) -> None:
+        with span("playback", self.log_level):
+            self.__speak(utterance.text, utterance.cancelled)
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__queue and not self.__closed:
+                    self.__condition.wait()
+                if not self.__queue:
+                    return
+                utterance = self.__queue.popleft()
+                self.__current = utterance
+                self.__update_depth()
+            failed = False
+            try:
+                if not utterance.cancelled.is_set():
+                    utterance.context.run(self.__play, utterance)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                failed = True
+                log(f"Playback failed: {e}", self.log_level)
+            with self.__condition:
+                self.__current = None
+                if failed:
+                    self.stats.failed += 1
+                elif utterance.cancelled.is_set():
+                    self.stats.cancelled += 1
+                else:
+                    self.stats.played += 1
+            utterance.done.set()
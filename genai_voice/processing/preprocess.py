@@ -0,0 +1,165 @@
+"""Audio preprocessing for speech recognition
+
+Every step works on float32 and writes into a single buffer: the raw
+samples are converted once, trimming returns a view and normalization is
+done in place. Resampling allocates only when the rate has to change.
+The caller's samples are never modified unless it hands its buffer over
+with out= or inplace=True.
+"""
+
+import struct
+from typing import Optional, Union
+
+import numpy as np
+
+from genai_voice.config.defaults import Config
+from genai_voice.processing.vad import VADResult, full_scale_of, trim_silence
+
+# WAV format codes
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def wav_to_array(data: Union[bytes, bytearray, memoryview]) -> tuple:
+    """Parse WAV bytes into (sampling_rate, samples) without copying the samples.
+
+    The samples are a read-only view of data with shape (frames,) for mono
+    or (frames, channels) otherwise.
+    """
+    view = memoryview(data)
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Audio data is not a WAV file.")
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset : offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", view, body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The actual format code starts the sub-format GUID
+                (sub_format,) = struct.unpack_from("<H", view, body + 24)
+                fmt = (sub_format,) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes its format chunk.")
+            audio_format, channels, sampling_rate, _, _, bits = fmt
+            if audio_format == _WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                dtype = np.float32
+            elif audio_format == _WAVE_FORMAT_PCM and bits // 8 in _PCM_DTYPES:
+                dtype = _PCM_DTYPES[bits // 8]
+            else:
+                raise ValueError(f"Unsupported WAV format {audio_format} ({bits} bits).")
+            size = min(chunk_size, len(view) - body)
+            size -= size % (np.dtype(dtype).itemsize * channels)
+            samples = np.frombuffer(view[body : body + size], dtype=dtype)
+            if channels > 1:
+                samples = samples.reshape(-1, channels)
+            return sampling_rate, samples
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV file has no data chunk.")
+
+
+def to_mono_float32(
+    raw_audio_data: np.ndarray, out: Optional[np.ndarray] = None, inplace: bool = False
+) -> np.ndarray:
+    """Downmix to mono float32 scaled to [-1, 1] in a single buffer.
+
+    out:     optional preallocated float32 buffer with room for every frame
+    inplace: return writable mono float32 input as is instead of a copy, later
+             steps (e.g. normalize_peak) then modify the caller's samples
+    """
+    frames = raw_audio_data.shape[0]
+    channels = raw_audio_data.shape[1] if raw_audio_data.ndim > 1 else 1
+    if raw_audio_data.dtype == np.uint8:
+        # 8 bit WAV is unsigned around 128
+        raw_audio_data = raw_audio_data.view(np.int8) ^ np.int8(-128)
+    scale = np.float32(1.0 / (full_scale_of(raw_audio_data.dtype) * channels))
+    if (
+        inplace
+        and out is None
+        and channels == 1
+        and raw_audio_data.dtype == np.float32
+        and raw_audio_data.flags.writeable
+    ):
+        # Already in the right format, work in place
+        return raw_audio_data
+    if out is None:
+        out = np.empty(frames, dtype=np.float32)
+    else:
+        out = out[:frames]
+    if channels == 1:
+        np.multiply(raw_audio_data, scale, out=out, casting="unsafe")
+        return out
+    np.copyto(out, raw_audio_data[:, 0], casting="unsafe")
+    for channel in range(1, channels):
+        np.add(out, raw_audio_data[:, channel], out=out, casting="unsafe")
+    out *= scale
+    return out
+
+
+def resample(
+    audio: np.ndarray, sampling_rate: int, target_rate: int = Config.ASR_SAMPLING_RATE
+) -> np.ndarray:
+    """Resample float32 mono audio.
+
+    Integer downsampling ratios (48k or 32k to 16k) average each group of
+    samples, which also filters out most of the aliasing; other ratios use
+    linear interpolation.
+    """
+    if sampling_rate == target_rate or len(audio) == 0:
+        return audio
+    if sampling_rate % target_rate == 0:
+        factor = sampling_rate // target_rate
+        frames = len(audio) // factor
+        return audio[: frames * factor].reshape(frames, factor).mean(
+            axis=1, dtype=np.float32
+        )
+    frames = int(len(audio) * target_rate / sampling_rate)
+    positions = np.arange(frames, dtype=np.float32)
+    positions *= np.float32(sampling_rate / target_rate)
+    index = positions.astype(np.intp)
+    np.minimum(index, len(audio) - 2, out=index)
+    positions -= index
+    # out = a + (b - a) * fraction, reusing the buffers allocated above
+    left = audio[index]
+    right = audio[index + 1]
+    right -= left
+    right *= positions
+    right += left
+    return right
+
+
+def normalize_peak(audio: np.ndarray) -> np.ndarray:
+    """Scale float32 audio in place so its peak is 1, silent audio is left as is"""
+    if len(audio) == 0:
+        return audio
+    peak = max(float(audio.max()), -float(audio.min()))
+    if peak > 0:
+        audio *= np.float32(1.0 / peak)
+    return audio
+
+
+def prepare_for_asr(
+    sampling_rate: int,
+    raw_audio_data: np.ndarray,
+    target_rate: int = Config.ASR_SAMPLING_RATE,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> tuple:
+    """Mono downmix, silence trimming, resampling and peak normalization.
+
+    Returns (target_rate, audio, vad_result), audio is empty when no speech
+    was detected. raw_audio_data is left unchanged unless inplace is set
+    (see to_mono_float32).
+    """
+    mono = to_mono_float32(raw_audio_data, out=out, inplace=inplace)
+    vad_result: VADResult = trim_silence(mono, sampling_rate, full_scale=1.0)
+    if not vad_result.is_speech:
+        return target_rate, vad_result.audio, vad_result
+    audio = resample(vad_result.audio, sampling_rate, target_rate)
+    return target_rate, normalize_peak(audio), vad_result
@@ -0,0 +1,37 @@
+"""Sentence segmentation for speech synthesis"""
+
+import re
+from typing import Iterable, Iterator
+
+# End of a sentence: terminal punctuation (plus closing quotes or brackets)
+# followed by whitespace, or a line break
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+# Sentences shorter than this are merged with the next one, avoiding a
+# synthesis round trip for fragments like "Sure." or "1."
+MIN_SENTENCE_CHARS = 20
+
+
+def iter_sentences(
+    chunks: Iterable[str], min_chars: int = MIN_SENTENCE_CHARS
+) -> Iterator[str]:
+    """Assemble a stream of text chunks (e.g. LLM deltas) into sentences,
+    yielding each sentence as soon as its end has been received.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            sentence = buffer[start : match.end()].strip()
+            if len(sentence) >= min_chars:
+                yield sentence
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> list:
+    """Split a complete text into sentences"""
+    return list(iter_sentences((text,), min_chars))
@@ -0,0 +1,168 @@
+"""Streaming speech recognition"""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.processing.asr_registry import get_asr_registry
+from genai_voice.processing.preprocess import normalize_peak, resample, to_mono_float32
+from genai_voice.processing.vad import frame_energy_dbfs
+
+
+@dataclass
+class TranscriptEvent:
+    """Transcript of the utterance so far"""
+
+    text: str
+    is_final: bool
+
+
+class StreamingTranscriber:
+    """Transcribes audio fed in chunks while the user is speaking.
+
+    Chunks are converted to 16 kHz mono and appended to a fixed size segment
+    buffer. While speech goes on, the segment is transcribed every
+    partial_interval_ms for a partial transcript. A short pause (pause_ms)
+    commits the segment: its text is kept and the buffer starts over, so
+    inference only ever runs on the audio since the last pause. After
+    end_silence_ms of silence the utterance is final; by then the last
+    segment was normally committed at the pause, so no inference is left to
+    run and the final transcript comes back immediately.
+    """
+
+    def __init__(
+        self,
+        transcribe: Optional[Callable[[int, np.ndarray], str]] = None,
+        partial_interval_ms: float = Config.STREAMING_ASR_PARTIAL_MS,
+        pause_ms: float = Config.STREAMING_ASR_PAUSE_MS,
+        end_silence_ms: float = Config.STREAMING_ASR_END_SILENCE_MS,
+        max_segment_seconds: float = Config.STREAMING_ASR_MAX_SEGMENT_SECONDS,
+        threshold_dbfs: float = Config.VAD_THRESHOLD_DBFS,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        transcribe:          Callable (sampling rate, float32 audio) -> text,
+                             defaults to the shared ASR model registry
+        partial_interval_ms: Audio between partial transcripts
+        pause_ms:            Silence committing the current segment
+        end_silence_ms:      Silence ending the utterance
+        max_segment_seconds: Longest segment, longer speech is committed in pieces
+        threshold_dbfs:      Frame energy above which a frame is speech
+        """
+        self.sampling_rate = Config.ASR_SAMPLING_RATE
+        self.transcribe = transcribe or get_asr_registry().transcribe
+        self.partial_interval = int(self.sampling_rate * partial_interval_ms / 1000)
+        self.pause_ms = pause_ms
+        self.end_silence_ms = end_silence_ms
+        self.threshold_dbfs = threshold_dbfs
+        self.log_level = log_level
+        self.__frame_length = int(self.sampling_rate * Config.VAD_FRAME_MS / 1000)
+        self.__padding = int(self.sampling_rate * Config.VAD_PADDING_MS / 1000)
+        self.__buffer = np.zeros(
+            int(self.sampling_rate * max_segment_seconds), dtype=np.float32
+        )
+        self.__lock = threading.Lock()
+        self.__reset()
+
+    def feed(self, sampling_rate: int, chunk: np.ndarray) -> Optional[TranscriptEvent]:
+        """Add a chunk of audio, returns a transcript event when there is news"""
+        with self.__lock:
+            audio = resample(to_mono_float32(chunk), sampling_rate, self.sampling_rate)
+            self.__track_silence(audio)
+            if self.__in_utterance:
+                self.__append(audio)
+            else:
+                self.__keep_padding(audio)
+
+            if self.__in_utterance and self.__silence_ms >= self.end_silence_ms:
+                return self.__finish()
+            if self.__segment_has_speech and self.__silence_ms >= self.pause_ms:
+                self.__commit()
+                return TranscriptEvent(self.__text(), False)
+            if self.__segment_has_speech and self.__since_partial >= self.partial_interval:
+                self.__since_partial = 0
+                partial = self.__transcribe_segment()
+                return TranscriptEvent(self.__text(partial), False)
+            return None
+
+    def flush(self) -> Optional[TranscriptEvent]:
+        """End the utterance now, e.g. when recording stops"""
+        with self.__lock:
+            if not self.__in_utterance:
+                return None
+            return self.__finish()
+
+    def reset(self) -> None:
+        """Discard the utterance in progress"""
+        with self.__lock:
+            self.__reset()
+
+    def __reset(self) -> None:
+        self.__length = 0
+        self.__committed: list = []
+        self.__in_utterance = False
+        self.__segment_has_speech = False
+        self.__silence_ms = 0.0
+        self.__since_partial = 0
+
+    def __track_silence(self, audio: np.ndarray) -> None:
+        """Update the trailing silence with the frames of the chunk"""
+        energy = frame_energy_dbfs(audio, self.__frame_length, full_scale=1.0)
+        speech = np.flatnonzero(energy > self.threshold_dbfs)
+        if len(speech):
+            self.__in_utterance = True
+            self.__segment_has_speech = True
+            trailing = len(audio) - (speech[-1] + 1) * self.__frame_length
+            self.__silence_ms = trailing * 1000 / self.sampling_rate
+        else:
+            self.__silence_ms += len(audio) * 1000 / self.sampling_rate
+
+    def __keep_padding(self, audio: np.ndarray) -> None:
+        """Before any speech only the last padding of silence is kept"""
+        # audio[-0:] would be the whole chunk, with no padding nothing is kept
+        tail = audio[max(len(audio) - self.__padding, 0) :]
+        keep = min(self.__length, self.__padding - len(tail))
+        self.__buffer[:keep] = self.__buffer[self.__length - keep : self.__length]
+        self.__buffer[keep : keep + len(tail)] = tail
+        self.__length = keep + len(tail)
+
+    def __append(self, audio: np.ndarray) -> None:
+        while len(audio):
+            room = len(self.__buffer) - self.__length
+            if room == 0:
+                # Segment is full, commit it and carry on with an empty buffer
+                self.__commit()
+                room = len(self.__buffer)
+            part = audio[:room]
+            self.__buffer[self.__length : self.__length + len(part)] = part
+            self.__length += len(part)
+            self.__since_partial += len(part)
+            audio = audio[room:]
+
+    def __transcribe_segment(self) -> str:
+        # The buffer is reused, the model gets its own normalized copy
+        segment = normalize_peak(self.__buffer[: self.__length].copy())
+        return self.transcribe(self.sampling_rate, segment).strip()
+
+    def __commit(self) -> None:
+        if self.__segment_has_speech:
+            text = self.__transcribe_segment()
+            if text:
+                self.__committed.append(text)
+        self.__length = 0
+        self.__segment_has_speech = False
+        self.__since_partial = 0
+
+    def __finish(self) -> TranscriptEvent:
+        self.__commit()
+        event = TranscriptEvent(self.__text(), True)
+        log(f"Final transcript: {event.text}", self.log_level)
+        self.__reset()
+        return event
+
+    def __text(self, partial: str = "") -> str:
+        return " ".join(self.__committed + ([partial] if partial else []))
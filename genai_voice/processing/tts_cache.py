@@ -0,0 +1,219 @@
+"""Text to speech audio cache"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+
+
+@dataclass
+class TTSCacheStats:
+    """Cache counters"""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from memory or disk"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class TTSCache:
+    """Content-addressed cache of encoded speech audio.
+
+    Entries are keyed by a hash of (engine, language, text) and kept in an
+    in-memory LRU and, optionally, a directory on disk. Both tiers evict the
+    least recently used entries once they exceed their byte budget.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = Config.TTS_CACHE_DIR,
+        max_memory_bytes: int = Config.TTS_CACHE_MEMORY_BYTES,
+        max_disk_bytes: int = Config.TTS_CACHE_DISK_BYTES,
+        log_level: LogLevels = LogLevels.ON,
+    ) -> None:
+        """
+        cache_dir:        Directory for the disk tier, None keeps the cache in memory only
+        max_memory_bytes: Byte budget of the in-memory tier
+        max_disk_bytes:   Byte budget of the disk tier
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.log_level = log_level
+        self.stats = TTSCacheStats()
+        self.__memory: OrderedDict[str, bytes] = OrderedDict()
+        self.__lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.stats.disk_bytes = sum(size for _, size, _ in self.__disk_entries())
+
+    @staticmethod
+    def key(text: str, lang: str = Config.TTS_LANGUAGE, engine: str = "gtts") -> str:
+        """Content address of a phrase"""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{engine}\0{lang}\0{normalized}".encode()).hexdigest()
+
+    def get(
+        self, text: str, lang: str = Config.TTS_LANGUAGE, engine: str = "gtts"
+    ) -> Optional[bytes]:
+        """Encoded audio for the phrase, or None if it isn't cached"""
+        key = self.key(text, lang, engine)
+        with self.__lock:
+            audio = self.__memory.get(key)
+            if audio is not None:
+                self.__memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return audio
+        audio = self.__read_disk(key)
+        with self.__lock:
+            if audio is None:
+                self.stats.misses += 1
+                return None
+            self.stats.disk_hits += 1
+            self.__store_memory(key, audio)
+        return audio
+
+    def put(
+        self,
+        text: str,
+        audio: bytes,
+        lang: str = Config.TTS_LANGUAGE,
+        engine: str = "gtts",
+    ) -> None:
+        """Store encoded audio for the phrase"""
+        key = self.key(text, lang, engine)
+        with self.__lock:
+            self.__store_memory(key, audio)
+            self.__write_disk(key, audio)
+
+    def get_or_synthesize(
+        self,
+        text: str,
+        synthesize: Callable[[str], bytes],
+        lang: str = Config.TTS_LANGUAGE,
+        engine: str = "gtts",
+    ) -> bytes:
+        """Cached audio for the phrase, synthesizing and storing it on a miss"""
+        audio = self.get(text, lang, engine)
+        if audio is None:
+            audio = synthesize(text)
+            self.put(text, audio, lang, engine)
+        return audio
+
+    def prewarm(
+        self,
+        phrases: Iterable[str],
+        synthesize: Callable[[str], bytes],
+        lang: str = Config.TTS_LANGUAGE,
+        engine: str = "gtts",
+    ) -> int:
+        """Synthesize every phrase that isn't cached yet, returns how many were added"""
+        added = 0
+        for phrase in phrases:
+            if self.get(phrase, lang, engine) is None:
+                self.put(phrase, synthesize(phrase), lang, engine)
+                added += 1
+        log(f"Pre-warmed TTS cache with {added} new phrases.", self.log_level)
+        return added
+
+    def clear(self) -> None:
+        """Remove every entry from memory and disk"""
+        with self.__lock:
+            self.__memory.clear()
+            self.stats.memory_bytes = 0
+            for path, _, _ in self.__disk_entries():
+                os.remove(path)
+            self.stats.disk_bytes = 0
+
+    def __store_memory(self, key: str, audio: bytes) -> None:
+        previous = self.__memory.pop(key, None)
+        if previous is not None:
+            self.stats.memory_bytes -= len(previous)
+        if len(audio) > self.max_memory_bytes:
+            return
+        self.__memory[key] = audio
+        self.stats.memory_bytes += len(audio)
+        while self.stats.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.__memory.popitem(last=False)
+            self.stats.memory_bytes -= len(evicted)
+            self.stats.evictions += 1
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def __read_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        path = self.__path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # Modification time doubles as the LRU clock for the disk tier
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return audio
+
+    def __write_disk(self, key: str, audio: bytes) -> None:
+        if not self.cache_dir or len(audio) > self.max_disk_bytes:
+            return
+        path = self.__path(key)
+        if os.path.exists(path):
+            self.stats.disk_bytes -= os.path.getsize(path)
+        # Write then rename so readers never see a partial file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(audio)
+        os.replace(temp_path, path)
+        self.stats.disk_bytes += len(audio)
+        if self.stats.disk_bytes > self.max_disk_bytes:
+            self.__evict_disk()
+
+    def __disk_entries(self) -> list:
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".mp3"):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def __evict_disk(self) -> None:
+        entries = sorted(self.__disk_entries(), key=lambda entry: entry[2])
+        self.stats.disk_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.stats.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.stats.disk_bytes -= size
+            self.stats.evictions += 1
+
+
+_cache: Optional[TTSCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """Process-wide TTS cache shared by every Audio instance"""
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTSCache()
+    return _cache
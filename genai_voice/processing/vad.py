@@ -0,0 +1,83 @@
+"""Energy based voice activity detection"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from genai_voice.config.defaults import Config
+
+
+@dataclass
+class VADResult:
+    """Outcome of trimming silence from a clip"""
+
+    audio: np.ndarray
+    start: int
+    end: int
+    total_samples: int
+
+    @property
+    def is_speech(self) -> bool:
+        """Whether any speech was detected"""
+        return self.end > self.start
+
+    @property
+    def trimmed_samples(self) -> int:
+        """Number of leading and trailing samples removed"""
+        return self.total_samples - (self.end - self.start)
+
+
+def full_scale_of(dtype: np.dtype) -> float:
+    """Largest sample magnitude of a sample format, 1.0 for floating point audio"""
+    if np.issubdtype(dtype, np.integer):
+        return float(np.iinfo(dtype).max)
+    return 1.0
+
+
+def frame_energy_dbfs(
+    raw_audio_data: np.ndarray, frame_length: int, full_scale: Optional[float] = None
+) -> np.ndarray:
+    """RMS energy of each full frame of mono audio, in dB relative to full scale"""
+    num_frames = len(raw_audio_data) // frame_length
+    frames = raw_audio_data[: num_frames * frame_length].reshape(num_frames, frame_length)
+    if full_scale is None:
+        full_scale = full_scale_of(frames.dtype)
+    frames = frames.astype(np.float32, copy=False)
+    # Sum of squares per frame without materializing the squared frames
+    power = np.einsum("ij,ij->i", frames, frames) / (frame_length * full_scale**2)
+    return 10.0 * np.log10(np.maximum(power, 1e-12))
+
+
+def trim_silence(
+    raw_audio_data: np.ndarray,
+    sampling_rate: int,
+    frame_ms: float = Config.VAD_FRAME_MS,
+    threshold_dbfs: float = Config.VAD_THRESHOLD_DBFS,
+    padding_ms: float = Config.VAD_PADDING_MS,
+    min_speech_ms: float = Config.VAD_MIN_SPEECH_MS,
+    full_scale: Optional[float] = None,
+) -> VADResult:
+    """Remove leading and trailing silence from mono audio.
+
+    A frame is speech when its energy is above threshold_dbfs. The returned
+    audio is a view from the first to the last speech frame, widened by
+    padding_ms on both sides. Clips with less than min_speech_ms of speech
+    are treated as silent and come back empty. full_scale defaults to the
+    range of the sample dtype; pass it when integer samples were converted
+    to floating point without rescaling.
+    """
+    total = len(raw_audio_data)
+    frame_length = max(1, int(sampling_rate * frame_ms / 1000))
+    if total < frame_length:
+        return VADResult(raw_audio_data[:0], 0, 0, total)
+
+    energy = frame_energy_dbfs(raw_audio_data, frame_length, full_scale)
+    speech = np.flatnonzero(energy > threshold_dbfs)
+    if len(speech) * frame_length < sampling_rate * min_speech_ms / 1000:
+        return VADResult(raw_audio_data[:0], 0, 0, total)
+
+    padding = int(sampling_rate * padding_ms / 1000)
+    start = max(0, speech[0] * frame_length - padding)
+    end = min(total, (speech[-1] + 1) * frame_length + padding)
+    return VADResult(raw_audio_data[start:end], int(start), int(end), total)
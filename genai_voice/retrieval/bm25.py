@@ -0,0 +1,188 @@
+"""Lexical retrieval over context files"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.tracing import span
+from genai_voice.models.tokens import count_tokens
+
+_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Common words that carry no signal for matching a question to a chunk
+STOP_WORDS = frozenset(
+    (
+        "a an and are as at be but by can do for from has have how i if in is it "
+        "its me my of on or our so that the their there they this to was we what "
+        "when where which who why will with you your"
+    ).split()
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word terms used for indexing and querying"""
+    return [
+        term for term in _TERM_PATTERN.findall(text.lower()) if term not in STOP_WORDS
+    ]
+
+
+def chunk_text(text: str, chunk_tokens: int = Config.RETRIEVAL_CHUNK_TOKENS) -> list:
+    """Split text into chunks of roughly chunk_tokens tokens along line boundaries.
+    Whitespace runs (e.g. table padding) are collapsed and lines without any
+    words are dropped.
+    """
+    chunks, current, current_tokens = [], [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n".join(current))
+        current, current_tokens = [], 0
+
+    for line in text.splitlines():
+        if not _TERM_PATTERN.search(line.lower()):
+            # Paragraph breaks are natural chunk boundaries
+            if current_tokens >= chunk_tokens // 2:
+                flush()
+            continue
+        line = " ".join(line.split())
+        line_tokens = count_tokens(line)
+        if line_tokens > chunk_tokens:
+            # Very long lines are split on words
+            flush()
+            words = line.split(" ")
+            step = max(1, len(words) * chunk_tokens // line_tokens)
+            for i in range(0, len(words), step):
+                chunks.append(" ".join(words[i : i + step]))
+            continue
+        if current_tokens + line_tokens > chunk_tokens:
+            flush()
+        current.append(line)
+        current_tokens += line_tokens
+    flush()
+    return chunks
+
+
+class BM25Index:
+    """In-memory Okapi BM25 index over a list of text chunks"""
+
+    def __init__(self, chunks: list, k1: float = 1.5, b: float = 0.75) -> None:
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.chunk_tokens = [count_tokens(chunk) for chunk in chunks]
+        self.__postings: dict[str, list] = {}
+        lengths = []
+        for chunk_id, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self.__postings.setdefault(term, []).append((chunk_id, count))
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        # Length normalization only depends on the chunk, so compute it once
+        self.__norms = [
+            k1 * (1 - b + b * length / avg_length) if avg_length else k1
+            for length in lengths
+        ]
+        total = len(chunks)
+        self.__idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.__postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, top_k: int = Config.RETRIEVAL_TOP_K) -> list:
+        """Return (chunk_id, score) pairs for the best matching chunks"""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.__postings.get(term)
+            if not postings:
+                continue
+            idf = self.__idf[term]
+            for chunk_id, count in postings:
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * (
+                    count * (self.k1 + 1) / (count + self.__norms[chunk_id])
+                )
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+class ContextRetriever:
+    """Selects the context chunks relevant to a user turn"""
+
+    def __init__(
+        self,
+        index: BM25Index,
+        top_k: int = Config.RETRIEVAL_TOP_K,
+        token_budget: int = Config.RETRIEVAL_TOKEN_BUDGET,
+    ) -> None:
+        """
+        index:        Index over the context chunks
+        top_k:        Maximum number of chunks returned per query
+        token_budget: Maximum number of context tokens returned per query
+        """
+        self.index = index
+        self.top_k = top_k
+        self.token_budget = token_budget
+
+    @classmethod
+    def from_text(
+        cls,
+        context: str,
+        chunk_tokens: int = Config.RETRIEVAL_CHUNK_TOKENS,
+        top_k: int = Config.RETRIEVAL_TOP_K,
+        token_budget: int = Config.RETRIEVAL_TOKEN_BUDGET,
+    ) -> "ContextRetriever":
+        """Chunk and index the full text of a context file"""
+        return cls(BM25Index(chunk_text(context, chunk_tokens)), top_k, token_budget)
+
+    def retrieve(self, query: str) -> str:
+        """Relevant context for the query, in document order, within the token budget"""
+        selected, used = [], 0
+        with span("retrieval"):
+            for chunk_id, _ in self.index.search(query, self.top_k):
+                tokens = self.index.chunk_tokens[chunk_id]
+                if used + tokens > self.token_budget:
+                    continue
+                selected.append(chunk_id)
+                used += tokens
+        return "\n\n".join(self.index.chunks[chunk_id] for chunk_id in sorted(selected))
+
+
+_indexes: dict[tuple, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_context_retriever(
+    context_file_path: str,
+    context: Optional[str] = None,
+    chunk_tokens: int = Config.RETRIEVAL_CHUNK_TOKENS,
+    top_k: int = Config.RETRIEVAL_TOP_K,
+    token_budget: int = Config.RETRIEVAL_TOKEN_BUDGET,
+    log_level: LogLevels = LogLevels.ON,
+) -> ContextRetriever:
+    """Retriever for a context file, the index is built once per file version"""
+    key = (
+        os.path.abspath(context_file_path),
+        os.path.getmtime(context_file_path),
+        chunk_tokens,
+    )
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            if context is None:
+                with open(context_file_path, "r", encoding="utf-8") as f:
+                    context = f.read()
+            index = BM25Index(chunk_text(context, chunk_tokens))
+            _indexes[key] = index
+            log(
+                f"Indexed {len(index)} context chunks from {context_file_path}.",
+                log_level,
+            )
+    return ContextRetriever(index, top_k, token_budget)
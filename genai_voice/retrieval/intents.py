@@ -0,0 +1,260 @@
+"""Local intent classification over the call center dataset"""
+
+import json
+import math
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import log, LogLevels
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.logger.tracing import span
+from genai_voice.models.tokens import count_tokens
+from genai_voice.processing.sentences import split_sentences
+from genai_voice.retrieval.bm25 import tokenize
+
+
+def features(text: str) -> Counter:
+    """Word and word pair counts of a text, {{placeholders}} count as their words"""
+    terms = tokenize(text)
+    return Counter(terms + [f"{first} {second}" for first, second in zip(terms, terms[1:])])
+
+
+def _normalize(vector: dict) -> dict:
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {term: value / norm for term, value in vector.items()} if norm else {}
+
+
+@dataclass(frozen=True)
+class IntentPrediction:
+    """Most likely intent of a text.
+    confidence is the share of the nearest examples voting for it.
+    """
+
+    intent: Optional[str]
+    category: Optional[str]
+    confidence: float
+    # (intent, share of the vote) from most to least likely
+    ranking: tuple = ()
+
+
+class IntentClassifier:
+    """TF-IDF nearest neighbour classifier over example utterances.
+
+    Each example is an (instruction, category, intent, response) record as in
+    call_center_prompt_with_intents_categories_context.json. A text is
+    compared (cosine) with every example sharing a term with it, through an
+    inverted index, and the top_k nearest vote for their intent weighted by
+    similarity. Predicting takes well under a millisecond.
+    """
+
+    def __init__(self, examples: list, top_k: int = Config.INTENT_TOP_K) -> None:
+        """
+        examples: Records with instruction, category, intent and response keys
+        top_k:    Nearest examples voting on the intent
+        """
+        self.examples = examples
+        self.top_k = top_k
+        self.categories = {example["intent"]: example["category"] for example in examples}
+        counts = [features(example["instruction"]) for example in examples]
+        document_frequency = Counter(term for count in counts for term in count)
+        total = len(examples)
+        self.__idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+        self.__postings: dict[str, list] = {}
+        for example_id, count in enumerate(counts):
+            for term, weight in self.__vectorize(count).items():
+                self.__postings.setdefault(term, []).append((example_id, weight))
+        self.__templates: dict[str, Optional[str]] = {}
+
+    @classmethod
+    def from_json(cls, path: str, top_k: int = Config.INTENT_TOP_K) -> "IntentClassifier":
+        """Classifier over the records of a JSON dataset file"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), top_k)
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    def __vectorize(self, count: Counter) -> dict:
+        """Unit length TF-IDF vector of term counts, unknown terms are dropped"""
+        return _normalize(
+            {
+                term: (1 + math.log(frequency)) * self.__idf[term]
+                for term, frequency in count.items()
+                if term in self.__idf
+            }
+        )
+
+    def neighbours(self, text: str) -> list:
+        """(example ID, cosine similarity) of the top_k examples nearest to text"""
+        scores: dict[int, float] = {}
+        for term, weight in self.__vectorize(features(text)).items():
+            for example_id, example_weight in self.__postings[term]:
+                scores[example_id] = scores.get(example_id, 0.0) + weight * example_weight
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[: self.top_k]
+
+    def predict(self, text: str) -> IntentPrediction:
+        """Intent of text, with no intent when it shares no term with any example"""
+        with span("intent", LogLevels.OFF):
+            votes: dict[str, float] = {}
+            for example_id, score in self.neighbours(text):
+                intent = self.examples[example_id]["intent"]
+                votes[intent] = votes.get(intent, 0.0) + score
+        total = sum(votes.values())
+        if not total:
+            return IntentPrediction(intent=None, category=None, confidence=0.0)
+        ranking = tuple(
+            (intent, vote / total)
+            for intent, vote in sorted(votes.items(), key=lambda item: item[1], reverse=True)
+        )
+        intent, confidence = ranking[0]
+        return IntentPrediction(intent, self.categories[intent], confidence, ranking)
+
+    def context(
+        self,
+        prediction: IntentPrediction,
+        min_confidence: float = Config.INTENT_MIN_CONFIDENCE,
+        token_budget: int = Config.INTENT_TOKEN_BUDGET,
+    ) -> str:
+        """Example exchanges of the predicted intent, or of every ranked intent
+        when the prediction is not confident, within the token budget
+        """
+        if prediction.confidence >= min_confidence:
+            intents = [prediction.intent]
+        else:
+            intents = [intent for intent, _ in prediction.ranking]
+        sections, used = [], 0
+        for intent in intents:
+            header = f"INTENT: {intent} (CATEGORY: {self.categories[intent]})"
+            # Separators count as well
+            if used + count_tokens(f"\n\n{header}") > token_budget:
+                break
+            used += count_tokens(f"\n\n{header}")
+            section = [header]
+            for example in self.examples:
+                if example["intent"] != intent:
+                    continue
+                exchange = f"Customer: {example['instruction']}\nAgent: {example['response']}"
+                tokens = count_tokens(f"\n\n{exchange}")
+                # Every intent gets its share of the budget
+                if used + tokens > token_budget * (len(sections) + 1) / len(intents):
+                    break
+                section.append(exchange)
+                used += tokens
+            sections.append("\n\n".join(section))
+        return "\n\n".join(sections)
+
+    def template(
+        self, intent: str, sentences: int = Config.INTENT_TEMPLATE_SENTENCES
+    ) -> Optional[str]:
+        """Canned reply of an intent: the most typical of its responses that
+        are a single paragraph of at most a few sentences, without lists or
+        {{placeholders}} to fill in. None when there is no such response.
+        """
+        if intent not in self.__templates:
+            texts = [
+                example["response"]
+                for example in self.examples
+                if example["intent"] == intent
+                and "{{" not in example["response"]
+                and "\n" not in example["response"].strip()
+                and len(split_sentences(example["response"])) <= sentences
+            ]
+            vectors = [self.__vectorize(features(text)) for text in texts]
+            centroid: dict[str, float] = {}
+            for vector in vectors:
+                for term, weight in vector.items():
+                    centroid[term] = centroid.get(term, 0.0) + weight
+            typical = max(
+                zip(texts, vectors),
+                key=lambda item: sum(weight * centroid[term] for term, weight in item[1].items()),
+                default=None,
+            )
+            self.__templates[intent] = typical[0].strip() if typical else None
+        return self.__templates[intent]
+
+
+class IntentRouter:
+    """Routes caller turns by intent: confident predictions of FAQ intents
+    are answered from templates, other confident predictions get the
+    examples of their intent as context instead of the whole dataset.
+    A turn is classified once with predict and the prediction is passed on.
+    """
+
+    def __init__(
+        self,
+        classifier: IntentClassifier,
+        template_intents: tuple = Config.INTENT_TEMPLATE_INTENTS,
+        min_confidence: float = Config.INTENT_MIN_CONFIDENCE,
+        template_confidence: float = Config.INTENT_TEMPLATE_CONFIDENCE,
+        token_budget: int = Config.INTENT_TOKEN_BUDGET,
+    ) -> None:
+        """
+        classifier:          Intent classifier of the dataset
+        template_intents:    Intents answered from templates
+        min_confidence:      Confidence needed to only send the predicted intent's examples
+        template_confidence: Confidence needed to answer from a template
+        token_budget:        Maximum number of context tokens per turn
+        """
+        self.classifier = classifier
+        self.template_intents = frozenset(template_intents)
+        self.min_confidence = min_confidence
+        self.template_confidence = template_confidence
+        self.token_budget = token_budget
+
+    def predict(self, text: str) -> IntentPrediction:
+        """Intent of a caller turn"""
+        prediction = self.classifier.predict(text)
+        get_metrics().counter(
+            "genai_voice_intent_predictions_total", "Caller turns classified locally"
+        ).inc(
+            intent=prediction.intent or "none",
+            confident=str(prediction.confidence >= self.min_confidence).lower(),
+        )
+        return prediction
+
+    def template_reply(self, prediction: IntentPrediction) -> Optional[str]:
+        """Canned reply to a classified turn, None when the model has to answer"""
+        if (
+            prediction.intent not in self.template_intents
+            or prediction.confidence < self.template_confidence
+        ):
+            return None
+        return self.classifier.template(prediction.intent)
+
+    def context(self, prediction: IntentPrediction) -> Optional[str]:
+        """Examples of the intent of a classified turn, None when the prediction
+        is not confident enough and the turn needs other context
+        """
+        if prediction.intent is None or prediction.confidence < self.min_confidence:
+            return None
+        return self.classifier.context(prediction, self.min_confidence, self.token_budget)
+
+
+_classifiers: dict[tuple, IntentClassifier] = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_intent_router(
+    data_file_path: str = os.path.join("data", Config.INTENT_DATA_FILE),
+    top_k: int = Config.INTENT_TOP_K,
+    log_level: LogLevels = LogLevels.ON,
+) -> IntentRouter:
+    """Router over a dataset file, the classifier is built once per file version"""
+    key = (os.path.abspath(data_file_path), os.path.getmtime(data_file_path), top_k)
+    with _classifiers_lock:
+        classifier = _classifiers.get(key)
+        if classifier is None:
+            classifier = IntentClassifier.from_json(data_file_path, top_k)
+            _classifiers[key] = classifier
+            log(
+                f"Indexed {len(classifier)} intent examples from {data_file_path}.",
+                log_level,
+            )
+    return IntentRouter(classifier)
@@ -1,23 +1,50 @@
 """Streamlit chatbot"""
 
+import uuid
+
 import streamlit as st
 from genai_voice.bots.chatbot import ChatBot
+from genai_voice.bots.sessions import SessionManager
 from genai_voice.logger.log_utils import LogLevels, log
+from genai_voice.logger.metrics import start_metrics_exporters
+from genai_voice.logger.tracing import trace
+
+
+@st.cache_resource
+def get_chatbot() -> ChatBot:
+    """Chatbot shared by every browser session"""
+    start_metrics_exporters()
+    return ChatBot(enable_speakers=True, threaded=True)
+
+
+@st.cache_resource
+def get_sessions() -> SessionManager:
+    """Conversation histories of every browser session"""
+    return SessionManager()
 
 
 # Initialize the chatbot
-chatbot = ChatBot(enable_speakers=True, threaded=True)
-history = []
+chatbot = get_chatbot()
+sessions = get_sessions()
+
+# Streamlit reruns this script on every interaction, the id survives reruns
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+session_id = st.session_state.session_id
 
 
 def get_response_audio(audio):
     """Get text response from chatbot"""
     if not audio:
         raise ValueError("No audio file provided.")
-    prompt = chatbot.get_prompt_from_gradio_audio(audio)
-    log(f"Transcribed prompt: {prompt}", log_level=LogLevels.ON)
-    response = chatbot.respond(prompt, history)
-    history.append([prompt, response])
+    # ASR and the rest of the turn share one trace ID
+    with trace():
+        prompt = chatbot.get_prompt_from_gradio_audio(audio)
+        log(f"Transcribed prompt: {prompt}", log_level=LogLevels.ON)
+        if not prompt:
+            return "No speech detected. Please try again."
+        response = chatbot.respond(prompt, sessions.history(session_id), session_id)
+    sessions.append(session_id, prompt, response)
     return response
 
 
@@ -28,8 +55,8 @@ def get_response(user_prmpt):
 
     prompt = user_prmpt
     log(f"User prompt: {prompt}", log_level=LogLevels.ON)
-    bot_response = chatbot.respond(prompt, history)
-    history.append([prompt, bot_response])
+    bot_response = chatbot.respond(prompt, sessions.history(session_id), session_id)
+    sessions.append(session_id, prompt, bot_response)
     return bot_response
 
 
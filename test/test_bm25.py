@@ -0,0 +1,68 @@
+"""BM25 ranking and context retrieval"""
+
+import pytest
+
+from genai_voice.models.tokens import count_tokens
+from genai_voice.retrieval.bm25 import BM25Index, ContextRetriever, chunk_text, tokenize
+
+CHUNKS = [
+    "Flights to Paris leave every morning from gate 12.",
+    "Hotel rooms in Paris include breakfast. Hotel check in starts at 3 pm.",
+    "Baggage allowance is one cabin bag and one checked bag per passenger.",
+    "Car rental desks are next to the baggage claim.",
+]
+
+
+@pytest.fixture(name="index")
+def fixture_index():
+    """Index over four travel chunks"""
+    return BM25Index(CHUNKS)
+
+
+def test_tokenize_drops_stop_words_and_punctuation():
+    assert tokenize("What is the Hotel check-in time?") == ["hotel", "check", "time"]
+
+
+def test_best_match_ranks_first(index):
+    results = index.search("hotel breakfast", top_k=4)
+    assert [chunk_id for chunk_id, _ in results] == [1]
+    assert results[0][1] > 0
+
+
+def test_rare_terms_outweigh_common_ones(index):
+    # "paris" is in two chunks, "gate" only in the first
+    ranked = [chunk_id for chunk_id, _ in index.search("paris gate", top_k=4)]
+    assert ranked == [0, 1]
+
+
+def test_repeated_terms_score_higher(index):
+    scores = dict(index.search("baggage bag", top_k=4))
+    assert scores[2] > scores[3]
+
+
+def test_top_k_and_unknown_terms(index):
+    assert len(index.search("paris baggage hotel", top_k=2)) == 2
+    assert index.search("submarine") == []
+    assert index.search("the and of") == []
+
+
+def test_retriever_returns_chunks_in_document_order(index):
+    retriever = ContextRetriever(index, top_k=4, token_budget=1000)
+    # Chunk 3 ranks first
+    context = retriever.retrieve("hotel breakfast car rental")
+    assert context == f"{CHUNKS[1]}\n\n{CHUNKS[3]}"
+
+
+def test_retriever_skips_chunks_over_the_budget(index):
+    budget = count_tokens(CHUNKS[3]) + count_tokens(CHUNKS[0])
+    retriever = ContextRetriever(index, top_k=4, token_budget=budget)
+    # Ranked 3, 1, 0: chunk 1 does not fit next to chunk 3, chunk 0 does
+    context = retriever.retrieve("car rental hotel breakfast flights")
+    assert context == f"{CHUNKS[0]}\n\n{CHUNKS[3]}"
+
+
+def test_chunks_follow_line_boundaries():
+    text = "\n".join(f"Line {i} about travel." for i in range(10))
+    chunks = chunk_text(text, chunk_tokens=count_tokens("Line 0 about travel.") * 3)
+    assert len(chunks) == 4
+    assert "\n".join(chunks) == text
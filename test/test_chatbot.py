@@ -0,0 +1,62 @@
+"""ChatBot configuration and playback checks"""
+
+import threading
+
+import pytest
+
+from genai_voice.bots.chatbot import ChatBot
+from genai_voice.config.defaults import Config
+from genai_voice.defintions.prompts import CALL_CENTER_PROMPT, TRAVEL_AGENT_PROMPT
+
+REPLY = "The first sentence of the reply. The second sentence of the reply."
+
+
+@pytest.mark.parametrize("prompt", [None, TRAVEL_AGENT_PROMPT, CALL_CENTER_PROMPT])
+def test_intents_require_the_call_center_prompt(prompt):
+    with pytest.raises(ValueError, match="CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES"):
+        ChatBot(prompt=prompt, context_file_path="unused.txt", intents=True)
+
+
+class FakeAudio:
+    """Speaker recording what it plays, blocking until released"""
+
+    def __init__(self) -> None:
+        self.played = []
+        self.playing = threading.Event()
+        self.release = threading.Event()
+
+    def communicate(self, text: str) -> None:
+        self.played.append(text)
+        self.playing.set()
+        self.release.wait(5)
+
+
+@pytest.fixture(name="bot")
+def fixture_bot(monkeypatch):
+    """Bot speaking on the playback worker into a fake speaker"""
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test")
+    bot = ChatBot(fallback_model_name=None, enable_speakers=True, threaded=True)
+    bot.audio = FakeAudio()
+    yield bot
+    bot.audio.release.set()
+    bot.playback.close()
+
+
+def test_cancel_stops_playback_at_the_next_sentence(bot):
+    bot.speak(REPLY)
+    assert bot.audio.playing.wait(5)
+    assert bot.playback.cancel_current()
+    bot.audio.release.set()
+    bot.playback.close()
+    assert bot.audio.played == ["The first sentence of the reply."]
+    assert bot.playback.stats.cancelled == 1
+
+
+def test_uncancelled_playback_speaks_every_sentence(bot):
+    bot.audio.release.set()
+    assert bot.playback.submit(REPLY).wait(5)
+    assert bot.audio.played == [
+        "The first sentence of the reply.",
+        "The second sentence of the reply.",
+    ]
+    assert bot.playback.stats.played == 1
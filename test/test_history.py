@@ -0,0 +1,111 @@
+"""History windows and the rolling summary"""
+
+import threading
+import time
+
+from genai_voice.bots.history import HistoryMode, HistoryPolicy, turn_tokens
+from genai_voice.logger.log_utils import LogLevels
+
+HISTORY = [[f"Question number {i}", f"Answer number {i}"] for i in range(6)]
+# Every turn has the same number of tokens
+TURN_TOKENS = turn_tokens(*HISTORY[0])
+
+
+class Summarizer:
+    """Summarizer recording its calls, the summary lists the questions seen"""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.calls = []
+        self.fail = fail
+        self.called = threading.Semaphore(0)
+
+    def __call__(self, previous: str, turns: list) -> str:
+        self.calls.append((previous, [prompt for prompt, _ in turns]))
+        fail = self.fail
+        self.called.release()
+        if fail:
+            raise ConnectionError("model unavailable")
+        return " ".join([previous] + [prompt[-1] for prompt, _ in turns]).strip()
+
+
+def build_policy(summarizer=None, mode=HistoryMode.ROLLING_SUMMARY) -> HistoryPolicy:
+    """Policy keeping two turns verbatim"""
+    return HistoryPolicy(
+        mode=mode,
+        max_turns=2,
+        token_budget=2 * TURN_TOKENS,
+        summarizer=summarizer,
+        log_level=LogLevels.OFF,
+    )
+
+
+def wait_for_summary(policy: HistoryPolicy, history: list) -> str:
+    """Summary of the older turns once the background summarizer stored it"""
+    for _ in range(100):
+        summary, _ = policy.select(history)
+        if summary:
+            return summary
+        time.sleep(0.01)
+    raise AssertionError("No summary was produced.")
+
+
+def test_windows():
+    assert build_policy(mode=HistoryMode.FULL).select(HISTORY) == (None, HISTORY)
+    assert build_policy(mode=HistoryMode.LAST_N).select(HISTORY) == (None, HISTORY[-2:])
+    assert build_policy(mode=HistoryMode.TOKEN_BUDGET).select(HISTORY) == (None, HISTORY[-2:])
+
+
+def test_no_summary_while_the_history_fits():
+    summarizer = Summarizer()
+    assert build_policy(summarizer).select(HISTORY[:2]) == (None, HISTORY[:2])
+    assert summarizer.calls == []
+
+
+def test_older_turns_are_summarized_in_the_background():
+    summarizer = Summarizer()
+    policy = build_policy(summarizer)
+    # The turn does not wait for the summary
+    assert policy.select(HISTORY[:3]) == (None, HISTORY[1:3])
+    assert wait_for_summary(policy, HISTORY[:3]) == "0"
+    assert summarizer.calls == [("", ["Question number 0"])]
+    assert policy.to_messages(HISTORY[:3])[0] == {
+        "role": "system",
+        "content": "Summary of the conversation so far: 0",
+    }
+
+
+def test_summary_is_extended_with_the_new_turns_only():
+    summarizer = Summarizer()
+    policy = build_policy(summarizer)
+    policy.select(HISTORY[:3])
+    wait_for_summary(policy, HISTORY[:3])
+    # Until the new summary is ready the previous one is used
+    summary, turns = policy.select(HISTORY)
+    assert (summary, turns) == ("0", HISTORY[-2:])
+    assert summarizer.called.acquire(timeout=1) and summarizer.called.acquire(timeout=1)
+    assert summarizer.calls[1] == (
+        "0",
+        ["Question number 1", "Question number 2", "Question number 3"],
+    )
+    assert wait_for_summary(policy, HISTORY) == "0 1 2 3"
+
+
+def test_summary_is_requested_once_while_pending():
+    summarizer = Summarizer()
+    release = threading.Event()
+    policy = build_policy(lambda previous, turns: release.wait() and summarizer(previous, turns))
+    for _ in range(3):
+        policy.select(HISTORY[:3])
+    release.set()
+    wait_for_summary(policy, HISTORY[:3])
+    assert len(summarizer.calls) == 1
+
+
+def test_failed_summary_is_retried_on_the_next_turn():
+    summarizer = Summarizer(fail=True)
+    policy = build_policy(summarizer)
+    assert policy.select(HISTORY[:3])[0] is None
+    assert summarizer.called.acquire(timeout=1)
+    summarizer.fail = False
+    assert wait_for_summary(policy, HISTORY[:3]) == "0"
+    assert len(summarizer.calls) == 2
@@ -0,0 +1,150 @@
+"""Intent classification and routing"""
+
+import pytest
+
+from genai_voice.bots.chatbot import ChatBot
+from genai_voice.config.defaults import Config
+from genai_voice.defintions.prompts import (
+    CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES,
+    PROMPTS_TO_CONTEXT_DATA_FILE,
+)
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.retrieval.intents import IntentClassifier, IntentRouter
+
+
+def example(instruction: str, intent: str, category: str, response: str) -> dict:
+    """Dataset record"""
+    return {
+        "instruction": instruction,
+        "intent": intent,
+        "category": category,
+        "response": response,
+    }
+
+
+EXAMPLES = [
+    example("I want to cancel my order", "cancel_order", "ORDER", "I can cancel it for you."),
+    example("please cancel the order I placed", "cancel_order", "ORDER", "Sure, cancelling it."),
+    example("cancel order {{Order Number}}", "cancel_order", "ORDER", "Order {{Order Number}}."),
+    example("where is my package", "track_order", "ORDER", "It is on its way."),
+    example("track my delivery", "track_order", "ORDER", "Let me look it up."),
+    example("when will my delivery arrive", "track_order", "ORDER", "In two days."),
+    example("what is your refund policy", "check_refund_policy", "REFUND", "Refunds take a week."),
+    example(
+        "tell me about the refund policy",
+        "check_refund_policy",
+        "REFUND",
+        "You get a full refund within 30 days. No questions asked.",
+    ),
+    example(
+        "refund policy details",
+        "check_refund_policy",
+        "REFUND",
+        "Our refund policy:\n1. Ask\n2. Wait",
+    ),
+]
+
+
+@pytest.fixture(name="router")
+def fixture_router():
+    """Router over EXAMPLES answering refund policy questions from templates"""
+    return IntentRouter(
+        IntentClassifier(EXAMPLES, top_k=10),
+        template_intents=("check_refund_policy",),
+        min_confidence=0.6,
+        template_confidence=0.85,
+        token_budget=500,
+    )
+
+
+def test_prediction(router):
+    prediction = router.predict("Could you cancel my order?")
+    assert prediction.intent == "cancel_order"
+    assert prediction.category == "ORDER"
+    assert prediction.confidence > 0.85
+    assert prediction.ranking[0] == ("cancel_order", prediction.confidence)
+
+
+def test_text_without_known_words_has_no_intent(router):
+    prediction = router.predict("blorp")
+    assert prediction.intent is None
+    assert prediction.confidence == 0.0
+    assert router.context(prediction) is None
+    assert router.template_reply(prediction) is None
+
+
+def test_confident_prediction_gets_its_examples(router):
+    context = router.context(router.predict("where is my delivery"))
+    assert context.startswith("INTENT: track_order (CATEGORY: ORDER)")
+    assert "Customer: where is my package" in context
+    assert "cancel" not in context
+
+
+def test_unconfident_prediction_gets_no_context(router):
+    prediction = router.predict("cancel my delivery")
+    assert {intent for intent, _ in prediction.ranking} == {"cancel_order", "track_order"}
+    assert prediction.confidence < 0.6
+    assert router.context(prediction) is None
+    assert router.template_reply(prediction) is None
+
+
+def test_template_reply(router):
+    prediction = router.predict("what is the refund policy")
+    assert prediction.intent == "check_refund_policy"
+    # The most typical single paragraph reply, the list is left out
+    assert router.template_reply(prediction) in (
+        "Refunds take a week.",
+        "You get a full refund within 30 days. No questions asked.",
+    )
+    # Confident, but not a template intent
+    assert router.template_reply(router.predict("cancel my order")) is None
+
+
+def test_template_needs_template_confidence(router):
+    prediction = router.predict("refund my order")
+    assert prediction.intent == "check_refund_policy"
+    assert prediction.confidence < router.template_confidence
+    assert router.template_reply(prediction) is None
+
+
+def predictions_counted() -> float:
+    """Turns classified so far"""
+    counter = get_metrics().counter("genai_voice_intent_predictions_total")
+    return sum(value for _, _, value in counter.samples())
+
+
+@pytest.fixture(name="bot")
+def fixture_bot(monkeypatch):
+    """Call center bot with intent routing and a fake model"""
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test")
+    bot = ChatBot(
+        prompt=CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES,
+        context_file_path=PROMPTS_TO_CONTEXT_DATA_FILE[CALL_CENTER_PROMPT_WITH_INTENTS_CATEGORIES],
+        fallback_model_name=None,
+        intents=True,
+    )
+    bot.requests = []
+
+    def complete(messages: list) -> str:
+        bot.requests.append(messages)
+        return "Done."
+
+    bot.get_completion_from_messages = complete
+    return bot
+
+
+def test_each_turn_is_classified_once(bot):
+    before = predictions_counted()
+    assert bot.respond("I want to cancel my order") == "Done."
+    bot.respond("What is your refund policy?")
+    bot.respond("blorp")
+    assert predictions_counted() - before == 3
+
+
+def test_unconfident_turn_falls_back_to_the_full_context(bot):
+    bot.respond("I want to cancel my order")
+    bot.respond("blorp")
+    intent_context, fallback = (request[0]["content"] for request in bot.requests)
+    assert "INTENT: cancel_order" in intent_context
+    assert len(fallback) > 10 * len(intent_context)
+    assert bot.context[:1000] in fallback
@@ -0,0 +1,69 @@
+"""Moderator batching, caching and timeouts"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.moderation.moderator import Moderator
+
+
+class FakeClient:
+    """Moderation API flagging texts containing "kill" """
+
+    def __init__(self, release: threading.Event = None) -> None:
+        self.moderations = self
+        self.requests = []
+        self.release = release
+
+    def create(self, model, input):  # pylint: disable=redefined-builtin,unused-argument
+        """One moderation request"""
+        self.requests.append(list(input))
+        if self.release is not None:
+            self.release.wait()
+        return SimpleNamespace(
+            results=[
+                SimpleNamespace(
+                    flagged="kill" in text.lower(),
+                    categories=SimpleNamespace(
+                        model_dump=lambda by_alias, text=text: {"violence": "kill" in text.lower()}
+                    ),
+                )
+                for text in input
+            ]
+        )
+
+
+def build_moderator(client: FakeClient, **kwargs) -> Moderator:
+    """Moderator on a fake client"""
+    return Moderator(client=client, batch_window_ms=20, log_level=LogLevels.OFF, **kwargs)
+
+
+def test_texts_are_batched_and_cached():
+    client = FakeClient()
+    moderator = build_moderator(client)
+    verdicts = moderator.check_many(["Hello", "hello ", "I will KILL you"])
+    assert [verdict.flagged for verdict in verdicts] == [False, False, True]
+    assert verdicts[2].categories == ("violence",)
+    # The API sees what the first caller wrote, casing and all
+    assert client.requests == [["Hello", "I will KILL you"]]
+    assert not moderator.check("HELLO").flagged
+    assert len(client.requests) == 1
+
+
+def test_timeout_lets_text_pass():
+    release = threading.Event()
+    moderator = build_moderator(FakeClient(release))
+    assert not moderator.check("kill", timeout=0.05).flagged
+    release.set()
+
+
+def test_timeout_flags_text_when_failing_closed():
+    release = threading.Event()
+    moderator = build_moderator(FakeClient(release), fail_closed=True)
+    verdict = asyncio.run(moderator.acheck("hello", timeout=0.05))
+    assert verdict.flagged
+    assert verdict.categories == ("unmoderated",)
+    release.set()
+    # The late verdict is still cached for the next caller
+    assert not moderator.check("hello", timeout=1).flagged
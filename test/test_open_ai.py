@@ -0,0 +1,71 @@
+"""CustomOpenAIModel against the stub OpenAI server"""
+
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.stub_openai_server import StubOpenAIServer, StubSettings
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.models.open_ai import CustomOpenAIModel
+from genai_voice.models.resilience import RetryPolicy
+from genai_voice.models.scheduler import RateLimitScheduler
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+class CountingScheduler(RateLimitScheduler):
+    """Rate limiter counting the requests let through"""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(log_level=LogLevels.OFF, **kwargs)
+        self.acquired = 0
+
+    def acquire(self, tokens: int) -> float:
+        self.acquired += 1
+        return super().acquire(tokens)
+
+    async def aacquire(self, tokens: int) -> float:
+        self.acquired += 1
+        return await super().aacquire(tokens)
+
+
+@pytest.fixture(name="server")
+def fixture_server():
+    """Stub server answering the first two requests with 429"""
+    server = StubOpenAIServer(
+        settings=StubSettings(latency_ms=0, fail_first=2, error_status=429, reply="Hi.")
+    ).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def build_model(server: StubOpenAIServer, scheduler: RateLimitScheduler) -> CustomOpenAIModel:
+    """Model retrying at once, limited by scheduler"""
+    return CustomOpenAIModel(
+        api_key="test",
+        base_url=server.base_url,
+        log_level=LogLevels.OFF,
+        retry_policy=RetryPolicy(max_attempts=3, base_delay_seconds=0.001),
+        scheduler=scheduler,
+    )
+
+
+@pytest.mark.parametrize("mode", ["sync", "async", "stream"])
+def test_retries_wait_for_the_rate_limiter(server, mode):
+    # One request at a time, ten per second
+    scheduler = CountingScheduler(requests_per_minute=600, burst_seconds=0.1)
+    model = build_model(server, scheduler)
+    start = time.monotonic()
+    if mode == "sync":
+        reply = model.generate(MESSAGES, None)
+    elif mode == "async":
+        reply = asyncio.run(model.agenerate(MESSAGES, None))
+    else:
+        reply = "".join(model.generate_stream(MESSAGES, None))
+    assert reply == "Hi."
+    assert server.requests == 3
+    assert scheduler.acquired == 3
+    # The two retries each waited for the bucket to refill
+    assert time.monotonic() - start >= 0.18
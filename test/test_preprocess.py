@@ -0,0 +1,38 @@
+"""Audio preprocessing for ASR"""
+
+import numpy as np
+
+from genai_voice.processing.preprocess import prepare_for_asr, to_mono_float32
+
+RATE = 16000
+
+
+def speech(seconds: float = 1.0) -> np.ndarray:
+    """Quiet mono float32 tone with silence around it"""
+    tone = 0.1 * np.sin(2 * np.pi * 220 * np.arange(int(RATE * seconds)) / RATE)
+    silence = np.zeros(RATE // 2)
+    return np.concatenate([silence, tone, silence]).astype(np.float32)
+
+
+def test_input_is_left_unchanged():
+    audio = speech()
+    original = audio.copy()
+    _, prepared, result = prepare_for_asr(RATE, audio, RATE)
+    assert result.is_speech
+    assert np.abs(prepared).max() > 0.5
+    assert np.array_equal(audio, original)
+
+
+def test_int16_stereo_input_is_left_unchanged():
+    audio = (np.stack([speech(), speech()], axis=1) * 32767).astype(np.int16)
+    original = audio.copy()
+    prepare_for_asr(RATE, audio, RATE)
+    assert np.array_equal(audio, original)
+
+
+def test_inplace_hands_the_buffer_over():
+    audio = speech()
+    assert to_mono_float32(audio) is not audio
+    assert to_mono_float32(audio, inplace=True) is audio
+    _, prepared, _ = prepare_for_asr(RATE, audio, RATE, inplace=True)
+    assert np.shares_memory(prepared, audio)
@@ -0,0 +1,175 @@
+"""Circuit breaker, retries and deadlines"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.models import resilience
+from genai_voice.models.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    DeadlineExceeded,
+    RetryingCaller,
+    RetryPolicy,
+    attempt_timeout,
+    deadline,
+    remaining_seconds,
+)
+
+
+class Transient(Exception):
+    """Retryable error with an HTTP status"""
+
+    def __init__(self, status_code: int = 503) -> None:
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """Settable time.monotonic() of resilience, sleeping advances it"""
+    clock = SimpleNamespace(now=1000.0)
+
+    def sleep(seconds: float) -> None:
+        clock.now += seconds
+
+    monkeypatch.setattr(
+        resilience,
+        "time",
+        SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now, sleep=sleep),
+    )
+    return clock
+
+
+def build_breaker() -> CircuitBreaker:
+    """Breaker opening after two failures for ten seconds"""
+    return CircuitBreaker("test", failure_threshold=2, reset_seconds=10, log_level=LogLevels.OFF)
+
+
+def build_caller(breaker=None, max_attempts: int = 3) -> RetryingCaller:
+    """Caller retrying Transient errors after 1 to 2 seconds"""
+    policy = RetryPolicy(
+        max_attempts=max_attempts,
+        timeout_seconds=5,
+        base_delay_seconds=1,
+        max_delay_seconds=2,
+    )
+    return RetryingCaller(
+        lambda error: isinstance(error, Transient),
+        policy=policy,
+        breaker=breaker,
+        log_level=LogLevels.OFF,
+    )
+
+
+def test_breaker_opens_after_consecutive_failures(clock):  # pylint: disable=unused-argument
+    breaker = build_breaker()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_probe_success_closes_the_circuit(clock):
+    breaker = build_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.before_call()
+
+
+def test_half_open_probe_failure_reopens_the_circuit(clock):
+    breaker = build_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_transient_errors_are_retried(clock):  # pylint: disable=unused-argument
+    outcomes = [Transient(), Transient(429), "done"]
+    timeouts = []
+
+    def call(timeout: float) -> str:
+        timeouts.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    breaker = build_breaker()
+    assert build_caller(breaker).call(call) == "done"
+    assert timeouts == [5, 5, 5]
+    # The 429 did not count, so the circuit never opened
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_other_errors_are_not_retried(clock):  # pylint: disable=unused-argument
+    calls = []
+
+    def call(timeout: float) -> None:
+        calls.append(timeout)
+        raise ValueError("bad request")
+
+    breaker = build_breaker()
+    with pytest.raises(ValueError):
+        build_caller(breaker).call(call)
+    assert len(calls) == 1
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_open_circuit_fails_fast(clock):  # pylint: disable=unused-argument
+    calls = []
+
+    def call(timeout: float) -> None:
+        calls.append(timeout)
+        raise Transient()
+
+    caller = build_caller(build_breaker(), max_attempts=5)
+    with pytest.raises(CircuitOpenError):
+        caller.call(call)
+    assert len(calls) == 2
+
+
+def test_attempt_timeout_is_cut_to_the_deadline(clock):
+    assert attempt_timeout(5) == 5
+    with deadline(3):
+        assert attempt_timeout(5) == 3
+        # Nested deadlines only shorten the outer one
+        with deadline(10):
+            assert remaining_seconds() == 3
+        clock.now += 3
+        with pytest.raises(DeadlineExceeded):
+            attempt_timeout(5)
+    assert remaining_seconds() is None
+
+
+def test_retry_past_the_deadline_gives_up(clock):
+    calls = []
+
+    def call(timeout: float) -> None:
+        calls.append(timeout)
+        clock.now += timeout
+        raise Transient()
+
+    with deadline(4), pytest.raises(DeadlineExceeded):
+        build_caller().call(call)
+    # The first attempt used the whole deadline, no retry was made
+    assert calls == [4]
@@ -0,0 +1,87 @@
+"""Response cache tiers, expiry and eviction"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from genai_voice.models import response_cache
+from genai_voice.models.response_cache import ResponseCache
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """Settable time.time() of the cache"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def rows(path) -> list:
+    """Keys in the sqlite file, oldest first"""
+    with sqlite3.connect(path) as db:
+        return [key for (key,) in db.execute("SELECT key FROM responses ORDER BY created")]
+
+
+def test_hit_and_miss(clock):  # pylint: disable=unused-argument
+    cache = ResponseCache(max_entries=2)
+    assert cache.get("a") is None
+    cache.put("a", "reply")
+    assert cache.get("a") == "reply"
+    assert (cache.stats.memory_hits, cache.stats.misses) == (1, 1)
+
+
+def test_memory_tier_evicts_least_recently_used(clock):  # pylint: disable=unused-argument
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_disk_tier_outlives_the_process(clock, tmp_path):  # pylint: disable=unused-argument
+    path = str(tmp_path / "responses.sqlite3")
+    ResponseCache(db_path=path).put("a", "reply")
+    cache = ResponseCache(db_path=path)
+    assert cache.get("a") == "reply"
+    assert cache.stats.disk_hits == 1
+
+
+def test_expired_responses_are_not_served(clock):
+    cache = ResponseCache(ttl_seconds=10)
+    cache.put("a", "reply")
+    clock.now += 11
+    assert cache.get("a") is None
+    assert cache.stats.expired == 1
+
+
+def test_expired_rows_are_deleted_in_bulk(clock, tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(ttl_seconds=10, db_path=path)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    clock.now += 11
+    cache.put("c", "3")
+    assert rows(path) == ["c"]
+    clock.now += 11
+    ResponseCache(ttl_seconds=10, db_path=path)
+    assert not rows(path)
+
+
+def test_disk_tier_keeps_the_newest_rows(clock, tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(db_path=path, max_db_rows=3)
+    for key in "abcde":
+        clock.now += 1
+        cache.put(key, key)
+    assert rows(path) == ["c", "d", "e"]
+    # Replacing a row does not evict another one
+    clock.now += 1
+    cache.put("e", "again")
+    assert rows(path) == ["c", "d", "e"]
+    # Reopened with a smaller cap
+    ResponseCache(db_path=path, max_db_rows=1)
+    assert rows(path) == ["e"]
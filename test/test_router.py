@@ -0,0 +1,132 @@
+"""Hedged requests across backends"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.stub_openai_server import StubOpenAIServer, StubSettings
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.models.open_ai import CustomOpenAIModel
+from genai_voice.models.resilience import deadline, deadline_at
+from genai_voice.models.router import HedgedRouter
+from genai_voice.models.scheduler import Priority, current_scope, request_scope
+
+
+class FakeBackend:
+    """Backend answering after delay, recording the context of its requests"""
+
+    def __init__(self, name: str, delay: float) -> None:
+        self.model_name = name
+        self.delay = delay
+        self.contexts = []
+
+    def generate_stream(self, messages, config):  # pylint: disable=unused-argument
+        """Stream the name of the backend"""
+        self.contexts.append((current_scope(), deadline_at()))
+        time.sleep(self.delay)
+        yield self.model_name
+
+    async def agenerate(self, messages, config):  # pylint: disable=unused-argument
+        """The name of the backend"""
+        self.contexts.append((current_scope(), deadline_at()))
+        await asyncio.sleep(self.delay)
+        return self.model_name
+
+
+def build_router() -> tuple:
+    """(router, slow main backend, fast fallback backend)"""
+    main, fallback = FakeBackend("main", 1.0), FakeBackend("fallback", 0.0)
+    router = HedgedRouter(
+        [main, fallback], default_delay_seconds=0.05, log_level=LogLevels.OFF
+    )
+    return router, main, fallback
+
+
+def test_hedged_stream_keeps_the_callers_context():
+    router, main, fallback = build_router()
+    with deadline(30) as at, request_scope("session", Priority.INTERACTIVE):
+        stream = router.generate_stream(messages=[], config=None)
+    # Resumed outside the scope, e.g. by a consumer on another thread
+    assert list(stream) == ["fallback"]
+    expected = (("session", Priority.INTERACTIVE), at)
+    assert main.contexts == [expected]
+    assert fallback.contexts == [expected]
+
+
+def test_hedged_request_keeps_the_callers_context():
+    router, main, fallback = build_router()
+    with deadline(30) as at, request_scope("session", Priority.INTERACTIVE):
+        assert router.generate(messages=[], config=None) == "fallback"
+    expected = (("session", Priority.INTERACTIVE), at)
+    assert main.contexts == [expected]
+    assert fallback.contexts == [expected]
+
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+class StubModel(CustomOpenAIModel):
+    """OpenAI model on a stub server, recording calls that did not run to completion"""
+
+    def __init__(self, server: StubOpenAIServer) -> None:
+        super().__init__(api_key="test", base_url=server.base_url, log_level=LogLevels.OFF)
+        self.cancelled = threading.Event()
+
+    async def agenerate(self, messages, config):
+        try:
+            return await super().agenerate(messages, config)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+    def generate_stream(self, messages, config):
+        finished = False
+        try:
+            yield from super().generate_stream(messages, config)
+            finished = True
+        finally:
+            if not finished:
+                self.cancelled.set()
+
+
+@pytest.fixture(name="servers")
+def fixture_servers():
+    """(slow main server, fast fallback server)"""
+    servers = (
+        StubOpenAIServer(settings=StubSettings(latency_ms=1000, reply="Slow.")).start(),
+        StubOpenAIServer(settings=StubSettings(latency_ms=0, reply="Fast.")).start(),
+    )
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def build_stub_router(servers: tuple) -> tuple:
+    """(router, slow main model, fast fallback model)"""
+    main, fallback = (StubModel(server) for server in servers)
+    router = HedgedRouter([main, fallback], default_delay_seconds=0.05, log_level=LogLevels.OFF)
+    return router, main, fallback
+
+
+def test_hedge_wins_and_the_slow_request_is_cancelled(servers):
+    router, main, fallback = build_stub_router(servers)
+    start = time.monotonic()
+    assert router.generate(messages=MESSAGES, config=None) == "Fast."
+    assert time.monotonic() - start < 0.5
+    assert [server.requests for server in servers] == [1, 1]
+    assert main.cancelled.wait(1)
+    assert not fallback.cancelled.is_set()
+
+
+def test_hedged_stream_wins_and_the_slow_stream_is_closed(servers):
+    router, main, fallback = build_stub_router(servers)
+    start = time.monotonic()
+    assert "".join(router.generate_stream(messages=MESSAGES, config=None)) == "Fast."
+    assert time.monotonic() - start < 0.5
+    assert [server.requests for server in servers] == [1, 1]
+    # Noticed once the slow stream's first chunk arrives
+    assert main.cancelled.wait(5)
+    assert not fallback.cancelled.is_set()
@@ -0,0 +1,193 @@
+"""WebScraper against a local HTTP server"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from genai_voice.data_utils.scraper import PageStatus, ScrapeCache, WebScraper
+from genai_voice.logger.log_utils import LogLevels
+
+PAGES = {
+    "/etag": ("<p>etag page</p>", {"ETag": '"v1"'}),
+    "/modified": ("<p>modified page</p>", {"Last-Modified": "Mon, 06 Jan 2025 10:00:00 GMT"}),
+    "/plain": ("<p>plain page</p>", {}),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Pages, redirects, slow pages and faults of the test site"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer a page"""
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+        if self.path.startswith("/slow/"):
+            with server.lock:
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            time.sleep(0.1)
+            with server.lock:
+                server.in_flight -= 1
+            self.__send(200, f"<p>{self.path}</p>")
+        elif self.path in PAGES:
+            body, validators = PAGES[self.path]
+            etag = validators.get("ETag")
+            modified = validators.get("Last-Modified")
+            if (etag and self.headers.get("If-None-Match") == etag) or (
+                modified and self.headers.get("If-Modified-Since") == modified
+            ):
+                self.__send(304, None, validators)
+            else:
+                self.__send(200, body, validators)
+        elif self.path == "/old":
+            self.__send(301, None, {"Location": "/plain"})
+        elif self.path == "/data.json":
+            self.__send(200, '{"a": 1}', {"Content-Type": "application/json"})
+        elif self.path == "/flaky":
+            if hits == 1:
+                self.__send(503, None)
+            else:
+                self.__send(200, "<p>flaky page</p>")
+        elif self.path == "/down":
+            self.__send(500, None)
+        else:
+            self.__send(404, None)
+
+    def __send(self, status: int, body, headers: dict = None) -> None:
+        data = body.encode() if body else b""
+        self.send_response(status)
+        headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+@pytest.fixture(name="site")
+def fixture_site():
+    """Local test site, counting hits per path and concurrent slow requests"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.in_flight = server.max_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def base_url(server, host: str = "127.0.0.1") -> str:
+    """Url of the server under host"""
+    return f"http://{host}:{server.server_address[1]}"
+
+
+def build_scraper(cache: ScrapeCache = None, **kwargs) -> tuple:
+    """(scraper, list of the urls transformed)"""
+    transformed = []
+
+    def transform(html: str, url: str) -> str:
+        transformed.append(url)
+        return html
+
+    scraper = WebScraper(
+        transform=transform,
+        cache=cache or ScrapeCache(cache_file=None),
+        backoff_seconds=0.01,
+        log_level=LogLevels.OFF,
+        **kwargs,
+    )
+    return scraper, transformed
+
+
+def test_concurrency_limit(site):
+    urls = [f"{base_url(site)}/slow/{index}" for index in range(8)]
+    scraper, _ = build_scraper(max_concurrency=2)
+    results = scraper.scrape(urls)
+    assert all(result.status == PageStatus.FETCHED for result in results)
+    assert site.max_in_flight == 2
+
+
+def test_per_host_concurrency_limit(site):
+    # localhost and 127.0.0.1 are different hosts to the scraper
+    urls = [
+        f"{base_url(site, host)}/slow/{host}-{index}"
+        for host in ("127.0.0.1", "localhost")
+        for index in range(4)
+    ]
+    scraper, _ = build_scraper(max_concurrency=8, per_host_concurrency=1)
+    scraper.scrape(urls)
+    assert site.max_in_flight == 2
+
+
+@pytest.mark.parametrize("path", ["/etag", "/modified"])
+def test_revalidation_leaves_unchanged_pages_alone(site, path):
+    cache = ScrapeCache(cache_file=None)
+    url = f"{base_url(site)}{path}"
+    scraper, transformed = build_scraper(cache)
+    first = scraper.scrape([url])[0]
+    second = scraper.scrape([url])[0]
+    assert first.status == PageStatus.FETCHED
+    assert second.status == PageStatus.NOT_MODIFIED
+    assert second.text == first.text
+    assert transformed == [url]
+    assert site.hits[path] == 2
+
+
+def test_unchanged_content_is_not_transformed_again(site):
+    cache = ScrapeCache(cache_file=None)
+    url = f"{base_url(site)}/plain"
+    scraper, transformed = build_scraper(cache)
+    scraper.scrape([url])
+    assert scraper.scrape([url])[0].status == PageStatus.UNCHANGED
+    assert transformed == [url]
+
+
+def test_redirect_is_followed(site):
+    scraper, _ = build_scraper()
+    result = scraper.scrape([f"{base_url(site)}/old"])[0]
+    assert result.status == PageStatus.FETCHED
+    assert result.text == "<p>plain page</p>"
+
+
+def test_non_html_page_fails_without_retries(site):
+    scraper, transformed = build_scraper()
+    result = scraper.scrape([f"{base_url(site)}/data.json"])[0]
+    assert result.status == PageStatus.FAILED
+    assert "application/json" in result.error
+    assert result.attempts == 1
+    assert not transformed
+
+
+def test_client_error_is_not_retried(site):
+    scraper, _ = build_scraper()
+    result = scraper.scrape([f"{base_url(site)}/missing"])[0]
+    assert result.status == PageStatus.FAILED
+    assert result.attempts == 1
+
+
+def test_server_error_is_retried(site):
+    scraper, _ = build_scraper()
+    result = scraper.scrape([f"{base_url(site)}/flaky"])[0]
+    assert result.status == PageStatus.FETCHED
+    assert result.attempts == 2
+    assert scraper.stats.retries == 1
+
+
+def test_failure_falls_back_to_cached_text(site):
+    cache = ScrapeCache(cache_file=None)
+    url = f"{base_url(site)}/down"
+    cache.put(url, {"etag": None, "last_modified": None, "content_hash": "", "text": "old"})
+    scraper, _ = build_scraper(cache, retries=1)
+    result = scraper.scrape([url, f"{base_url(site)}/plain"])
+    assert result[0].status == PageStatus.STALE
+    assert result[0].text == "old"
+    assert result[1].status == PageStatus.FETCHED
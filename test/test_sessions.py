@@ -0,0 +1,93 @@
+"""Per-session histories"""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from genai_voice.bots import sessions as sessions_module
+from genai_voice.bots.chatbot import ChatBot
+from genai_voice.bots.sessions import SessionManager
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """Settable time.monotonic() of the sessions"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(sessions_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def build_sessions(**kwargs) -> SessionManager:
+    """Session manager without logs"""
+    return SessionManager(log_level=LogLevels.OFF, **kwargs)
+
+
+def test_sessions_have_separate_histories(clock):  # pylint: disable=unused-argument
+    sessions = build_sessions()
+    sessions.append("alice", "Hi, I am Alice", "Hello Alice")
+    sessions.append("bob", "Hi, I am Bob", "Hello Bob")
+    sessions.append("alice", "Book Paris", "Done")
+    assert sessions.history("alice") == [["Hi, I am Alice", "Hello Alice"], ["Book Paris", "Done"]]
+    assert sessions.history("bob") == [["Hi, I am Bob", "Hello Bob"]]
+    sessions.reset("alice")
+    assert sessions.history("alice") == []
+    assert sessions.history("bob") == [["Hi, I am Bob", "Hello Bob"]]
+
+
+def test_history_is_a_snapshot(clock):  # pylint: disable=unused-argument
+    sessions = build_sessions()
+    sessions.append("alice", "Hi", "Hello")
+    history = sessions.history("alice")
+    history[0][1] = "changed"
+    history.append(["injected", "turn"])
+    assert sessions.history("alice") == [["Hi", "Hello"]]
+
+
+def test_each_session_is_trimmed_on_its_own(clock):  # pylint: disable=unused-argument
+    sessions = build_sessions(max_turns=2, max_history_chars=20)
+    for turn in range(3):
+        sessions.append("alice", f"q{turn}", f"a{turn}")
+    sessions.append("bob", "q", "a")
+    sessions.append("bob", "long question", "long answer")
+    assert sessions.history("alice") == [["q1", "a1"], ["q2", "a2"]]
+    assert sessions.history("bob") == [["long question", "long answer"]]
+
+
+def test_idle_and_least_recently_active_sessions_are_evicted(clock):
+    sessions = build_sessions(max_sessions=2, idle_ttl_seconds=60)
+    sessions.append("alice", "q", "a")
+    clock.now += 30
+    sessions.append("bob", "q", "a")
+    sessions.append("carol", "q", "a")
+    assert sessions.history("bob") == [["q", "a"]]
+    assert sessions.history("alice") == []
+    clock.now += 61
+    assert sessions.evict_idle() == 2
+    assert len(sessions) == 0
+
+
+def test_concurrent_turns_only_see_their_session(monkeypatch):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test")
+    bot = ChatBot(fallback_model_name=None)
+    sessions = build_sessions()
+
+    def complete(messages: list) -> str:
+        return " | ".join(message["content"] for message in messages[1:])
+
+    bot.get_completion_from_messages = complete
+
+    def turn(session_id: str, prompt: str) -> str:
+        response = bot.respond(prompt, sessions.history(session_id), session_id)
+        sessions.append(session_id, prompt, response)
+        return response
+
+    with ThreadPoolExecutor(4) as pool:
+        names = ["alice", "bob", "carol", "dave"]
+        list(pool.map(lambda name: turn(name, f"I am {name}"), names))
+        replies = dict(zip(names, pool.map(lambda name: turn(name, "Who am I?"), names)))
+    for name, reply in replies.items():
+        assert f"I am {name}" in reply
+        assert all(f"I am {other}" not in reply for other in names if other != name)
@@ -0,0 +1,186 @@
+"""Coalescing of identical in-flight requests"""
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from genai_voice.logger.metrics import get_metrics
+from genai_voice.models.resilience import DeadlineExceeded, deadline
+from genai_voice.models.singleflight import SingleFlight
+
+_names = itertools.count()
+
+
+@pytest.fixture(name="flights")
+def fixture_flights():
+    """SingleFlight with its own metric label"""
+    return SingleFlight(f"test-{next(_names)}")
+
+
+def coalesced(flights: SingleFlight, kind: str) -> float:
+    """Callers served by another caller's request so far"""
+    counter = get_metrics().counter("genai_voice_llm_coalesced_total")
+    return counter.value(model=flights.name, kind=kind)
+
+
+def wait_for(condition) -> None:
+    """Poll condition() for up to a second"""
+    for _ in range(100):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Condition not met.")
+
+
+class Upstream:
+    """Upstream call blocking until released, counting its calls"""
+
+    def __init__(self, result="reply") -> None:
+        self.result = result
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def run_concurrently(flights: SingleFlight, upstream: Upstream, callers: int = 4) -> list:
+    """Outcome (result or error) of each caller of the same key"""
+
+    def call():
+        try:
+            return flights.do("key", upstream)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            return error
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(call) for _ in range(callers)]
+        wait_for(lambda: coalesced(flights, "generate") == callers - 1)
+        upstream.release.set()
+        return [future.result() for future in futures]
+
+
+def test_concurrent_calls_share_one_upstream_call(flights):
+    upstream = Upstream()
+    assert run_concurrently(flights, upstream) == ["reply"] * 4
+    assert upstream.calls == 1
+
+
+def test_error_reaches_every_caller(flights):
+    error = ConnectionError("upstream failed")
+    upstream = Upstream(error)
+    assert run_concurrently(flights, upstream) == [error] * 4
+    assert upstream.calls == 1
+    # The failed flight is not reused
+    upstream.result = "reply"
+    assert flights.do("key", upstream) == "reply"
+    assert upstream.calls == 2
+
+
+def test_finished_and_different_calls_are_not_shared(flights):
+    upstream = Upstream()
+    upstream.release.set()
+    assert flights.do("a", upstream) == "reply"
+    assert flights.do("a", upstream) == "reply"
+    assert flights.do("b", upstream) == "reply"
+    assert upstream.calls == 3
+    assert coalesced(flights, "generate") == 0
+
+
+def test_follower_gives_up_at_its_deadline(flights):
+    upstream = Upstream()
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(flights.do, "key", upstream)
+        wait_for(lambda: upstream.calls == 1)
+        with deadline(0.05), pytest.raises(DeadlineExceeded):
+            flights.do("key", upstream)
+        upstream.release.set()
+        assert leader.result() == "reply"
+    assert upstream.calls == 1
+
+
+def test_async_calls_share_one_upstream_call_and_its_error(flights):
+    calls = []
+
+    async def upstream():
+        calls.append(None)
+        await asyncio.sleep(0.05)
+        raise ConnectionError("upstream failed")
+
+    async def main():
+        return await asyncio.gather(
+            *(flights.ado("key", upstream) for _ in range(3)), return_exceptions=True
+        )
+
+    errors = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
+
+
+def test_async_call_is_cancelled_once_nobody_waits(flights):
+    cancelled = []
+
+    async def upstream():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(None)
+            raise
+
+    async def main():
+        waiters = [asyncio.ensure_future(flights.ado("key", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        waiters[0].cancel()
+        await asyncio.sleep(0.05)
+        assert not cancelled
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert cancelled == [None]
+
+
+def test_streams_share_one_upstream_stream(flights):
+    release = threading.Event()
+    calls = []
+
+    def open_stream():
+        calls.append(None)
+        yield "Hello"
+        release.wait(5)
+        yield " world"
+
+    first = flights.stream("key", open_stream)
+    assert next(first) == "Hello"
+    # A late reader still gets the stream from its first delta
+    second = flights.stream("key", open_stream)
+    release.set()
+    assert "".join(second) == "Hello world"
+    assert list(first) == [" world"]
+    assert len(calls) == 1
+    assert coalesced(flights, "stream") == 1
+
+
+def test_stream_error_reaches_every_reader(flights):
+    release = threading.Event()
+
+    def open_stream():
+        yield "Hello"
+        release.wait(5)
+        raise ConnectionError("stream broke")
+
+    readers = [flights.stream("key", open_stream) for _ in range(2)]
+    release.set()
+    for reader in readers:
+        with pytest.raises(ConnectionError):
+            list(reader)
@@ -0,0 +1,38 @@
+"""Streaming transcription of chunked audio"""
+
+import numpy as np
+import pytest
+
+from genai_voice.config.defaults import Config
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.processing.streaming_asr import StreamingTranscriber
+
+RATE = Config.ASR_SAMPLING_RATE
+CHUNK = RATE // 10
+
+
+def tone(samples: int) -> np.ndarray:
+    """Loud float32 tone"""
+    return (0.5 * np.sin(2 * np.pi * 220 * np.arange(samples) / RATE)).astype(np.float32)
+
+
+@pytest.mark.parametrize("padding_ms", [0, 50, 200])
+def test_only_the_padding_is_kept_before_speech(monkeypatch, padding_ms):
+    monkeypatch.setattr(Config, "VAD_PADDING_MS", padding_ms)
+    segments = []
+
+    def transcribe(sampling_rate: int, audio: np.ndarray) -> str:
+        segments.append(audio)
+        return "hello"
+
+    transcriber = StreamingTranscriber(transcribe=transcribe, log_level=LogLevels.OFF)
+    for _ in range(3):
+        assert transcriber.feed(RATE, np.zeros(CHUNK, dtype=np.float32)) is None
+    transcriber.feed(RATE, tone(CHUNK))
+    event = transcriber.flush()
+    assert event.text == "hello"
+    assert event.is_final
+    padding = RATE * padding_ms // 1000
+    assert len(segments) == 1
+    assert len(segments[0]) == padding + CHUNK
+    assert not segments[0][:padding].any()
@@ -0,0 +1,108 @@
+"""Token counting and budgets"""
+
+import pytest
+
+from genai_voice.bots.history import HistoryMode, HistoryPolicy, turn_tokens
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.models import tokens
+from genai_voice.models.tokens import BudgetPolicy, TokenBudget, count_tokens, truncate_to_tokens
+
+
+class FakeEncoding:
+    """One token per word, counting encode() calls"""
+
+    def __init__(self) -> None:
+        self.encoded = []
+
+    def encode(self, text: str, disallowed_special=()) -> list:  # pylint: disable=unused-argument
+        """Token IDs of the words of text"""
+        self.encoded.append(len(text))
+        return [len(word) for word in text.split(" ")]
+
+    def decode(self, token_ids: list) -> str:
+        """Words of the lengths in token_ids"""
+        return " ".join("x" * token_id for token_id in token_ids)
+
+
+@pytest.fixture(name="encoding")
+def fixture_encoding(monkeypatch):
+    """Fake tiktoken encoding with empty caches"""
+    encoding = FakeEncoding()
+    monkeypatch.setattr(tokens, "_encoding", lambda model_name: encoding)
+    count_tokens.cache_clear()
+    tokens._tokens.cache_clear()  # pylint: disable=protected-access
+    yield encoding
+    count_tokens.cache_clear()
+    tokens._tokens.cache_clear()  # pylint: disable=protected-access
+
+
+def test_truncate_keeps_a_prefix(encoding):  # pylint: disable=unused-argument
+    assert truncate_to_tokens("xx xx xx", 2) == "xx xx"
+    assert truncate_to_tokens("xx xx", 5) == "xx xx"
+    assert truncate_to_tokens("xx xx", 0) == ""
+
+
+def test_large_system_prompt_is_encoded_once(encoding):
+    context = " ".join(["xxx"] * tokens.LARGE_TEXT_CHARS)
+    budget = TokenBudget(max_request_tokens=1000, policy=BudgetPolicy.TRIM)
+    messages = [
+        {"role": "system", "content": context},
+        {"role": "user", "content": "xx xx"},
+    ]
+    for _ in range(3):
+        fitted, prompt_tokens = budget.fit(messages, max_output_tokens=100)
+        assert prompt_tokens <= 900
+        assert fitted[0]["content"].startswith("xxx xxx")
+    assert encoding.encoded.count(len(context)) == 1
+
+
+def test_counts_fall_back_to_estimates(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", lambda model_name: None)
+    count_tokens.cache_clear()
+    assert count_tokens("x" * 10) == 3
+    assert truncate_to_tokens("x" * 10, 2) == "x" * 8
+    count_tokens.cache_clear()
+
+
+def test_trim_drops_whole_turns_then_the_summary(encoding):  # pylint: disable=unused-argument
+    messages = [
+        {"role": "system", "content": "prompt"},
+        {"role": "system", "content": "summary summary"},
+        {"role": "user", "content": "u1 u1"},
+        {"role": "assistant", "content": "a1 a1"},
+        {"role": "user", "content": "u2"},
+        {"role": "assistant", "content": "a2"},
+        {"role": "user", "content": "question"},
+    ]
+
+    def fit(allowed: int) -> list:
+        budget = TokenBudget(
+            max_request_tokens=allowed + 10, policy=BudgetPolicy.TRIM, log_level=LogLevels.OFF
+        )
+        fitted, _ = budget.fit(messages, max_output_tokens=10)
+        return [message["content"] for message in fitted]
+
+    # 3 reply tokens and 3 per message around one token per word
+    assert fit(34) == [message["content"] for message in messages]
+    assert fit(24) == ["prompt", "summary summary", "u2", "a2", "question"]
+    assert fit(23) == ["prompt", "summary summary", "question"]
+    assert fit(11) == ["prompt", "question"]
+
+
+def test_history_is_counted_with_the_models_tokenizer(monkeypatch):
+    models = []
+    encoding = FakeEncoding()
+
+    def encoding_of(model_name: str) -> FakeEncoding:
+        models.append(model_name)
+        return encoding
+
+    monkeypatch.setattr(tokens, "_encoding", encoding_of)
+    count_tokens.cache_clear()
+    turn_tokens.cache_clear()
+    policy = HistoryPolicy(HistoryMode.TOKEN_BUDGET, token_budget=4, model_name="gpt-test")
+    history = [["one two", "three"], ["four", "five six"]]
+    assert policy.select(history) == (None, [["four", "five six"]])
+    assert set(models) == {"gpt-test"}
+    count_tokens.cache_clear()
+    turn_tokens.cache_clear()
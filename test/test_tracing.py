@@ -0,0 +1,71 @@
+"""Trace IDs across threads and generators"""
+
+import threading
+
+from genai_voice.bots.chatbot import ChatBot
+from genai_voice.config.defaults import Config
+from genai_voice.logger.tracing import current_trace_id, trace, traced
+
+
+def in_new_thread(function, *args):
+    """Result of function(*args) on a fresh thread, i.e. in an empty context"""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(function(*args)))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def trace_ids(steps: int):
+    """Yield the trace ID of each step"""
+    for _ in range(steps):
+        yield current_trace_id()
+
+
+def test_traced_keeps_the_callers_trace_id():
+    with trace("abc"):
+        stream = traced(trace_ids(3))
+    assert [in_new_thread(next, stream) for _ in range(3)] == ["abc"] * 3
+    assert current_trace_id() is None
+
+
+def test_traced_starts_a_trace_without_one():
+    first, second = traced(trace_ids(2))
+    assert first is not None
+    assert first == second
+    assert current_trace_id() is None
+
+
+def test_closing_closes_the_iterator():
+    closed = []
+
+    def steps():
+        try:
+            yield current_trace_id()
+            yield current_trace_id()
+        finally:
+            closed.append(current_trace_id())
+
+    with trace("abc"):
+        stream = traced(steps())
+    assert next(stream) == "abc"
+    stream.close()
+    assert closed == ["abc"]
+
+
+def test_streamed_turn_has_one_trace_id(monkeypatch):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test")
+    bot = ChatBot(fallback_model_name=None)
+    seen = []
+
+    def stream(messages):  # pylint: disable=unused-argument
+        seen.append(current_trace_id())
+        yield "Hello"
+        seen.append(current_trace_id())
+        yield " there."
+
+    bot.stream_completion_from_messages = stream
+    with trace("turn-1"):
+        deltas = bot.respond_stream("Hi")
+    assert [in_new_thread(next, deltas) for _ in range(2)] == ["Hello", " there."]
+    assert seen == ["turn-1", "turn-1"]
@@ -0,0 +1,85 @@
+"""TTS cache hits, misses and eviction"""
+
+import os
+
+from genai_voice.logger.log_utils import LogLevels
+from genai_voice.processing.tts_cache import TTSCache
+
+
+def build_cache(cache_dir=None, max_memory_bytes: int = 10, max_disk_bytes: int = 10):
+    """Small cache, in memory only without cache_dir"""
+    return TTSCache(
+        cache_dir=str(cache_dir) if cache_dir else None,
+        max_memory_bytes=max_memory_bytes,
+        max_disk_bytes=max_disk_bytes,
+        log_level=LogLevels.OFF,
+    )
+
+
+def test_hit_and_miss():
+    cache = build_cache()
+    assert cache.get("Hello") is None
+    cache.put("Hello", b"audio")
+    assert cache.get("Hello") == b"audio"
+    # Whitespace does not change the phrase, the language does
+    assert cache.get("  Hello ") == b"audio"
+    assert cache.get("Hello", lang="fr") is None
+    assert (cache.stats.memory_hits, cache.stats.misses) == (2, 2)
+
+
+def test_synthesizes_each_phrase_once():
+    cache = build_cache()
+    synthesized = []
+
+    def synthesize(text: str) -> bytes:
+        synthesized.append(text)
+        return text.encode()
+
+    assert cache.get_or_synthesize("Hi", synthesize) == b"Hi"
+    assert cache.get_or_synthesize("Hi", synthesize) == b"Hi"
+    assert cache.prewarm(["Hi", "Bye"], synthesize) == 1
+    assert synthesized == ["Hi", "Bye"]
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = build_cache()
+    cache.put("a", b"1111")
+    cache.put("b", b"2222")
+    cache.get("a")
+    cache.put("c", b"3333")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1111"
+    assert cache.get("c") == b"3333"
+    assert cache.stats.evictions == 1
+    assert cache.stats.memory_bytes == 8
+
+
+def test_audio_over_the_budget_is_not_kept():
+    cache = build_cache()
+    cache.put("long", b"x" * 11)
+    assert cache.get("long") is None
+    assert cache.stats.memory_bytes == 0
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    build_cache(tmp_path).put("Hello", b"audio")
+    cache = build_cache(tmp_path)
+    assert cache.stats.disk_bytes == 5
+    assert cache.get("Hello") == b"audio"
+    assert cache.get("Hello") == b"audio"
+    assert (cache.stats.disk_hits, cache.stats.memory_hits) == (1, 1)
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = build_cache(tmp_path, max_memory_bytes=0)
+    cache.put("a", b"1111")
+    cache.put("b", b"2222")
+    # Modification times are the disk tier's LRU clock, "a" was read last
+    os.utime(tmp_path / f"{TTSCache.key('a')}.mp3", (2000, 2000))
+    os.utime(tmp_path / f"{TTSCache.key('b')}.mp3", (1000, 1000))
+    cache.put("c", b"3333")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1111"
+    assert cache.get("c") == b"3333"
+    assert cache.stats.disk_bytes == 8
+    assert len(os.listdir(tmp_path)) == 2
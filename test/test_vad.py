@@ -0,0 +1,85 @@
+"""Energy based voice activity detection"""
+
+import numpy as np
+import pytest
+
+from genai_voice.processing.vad import frame_energy_dbfs, trim_silence
+
+RATE = 16000
+# 10 ms frames of 160 samples, no padding unless a test asks for it
+FRAME = 160
+
+
+def signal(*parts: tuple) -> np.ndarray:
+    """Concatenated (seconds, amplitude) parts of a 400 Hz tone, 0 for silence"""
+    pieces = []
+    for seconds, amplitude in parts:
+        samples = np.arange(int(RATE * seconds))
+        pieces.append(amplitude * np.sin(2 * np.pi * 400 * samples / RATE))
+    return np.concatenate(pieces).astype(np.float32)
+
+
+def trim(audio: np.ndarray, **kwargs):
+    """trim_silence with 10 ms frames and no padding by default"""
+    kwargs.setdefault("frame_ms", 10)
+    kwargs.setdefault("padding_ms", 0)
+    return trim_silence(audio, RATE, **kwargs)
+
+
+def test_frame_energy():
+    audio = signal((0.01, 0.0), (0.01, 1.0), (0.01, 0.01))
+    energy = frame_energy_dbfs(audio, FRAME)
+    # A full scale sine has half the power of full scale: -3 dBFS
+    np.testing.assert_allclose(energy[1:], [-3.0, -43.0], atol=0.1)
+    assert energy[0] < -100
+
+
+def test_speech_is_cut_at_frame_boundaries():
+    audio = signal((0.5, 0.0), (1.0, 0.1), (0.3, 0.0))
+    result = trim(audio)
+    assert result.is_speech
+    assert (result.start, result.end) == (50 * FRAME, 150 * FRAME)
+    assert result.trimmed_samples == int(0.8 * RATE)
+    assert np.shares_memory(result.audio, audio)
+
+
+def test_padding_widens_the_segment_within_the_clip():
+    audio = signal((0.05, 0.0), (1.0, 0.1), (0.5, 0.0))
+    result = trim(audio, padding_ms=100)
+    assert (result.start, result.end) == (0, 115 * FRAME)
+
+
+def test_pauses_inside_speech_are_kept():
+    audio = signal((0.2, 0.0), (0.3, 0.1), (0.4, 0.0), (0.3, 0.1), (0.2, 0.0))
+    result = trim(audio)
+    assert (result.start, result.end) == (20 * FRAME, 120 * FRAME)
+
+
+@pytest.mark.parametrize(
+    "audio",
+    [
+        np.zeros(RATE, dtype=np.float32),
+        # Background hum under the threshold
+        signal((1.0, 0.005)),
+        # A click shorter than the minimum speech
+        signal((0.5, 0.0), (0.05, 0.5), (0.5, 0.0)),
+        # Shorter than a frame
+        signal((0.005, 0.5)),
+    ],
+)
+def test_silent_clips_come_back_empty(audio):
+    result = trim(audio)
+    assert not result.is_speech
+    assert len(result.audio) == 0
+    assert result.trimmed_samples == len(audio)
+
+
+def test_integer_samples_are_scaled_to_their_range():
+    audio = signal((0.5, 0.005), (0.5, 0.1), (0.5, 0.005))
+    samples = (audio * 32767).astype(np.int16)
+    assert (trim(samples).start, trim(samples).end) == (50 * FRAME, 100 * FRAME)
+    # Unscaled int16 values converted to float need the full scale passed,
+    # otherwise the hum is as loud as speech
+    unscaled = samples.astype(np.float32)
+    assert trim(unscaled).start == 0
+    assert trim(unscaled, full_scale=32767).start == 50 * FRAME
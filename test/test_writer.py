@@ -0,0 +1,58 @@
+"""ContextWriter output and deduplication"""
+
+import json
+
+from genai_voice.data_utils.writer import ContextWriter, manifest_path
+from genai_voice.logger.log_utils import LogLevels
+
+FOOTER = "Copyright 2025 Example Travel. All rights reserved. Privacy policy and terms of use."
+
+PAGES = {
+    "https://example.com/a": "Flights to Lisbon leave every morning at nine.\n" + FOOTER,
+    "https://example.com/b": (
+        "Hotels in Porto can be booked up to a year in advance.\n"
+        # Near duplicate of the footer, most of its shingles were seen
+        "Copyright 2025 Example Travel. All rights reserved. Privacy policy and terms of service.\n"
+        + FOOTER
+    ),
+    "https://example.com/c": None,
+    "https://example.com/d": "Trains to Madrid take about nine hours.\n" + FOOTER,
+}
+
+
+def write(path: str, arrival: list) -> tuple:
+    """(context file bytes, manifest) of PAGES arriving in arrival order"""
+    with ContextWriter(str(path), urls=list(PAGES), log_level=LogLevels.OFF) as writer:
+        for url in arrival:
+            writer.write(url, PAGES[url])
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(manifest_path(str(path)), "r", encoding="utf-8") as file:
+        return data, json.load(file)
+
+
+def test_output_does_not_depend_on_arrival_order(tmp_path):
+    first = write(tmp_path / "first.txt", list(PAGES))
+    second = write(tmp_path / "second.txt", list(reversed(PAGES)))
+    assert first == second
+    assert [entry["url"] for entry in first[1]] == [
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/d",
+    ]
+
+
+def test_duplicate_paragraphs_are_dropped(tmp_path):
+    data, manifest = write(tmp_path / "context.txt", list(reversed(PAGES)))
+    text = data.decode()
+    assert text.count("All rights reserved") == 1
+    assert text.index("Lisbon") < text.index(FOOTER) < text.index("Porto")
+    assert [entry["paragraphs"] for entry in manifest] == [2, 1, 1]
+
+
+def test_manifest_ranges_match_the_documents(tmp_path):
+    data, manifest = write(tmp_path / "context.txt", list(PAGES))
+    for entry in manifest:
+        document = data[entry["start"] : entry["end"]].decode()
+        assert document.endswith("\n\n")
+    assert "Madrid" in data[manifest[-1]["start"] :].decode()